@@ -0,0 +1,106 @@
+import argparse
+import math
+
+import numpy as np
+
+from backtester import load_day
+from features import SERIES, batch_features
+
+
+def design_matrix(prices: np.ndarray, target: str, max_lag: int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    One day's regression of a series on its own lags 1..max_lag plus an intercept.
+    Columns are [1, lag1, ..., lag max_lag] and only rows where every lag is defined are
+    kept, so every lag order is fitted on the same rows and lags never reach into
+    another day.
+    '''
+    features = batch_features(prices, max_lag)
+    X = np.column_stack([np.ones(len(prices))] + [features[f'{target}_lag{lag}'] for lag in range(1, max_lag + 1)])
+    y = features[target]
+    valid = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+    return X[valid], y[valid]
+
+
+class LagFit:
+    '''
+    Least squares fits of every lag order 1..max_lag on days pooled into one sample.
+    One QR factorisation of the stacked design gives them all: the leading k + 1 columns
+    of R and Q'y are the factorisation of the order k model, so the coefficients come from
+    one batched triangular solve and order k's residual sum of squares is the full model's
+    plus the (Q'y)^2 terms beyond column k. Both are sums of squares, where y'y less the
+    leading (Q'y)^2 would cancel away the residual on price levels.
+    '''
+    def __init__(self, X: np.ndarray, y: np.ndarray) -> None:
+        self.num_obs, size = X.shape
+        self.max_lag = size - 1
+        Q, R = np.linalg.qr(X)
+        qty = Q.T @ y
+        residual = y - Q @ qty
+        tail = np.append(np.cumsum((qty ** 2)[::-1])[::-1], 0.0)
+        self.rss = np.dot(residual, residual) + tail[2:]
+
+        # Order k's system is R's leading (k + 1) block, padded with identity to full size
+        orders = np.arange(1, size)
+        systems = np.broadcast_to(np.eye(size), (self.max_lag, size, size)).copy()
+        rhs = np.zeros((self.max_lag, size))
+        for k in orders:
+            systems[k - 1, :k + 1, :k + 1] = R[:k + 1, :k + 1]
+            rhs[k - 1, :k + 1] = qty[:k + 1]
+        self.params = np.linalg.solve(systems, rhs[..., None])[..., 0]
+
+    def information_criteria(self) -> dict[str, np.ndarray]:
+        n = self.num_obs
+        k = np.arange(1, self.max_lag + 1) + 1
+        log_likelihood = n * np.log(self.rss / n)
+        return {'aic': log_likelihood + 2 * k, 'bic': log_likelihood + math.log(n) * k}
+
+    def best_order(self, criterion: str = 'bic') -> int:
+        return int(np.argmin(self.information_criteria()[criterion])) + 1
+
+    def coefficients(self, order: int) -> tuple[list[float], float]:
+        # (coefs with the most recent lag first, intercept), the STARFRUIT_COEF layout
+        params = self.params[order - 1]
+        return params[1:order + 1].tolist(), float(params[0])
+
+
+def fit_days(days: list[tuple[int, int]], data_dir: str, product: str, target: str, max_lag: int) -> LagFit:
+    designs = []
+    for round_num, day in days:
+        data = load_day(data_dir, round_num, day)
+        prices = np.array([data.mid_prices[timestamp].get(product, np.nan) for timestamp in data.timestamps])
+        designs.append(design_matrix(prices, target, max_lag))
+    return LagFit(np.vstack([X for X, _ in designs]), np.concatenate([y for _, y in designs]))
+
+
+def coefficient_block(coefs: list[float], intercept: float, prefix: str = 'STARFRUIT') -> str:
+    # The class attribute lines the traders define, ready to paste
+    return f'    {prefix}_COEF = {coefs!r}\n    {prefix}_INT = {intercept!r}'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Fit AR models of every lag order on pooled days and pick one')
+    parser.add_argument('days', nargs='+', help='ROUND:DAY, e.g. 1:-2 1:-1 1:0')
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--product', default='STARFRUIT')
+    parser.add_argument('--target', default='price', choices=SERIES, help='price for trader.py and price_regress.py, log_return for test_trader.py')
+    parser.add_argument('--max-lag', type=int, default=10)
+    parser.add_argument('--criterion', default='bic', choices=['aic', 'bic'])
+    parser.add_argument('--lags', type=int, help='emit this order instead of the best one')
+    args = parser.parse_args()
+
+    days = [tuple(int(part) for part in day.split(':', 1)) for day in args.days]
+    fit = fit_days(days, args.data_dir, args.product, args.target, args.max_lag)
+    criteria = fit.information_criteria()
+    best = fit.best_order(args.criterion)
+
+    print(f'{fit.num_obs:,} observations from {len(days)} day(s)')
+    print(f'{"lags":>6}{"rss":>16}{"aic":>16}{"bic":>16}')
+    for order in range(1, fit.max_lag + 1):
+        marker = ' *' if order == best else ''
+        print(f'{order:>6}{fit.rss[order - 1]:>16.6g}{criteria["aic"][order - 1]:>16.2f}{criteria["bic"][order - 1]:>16.2f}{marker}')
+    print()
+    print(coefficient_block(*fit.coefficients(args.lags or best), prefix=args.product))
+
+
+if __name__ == '__main__':
+    main()
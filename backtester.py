@@ -0,0 +1,388 @@
+import argparse
+import csv
+import glob
+import importlib
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import numpy as np
+
+from datamodel import ConversionObservation, Observation, OrderDepth, Trade, TradingState
+from order_book import OrderBook
+from profiling import Profiler
+from tick_store import TickStore, convert_prices, is_current, is_store, store_path
+
+POSITION_LIMITS = {'AMETHYSTS': 20, 'STARFRUIT': 20, 'ORCHIDS': 100, 'CHOCOLATE': 250, 'STRAWBERRIES': 350, 'ROSES': 60, 'GIFT_BASKET': 60}
+
+# Per unit, per tick cost of holding a long ORCHIDS position
+ORCHIDS_STORAGE_COST = 0.1
+
+OBSERVATION_FIELDS = ['bidPrice', 'askPrice', 'transportFees', 'exportTariff', 'importTariff', 'sunlight', 'humidity']
+
+
+def read_rows(path: str) -> list[dict[str, str]]:
+    '''
+    Reads a Prosperity CSV export. Price and trade files are semicolon delimited,
+    observation files are comma delimited, so the delimiter is taken from the header.
+    '''
+    with open(path, newline='') as f:
+        header = f.readline()
+        delimiter = ';' if ';' in header else ','
+        f.seek(0)
+        return list(csv.DictReader(f, delimiter=delimiter))
+
+
+def to_int(value: str) -> int:
+    return int(float(value))
+
+
+class DayData:
+    '''
+    One day of market data, indexed by timestamp.
+    '''
+    def __init__(self, round_num: int, day: int) -> None:
+        self.round_num = round_num
+        self.day = day
+        self.timestamps: list[int] = []
+        self.products: list[str] = []
+        self.order_depths: dict[int, dict[str, OrderDepth]] = {}
+        self.mid_prices: dict[int, dict[str, float]] = {}
+        self.market_trades: dict[int, dict[str, list[Trade]]] = {}
+        self.observations: dict[int, dict[str, ConversionObservation]] = {}
+
+
+def load_prices(data: DayData, path: str) -> None:
+    products = set()
+    for row in read_rows(path):
+        timestamp = int(row['timestamp'])
+        product = row['product']
+        products.add(product)
+
+        order_depth = OrderDepth()
+        for level in range(1, 4):
+            bid_price, bid_volume = row.get(f'bid_price_{level}'), row.get(f'bid_volume_{level}')
+            if bid_price and bid_volume:
+                order_depth.buy_orders[to_int(bid_price)] = to_int(bid_volume)
+            ask_price, ask_volume = row.get(f'ask_price_{level}'), row.get(f'ask_volume_{level}')
+            if ask_price and ask_volume:
+                order_depth.sell_orders[to_int(ask_price)] = -to_int(ask_volume)
+
+        if timestamp not in data.order_depths:
+            data.order_depths[timestamp] = {}
+            data.mid_prices[timestamp] = {}
+        data.order_depths[timestamp][product] = order_depth
+        data.mid_prices[timestamp][product] = float(row['mid_price'])
+
+    data.timestamps = sorted(data.order_depths)
+    data.products = sorted(products)
+
+
+def load_prices_store(data: DayData, store: TickStore) -> None:
+    '''
+    Same as load_prices, reading a converted tick store instead of the CSV.
+    '''
+    for product in store.products:
+        columns = {field: values.tolist() for field, values in store.product(product).items()}
+        levels = [(columns[f'bid_price_{level}'], columns[f'bid_volume_{level}'], columns[f'ask_price_{level}'], columns[f'ask_volume_{level}']) for level in range(1, 4) if f'bid_price_{level}' in columns]
+        for t, timestamp in enumerate(columns['timestamp']):
+            order_depth = OrderDepth()
+            for bid_prices, bid_volumes, ask_prices, ask_volumes in levels:
+                # NaN marks a missing level and fails every comparison
+                if bid_prices[t] == bid_prices[t] and bid_volumes[t] == bid_volumes[t]:
+                    order_depth.buy_orders[int(bid_prices[t])] = int(bid_volumes[t])
+                if ask_prices[t] == ask_prices[t] and ask_volumes[t] == ask_volumes[t]:
+                    order_depth.sell_orders[int(ask_prices[t])] = -int(ask_volumes[t])
+
+            if timestamp not in data.order_depths:
+                data.order_depths[timestamp] = {}
+                data.mid_prices[timestamp] = {}
+            data.order_depths[timestamp][product] = order_depth
+            data.mid_prices[timestamp][product] = columns['mid_price'][t]
+
+    data.timestamps = sorted(data.order_depths)
+    data.products = sorted(store.products)
+
+
+def load_trades(data: DayData, path: str) -> None:
+    for row in read_rows(path):
+        timestamp = int(row['timestamp'])
+        symbol = row['symbol']
+        trade = Trade(symbol, to_int(row['price']), to_int(row['quantity']), row.get('buyer') or '', row.get('seller') or '', timestamp)
+        data.market_trades.setdefault(timestamp, {}).setdefault(symbol, []).append(trade)
+
+
+def load_observations(data: DayData, path: str, product: str = 'ORCHIDS') -> None:
+    '''
+    Accepts both the platform's camelCase columns (bidPrice, transportFees, ...) and the
+    upper snake case export used in the notebooks (ORCHIDS, TRANSPORT_FEES, ...), where a
+    single ORCHIDS price stands in for both the bid and the ask.
+    '''
+    for row in read_rows(path):
+        values = {key.replace('_', '').lower(): value for key, value in row.items()}
+        if 'bidprice' not in values:
+            values['bidprice'] = values['askprice'] = values[product.lower()]
+        observation = ConversionObservation(*[float(values[field.lower()]) for field in OBSERVATION_FIELDS])
+        data.observations[int(values['timestamp'])] = {product: observation}
+
+
+def load_day(data_dir: str, round_num: int, day: int) -> DayData:
+    data = DayData(round_num, day)
+    prefix = f'round_{round_num}_day_{day}'
+
+    prices_path = os.path.join(data_dir, f'prices_{prefix}.csv')
+    if is_store(store_path(prices_path)):
+        # A store older than its CSV is converted again rather than replayed stale
+        if os.path.exists(prices_path) and not is_current(store_path(prices_path), prices_path):
+            convert_prices(prices_path)
+        load_prices_store(data, TickStore(store_path(prices_path)))
+    else:
+        load_prices(data, prices_path)
+    for path in sorted(glob.glob(os.path.join(data_dir, f'trades_{prefix}*.csv'))):
+        load_trades(data, path)
+    observations_path = os.path.join(data_dir, f'observations_{prefix}.csv')
+    if os.path.exists(observations_path):
+        load_observations(data, observations_path)
+
+    return data
+
+
+class ThreadStdout:
+    '''
+    Installed as sys.stdout while backtests run: each thread's prints go to the file that
+    thread redirected to, and everything else to the original stream. redirect_stdout
+    swaps the one global stream, so traders replayed on several threads would write into
+    each other's logs and restore the wrong stream on exit.
+    '''
+    def __init__(self, stream: Any) -> None:
+        self.stream = stream
+        self.local = threading.local()
+
+    def target(self) -> Any:
+        return getattr(self.local, 'target', None) or self.stream
+
+    def write(self, text: str) -> int:
+        return self.target().write(text)
+
+    def flush(self) -> None:
+        self.target().flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stream, name)
+
+
+STDOUT_LOCK = threading.Lock()
+
+
+@contextmanager
+def redirect_thread_stdout(target: Any) -> Iterator[None]:
+    with STDOUT_LOCK:
+        if not isinstance(sys.stdout, ThreadStdout):
+            sys.stdout = ThreadStdout(sys.stdout)
+        proxy = sys.stdout
+    previous = getattr(proxy.local, 'target', None)
+    proxy.local.target = target
+    try:
+        yield
+    finally:
+        proxy.local.target = previous
+
+
+def trader_profiler(trader: Any) -> Profiler:
+    # The trader's own profiler if it has one, so its stages land in the same report
+    profiler = getattr(trader, 'profiler', None)
+    return profiler if isinstance(profiler, Profiler) else Profiler()
+
+
+def load_trader(module_name: str) -> Any:
+    '''
+    Imports a trader module and returns a new Trader. Traders keep everything a run
+    accumulates in their own RunState, so each Trader() starts clean and several can be
+    replayed in one process.
+    '''
+    return importlib.import_module(module_name).Trader()
+
+
+class BacktestResult:
+    def __init__(self, products: list[str], num_ticks: int) -> None:
+        self.products = products
+        self.timestamps = np.zeros(num_ticks, dtype=np.int64)
+        # Mark-to-market PnL per tick, one column per product
+        self.pnl = np.zeros((num_ticks, len(products)), dtype=np.float64)
+        # Position held after each tick, same layout
+        self.position_history = np.zeros((num_ticks, len(products)), dtype=np.int64)
+        self.own_trades: list[Trade] = []
+        self.conversions = 0
+        self.positions: dict[str, int] = {}
+        self.elapsed = 0.0
+
+    @property
+    def product_pnl(self) -> dict[str, float]:
+        final = self.pnl[-1] if len(self.pnl) else np.zeros(len(self.products))
+        return {product: float(final[i]) for i, product in enumerate(self.products)}
+
+    @property
+    def total_pnl(self) -> float:
+        return sum(self.product_pnl.values())
+
+    def summary(self) -> str:
+        lines = [f'{product}: {pnl:,.1f}' for product, pnl in self.product_pnl.items()]
+        lines.append(f'Total PnL: {self.total_pnl:,.1f}')
+        lines.append(f'{len(self.timestamps)} ticks in {self.elapsed:.2f}s')
+        return '\n'.join(lines)
+
+
+class Backtester:
+    '''
+    Replays a DayData tick by tick through Trader.run. Orders are matched by an OrderBook
+    against the visible book first and then against the market trades printed at the
+    same timestamp.
+    '''
+    def __init__(self, trader: Any, position_limits: dict[str, int] = POSITION_LIMITS, log_file: io.TextIOBase | None = None, profiler: Profiler | None = None) -> None:
+        self.trader = trader
+        self.position_limits = position_limits
+        self.log_file = log_file
+        # When given, the whole Trader.run call is recorded as the 'run' stage
+        self.profiler = profiler
+
+    def run(self, data: DayData) -> BacktestResult:
+        result = BacktestResult(data.products, len(data.timestamps))
+        book = OrderBook(data.products, self.position_limits)
+        listings = {product: {'symbol': product, 'product': product, 'denomination': 'SEASHELLS'} for product in data.products}
+        mid_prices = np.zeros(len(data.products), dtype=np.float64)
+        trader_data = ''
+        own_trades: dict[str, list[Trade]] = {}
+        prev_market_trades: dict[str, list[Trade]] = {}
+
+        log_file = self.log_file if self.log_file is not None else open(os.devnull, 'w')
+        start = time.perf_counter()
+
+        for t, timestamp in enumerate(data.timestamps):
+            order_depths = data.order_depths[timestamp]
+            market_trades = data.market_trades.get(timestamp, {})
+            conversion_observations = data.observations.get(timestamp, {})
+            state = TradingState(
+                trader_data,
+                timestamp,
+                listings,
+                order_depths,
+                own_trades,
+                prev_market_trades,
+                book.position_dict(),
+                Observation({}, conversion_observations),
+            )
+
+            with redirect_thread_stdout(log_file):
+                if self.profiler is not None:
+                    output = self.profiler.measure('run', self.trader.run, state)
+                else:
+                    output = self.trader.run(state)
+
+            # Older drafts return only the orders
+            if isinstance(output, tuple):
+                orders, conversions, trader_data = output
+            else:
+                orders, conversions, trader_data = output, 0, ''
+            trader_data = trader_data or ''
+
+            self.convert(book, conversions, conversion_observations, result)
+
+            book.load(order_depths, market_trades)
+            own_trades = {}
+            for product, product_orders in orders.items():
+                fills = book.match(product, product_orders, timestamp)
+                if fills:
+                    own_trades[product] = fills
+                    result.own_trades.extend(fills)
+
+            for product in conversion_observations:
+                i = book.index.get(product)
+                if i is not None and book.positions[i] > 0:
+                    book.cash[i] -= book.positions[i] * ORCHIDS_STORAGE_COST
+
+            for i, product in enumerate(data.products):
+                mid_prices[i] = data.mid_prices[timestamp].get(product, 0.0)
+            result.timestamps[t] = timestamp
+            result.pnl[t] = book.cash + book.positions * mid_prices
+            result.position_history[t] = book.positions
+            prev_market_trades = market_trades
+
+        result.elapsed = time.perf_counter() - start
+        result.positions = book.position_dict()
+        if self.log_file is None:
+            log_file.close()
+        return result
+
+    def convert(self, book: OrderBook, conversions: int, conversion_observations: dict[str, ConversionObservation], result: BacktestResult) -> None:
+        '''
+        Conversions can only flatten an existing position: a positive request buys back a
+        short from the South archipelago, a negative request sells a long into it.
+        '''
+        if not conversions:
+            return
+        for product, observation in conversion_observations.items():
+            i = book.index.get(product)
+            if i is None:
+                continue
+            current = int(book.positions[i])
+            if conversions > 0 and current < 0:
+                quantity = min(conversions, -current)
+                book.cash[i] -= quantity * (observation.askPrice + observation.transportFees + observation.importTariff)
+            elif conversions < 0 and current > 0:
+                quantity = -min(-conversions, current)
+                book.cash[i] -= quantity * (observation.bidPrice - observation.transportFees - observation.exportTariff)
+            else:
+                continue
+            book.positions[i] = current + quantity
+            result.conversions += abs(quantity)
+
+
+def run_concurrent(traders: list[Any], data: DayData, workers: int | None = None) -> list[BacktestResult]:
+    '''
+    Replays several traders over the same DayData on a thread pool, one Backtester each.
+    The day is only read, so it is shared rather than copied; results come back in the
+    order of traders.
+    '''
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda trader: Backtester(trader).run(data), traders))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Replay prices_round_N_day_D.csv files through a Trader')
+    parser.add_argument('trader', help='trader module name, e.g. trader_orchids')
+    parser.add_argument('round', type=int)
+    parser.add_argument('days', type=int, nargs='+')
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--log', help='write everything the trader prints to this file')
+    parser.add_argument('--profile', action='store_true', help='report per-stage latency percentiles')
+    parser.add_argument('--budget-ms', type=float, help='per-tick time budget; strategies that do not fit are skipped')
+    args = parser.parse_args()
+
+    log_file = open(args.log, 'w') if args.log else None
+    for day in args.days:
+        data = load_day(args.data_dir, args.round, day)
+        trader = load_trader(args.trader)
+        profiler = None
+        if args.budget_ms is not None:
+            trader.TIME_BUDGET_MS = args.budget_ms
+        if args.profile or args.budget_ms is not None:
+            # Skips are counted even when timing is off
+            profiler = trader_profiler(trader)
+            profiler.reset()
+            profiler.set_enabled(args.profile)
+        result = Backtester(trader, log_file=log_file, profiler=profiler).run(data)
+        print(f'Round {args.round} day {day}')
+        print(result.summary())
+        if profiler is not None:
+            print(profiler.report())
+    if log_file is not None:
+        log_file.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+import argparse
+import itertools
+
+import numpy as np
+
+from backtester import POSITION_LIMITS, DayData, load_day
+
+BASKET_PRODUCTS = ['GIFT_BASKET', 'STRAWBERRIES', 'CHOCOLATE', 'ROSES']
+BASKET_WEIGHTS = {'STRAWBERRIES': 6, 'CHOCOLATE': 4, 'ROSES': 1}
+
+# compute_orders_basket in trader.py trades every leg in the same direction as the basket,
+# price_regress.py hedges the basket against the components
+SAME_DIRECTION_LEGS = {'GIFT_BASKET': 1, 'STRAWBERRIES': 1, 'CHOCOLATE': 1, 'ROSES': 1}
+HEDGED_LEGS = {'GIFT_BASKET': 1, 'STRAWBERRIES': -1, 'CHOCOLATE': -1, 'ROSES': -1}
+
+# Cold start values compute_orders_basket uses until the window has filled
+COLD_MEAN = 9
+COLD_STD = 75
+
+# Combinations evaluated per (ticks x combinations) block, to bound memory on long days
+CHUNK_SIZE = 512
+
+
+class BasketDay:
+    '''
+    Whole-day arrays for the four basket products, aligned on timestamp.
+    '''
+    def __init__(self, mid: dict[str, np.ndarray], best_bid: dict[str, np.ndarray], best_ask: dict[str, np.ndarray]) -> None:
+        self.mid = mid
+        self.best_bid = best_bid
+        self.best_ask = best_ask
+        self.spread = mid['GIFT_BASKET'] - sum(mid[product] * weight for product, weight in BASKET_WEIGHTS.items())
+
+    @classmethod
+    def from_day(cls, data: DayData) -> 'BasketDay':
+        '''
+        Skips ticks where a product is not listed or one side of its book is empty, as
+        basket_difference gives no spread there and the traders neither trade nor update
+        their window on them. Positions are held across the skipped ticks.
+        '''
+        num_ticks = len(data.timestamps)
+        mid, best_bid, best_ask = {}, {}, {}
+        for product in BASKET_PRODUCTS:
+            best_bid[product] = np.full(num_ticks, np.nan)
+            best_ask[product] = np.full(num_ticks, np.nan)
+            for t, timestamp in enumerate(data.timestamps):
+                order_depth = data.order_depths[timestamp].get(product)
+                if order_depth is None:
+                    continue
+                if order_depth.buy_orders:
+                    best_bid[product][t] = max(order_depth.buy_orders)
+                if order_depth.sell_orders:
+                    best_ask[product][t] = min(order_depth.sell_orders)
+            mid[product] = (best_bid[product] + best_ask[product]) / 2
+
+        quoted = ~np.isnan(np.array(list(mid.values()))).any(axis=0)
+        return cls(*({product: values[quoted] for product, values in arrays.items()} for arrays in (mid, best_bid, best_ask)))
+
+    def leg_returns(self, legs: dict[str, int]) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Returns the mark-to-market change of holding one full-size position (every leg at
+        its limit, in its leg direction) from tick t to t + 1, and the cost of crossing
+        half the spread on every leg to move that position by one unit at tick t.
+        '''
+        returns = np.zeros(len(self.spread))
+        costs = np.zeros(len(self.spread))
+        for product, direction in legs.items():
+            limit = POSITION_LIMITS[product]
+            returns[:-1] += direction * limit * np.diff(self.mid[product])
+            costs += limit * (self.best_ask[product] - self.best_bid[product]) / 2
+        return returns, costs
+
+
+def rolling_mean_std(values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Rolling mean and population std over the last `window` values, with the cold start
+    fallbacks of compute_orders_basket for ticks where fewer than window + 1 values exist.
+    '''
+    centered = values - values.mean()
+    sums = np.concatenate(([0.0], np.cumsum(centered)))
+    squares = np.concatenate(([0.0], np.cumsum(centered * centered)))
+
+    mean = np.full(len(values), float(COLD_MEAN))
+    std = np.full(len(values), float(COLD_STD))
+    if len(values) > window:
+        window_sums = sums[window + 1:] - sums[1:-window]
+        window_squares = squares[window + 1:] - squares[1:-window]
+        window_mean = window_sums / window
+        mean[window:] = window_mean + values.mean()
+        std[window:] = np.sqrt(np.maximum(window_squares / window - window_mean * window_mean, 0.0))
+    return mean, std
+
+
+def last_index(events: np.ndarray) -> np.ndarray:
+    # Index of the most recent True at or before each tick, -1 before the first one
+    ticks = np.arange(events.shape[0]).reshape(-1, *([1] * (events.ndim - 1)))
+    return np.maximum.accumulate(np.where(events, ticks, -1), axis=0)
+
+
+def hold_positions(long_entry: np.ndarray, short_entry: np.ndarray, long_exit: np.ndarray | None = None, short_exit: np.ndarray | None = None) -> np.ndarray:
+    '''
+    Turns (ticks x combinations) entry and exit signals into the held position in
+    {-1, 0, 1}: the latest entry is held until a later exit for that side.
+    '''
+    long_index, short_index = last_index(long_entry), last_index(short_entry)
+    state = np.where(long_index > short_index, 1, np.where(short_index > long_index, -1, 0))
+    if long_exit is not None:
+        state[(state == 1) & (last_index(long_exit) > long_index)] = 0
+    if short_exit is not None:
+        state[(state == -1) & (last_index(short_exit) > short_index)] = 0
+    return state
+
+
+def score(state: np.ndarray, returns: np.ndarray, costs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    changes = np.abs(np.diff(state, axis=0, prepend=0))
+    pnl = returns @ state - costs @ changes
+    return pnl, changes.sum(axis=0)
+
+
+def band_grid(day: BasketDay, windows: list[int], upper: list[float], lower: list[float], premiums: list[float], legs: dict[str, int] = SAME_DIRECTION_LEGS) -> dict[str, np.ndarray]:
+    '''
+    Evaluates the compute_orders_basket rule (short when the spread is above mean + upper
+    std, long below mean - lower std) for every combination of the parameter lists.
+    The spread and its rolling statistics are computed once per window and premium.
+    '''
+    returns, costs = day.leg_returns(legs)
+    rows = {'window': [], 'upper': [], 'lower': [], 'premium': [], 'pnl': [], 'trades': []}
+    bands = np.array(list(itertools.product(upper, lower)))
+
+    for window, premium in itertools.product(windows, premiums):
+        difference = day.spread - premium
+        mean, std = rolling_mean_std(difference, window)
+        for start in range(0, len(bands), CHUNK_SIZE):
+            chunk = bands[start:start + CHUNK_SIZE]
+            short_entry = difference[:, None] > mean[:, None] + chunk[:, 0] * std[:, None]
+            long_entry = difference[:, None] < mean[:, None] - chunk[:, 1] * std[:, None]
+            pnl, trades = score(hold_positions(long_entry, short_entry), returns, costs)
+            rows['window'].append(np.full(len(chunk), window))
+            rows['premium'].append(np.full(len(chunk), premium))
+            rows['upper'].append(chunk[:, 0])
+            rows['lower'].append(chunk[:, 1])
+            rows['pnl'].append(pnl)
+            rows['trades'].append(trades)
+
+    return {key: np.concatenate(values) for key, values in rows.items()}
+
+
+def threshold_grid(day: BasketDay, thresholds: list[float], premiums: list[float], long_exit: tuple[float, float] = (0, 10), short_exit: tuple[float, float] = (-30, 0), legs: dict[str, int] = HEDGED_LEGS) -> dict[str, np.ndarray]:
+    '''
+    Evaluates the price_regress.py rule: enter beyond a fixed +/- threshold and exit a
+    long in (long_exit] or a short in [short_exit), with the bands in spread units.
+    '''
+    returns, costs = day.leg_returns(legs)
+    grid = np.array(list(itertools.product(thresholds, premiums)))
+    rows = {'threshold': [], 'premium': [], 'pnl': [], 'trades': []}
+
+    for start in range(0, len(grid), CHUNK_SIZE):
+        chunk = grid[start:start + CHUNK_SIZE]
+        difference = day.spread[:, None] - chunk[:, 1]
+        # price_regress.py shorts the basket above the threshold and buys it below
+        state = hold_positions(
+            difference < -chunk[:, 0],
+            difference > chunk[:, 0],
+            (long_exit[0] < difference) & (difference <= long_exit[1]),
+            (short_exit[0] <= difference) & (difference < short_exit[1]),
+        )
+        pnl, trades = score(state, returns, costs)
+        rows['threshold'].append(chunk[:, 0])
+        rows['premium'].append(chunk[:, 1])
+        rows['pnl'].append(pnl)
+        rows['trades'].append(trades)
+
+    return {key: np.concatenate(values) for key, values in rows.items()}
+
+
+def top(results: dict[str, np.ndarray], n: int = 10) -> list[dict[str, float]]:
+    order = np.argsort(results['pnl'])[::-1][:n]
+    return [{key: float(values[i]) for key, values in results.items()} for i in order]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Grid search the GIFT_BASKET spread strategy over one day')
+    parser.add_argument('round', type=int)
+    parser.add_argument('day', type=int)
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    day = BasketDay.from_day(load_day(args.data_dir, args.round, args.day))
+    results = band_grid(
+        day,
+        windows=[50, 100, 200, 400],
+        upper=np.linspace(0.25, 2.5, 10).tolist(),
+        lower=np.linspace(0.25, 2.5, 10).tolist(),
+        premiums=np.arange(300, 441, 10).tolist(),
+    )
+    print(f'Band rule, {len(results["pnl"])} combinations')
+    for row in top(results, args.top):
+        print(row)
+
+    results = threshold_grid(day, thresholds=np.arange(20, 161, 5).tolist(), premiums=np.arange(300, 441, 10).tolist())
+    print(f'Threshold rule, {len(results["pnl"])} combinations')
+    for row in top(results, args.top):
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
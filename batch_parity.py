@@ -0,0 +1,97 @@
+from typing import Any
+
+import numpy as np
+
+from backtester import Backtester, DayData, load_trader
+
+
+def starfruit_window(trader: Any) -> Any:
+    # The LagWindow or FeatureEngine Trader.run pushes STARFRUIT mids into
+    run_state = trader.run_state
+    return run_state.starfruit_features if hasattr(run_state, 'starfruit_features') else run_state.starfruit_cache
+
+
+def replay(trader: Any, data: DayData) -> dict[str, list]:
+    '''
+    Runs the day through the unmodified Trader.run and records every STARFRUIT prediction
+    its strategies ask for, with the number of mids pushed so far. No strategy trades
+    ORCHIDS on the model, so after each tick with an ORCHIDS observation the prediction is
+    taken from the curr_* values Trader.run kept, keyed by that tick's timestamp.
+    '''
+    window = starfruit_window(trader)
+    records: dict[str, list] = {'pushed': [], 'calc_starfruit_price': [], 'calc_orchids_price': []}
+    push, run = window.push, trader.run
+    calc_starfruit_price, calc_orchids_price = trader.calc_starfruit_price, getattr(trader, 'calc_orchids_price', None)
+
+    def record_push(value: float) -> None:
+        records['pushed'].append(float(value))
+        push(value)
+
+    def record_run(state: Any) -> Any:
+        result = run(state)
+        if calc_orchids_price is not None and 'ORCHIDS' in state.observations.conversionObservations:
+            records['calc_orchids_price'].append((state.timestamp, calc_orchids_price()))
+        return result
+
+    def record_starfruit() -> Any:
+        price = calc_starfruit_price()
+        records['calc_starfruit_price'].append((len(records['pushed']), price))
+        return price
+
+    window.push, trader.run, trader.calc_starfruit_price = record_push, record_run, record_starfruit
+    Backtester(trader).run(data)
+    return records
+
+
+def orchids_columns(trader: Any, data: DayData) -> dict[str, np.ndarray]:
+    # The curr_* values Trader.run derives from each tick's conversion observation
+    rows = [data.observations[timestamp]['ORCHIDS'] for timestamp in data.timestamps if 'ORCHIDS' in data.observations.get(timestamp, {})]
+    return {
+        'import': np.array([row.importTariff for row in rows], dtype=np.float64),
+        'export': np.array([row.exportTariff for row in rows], dtype=np.float64),
+        'production': np.array([trader.total_production_change(row.humidity / 365, row.sunlight) for row in rows], dtype=np.float64),
+        'transport': np.array([row.transportFees for row in rows], dtype=np.float64),
+        'price': np.array([(row.askPrice + row.bidPrice) / 2 for row in rows], dtype=np.float64),
+    }
+
+
+def compare(name: str, live: list[float], batch: list[float]) -> int:
+    live, batch = np.array(live, dtype=np.float64), np.array(batch, dtype=np.float64)
+    mismatched = ~((live == batch) | (np.isnan(live) & np.isnan(batch)))
+    if mismatched.any():
+        i = int(np.flatnonzero(mismatched)[0])
+        raise AssertionError(f'{name} call {i}: Trader.run got {live[i]!r}, batch gives {batch[i]!r}')
+    return len(batch)
+
+
+def check_trader(module_name: str, data: DayData, orchids_model: str | None = None) -> dict[str, int]:
+    '''
+    Replays a day through a trader module's Trader.run and checks every prediction it made
+    against the batch pricing methods on the day's own columns, raising on the first value
+    that is not bitwise equal. Returns the number of live predictions compared per method.
+    '''
+    checked = {}
+    trader = load_trader(module_name)
+    if orchids_model is not None:
+        trader.ORCHIDS_MODEL = orchids_model
+        trader.reset()
+    records = replay(trader, data)
+
+    if hasattr(trader, 'calc_starfruit_prices') and records['calc_starfruit_price']:
+        mid_prices = np.array([data.mid_prices[timestamp]['STARFRUIT'] for timestamp in data.timestamps if 'STARFRUIT' in data.mid_prices[timestamp]])
+        pushed = np.array(records['pushed'])
+        if len(pushed) != len(mid_prices) or not np.array_equal(pushed, mid_prices):
+            raise AssertionError(f'{module_name}: Trader.run pushed {len(pushed)} STARFRUIT mids, the day has one per tick ({len(mid_prices)})')
+        batch = trader.calc_starfruit_prices(mid_prices)
+        live = [np.nan if price is None else price for _, price in records['calc_starfruit_price']]
+        expected = [batch[count - 1] if count else np.nan for count, _ in records['calc_starfruit_price']]
+        checked['calc_starfruit_prices'] = compare(f'{module_name}.calc_starfruit_prices', live, expected)
+
+    if hasattr(trader, 'calc_orchids_prices') and records['calc_orchids_price']:
+        columns = orchids_columns(trader, data)
+        batch = trader.calc_orchids_prices(columns['import'], columns['export'], columns['production'], columns['transport'], columns['price'])
+        rows = {timestamp: i for i, timestamp in enumerate(timestamp for timestamp in data.timestamps if 'ORCHIDS' in data.observations.get(timestamp, {}))}
+        live = [price for _, price in records['calc_orchids_price']]
+        expected = [batch[rows[timestamp]] for timestamp, _ in records['calc_orchids_price']]
+        checked['calc_orchids_prices'] = compare(f'{module_name}.calc_orchids_prices', live, expected)
+    return checked
@@ -0,0 +1,239 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Any
+
+import numpy as np
+
+from backtester import load_trader
+from datamodel import ConversionObservation, Observation, OrderDepth, TradingState
+
+TRADERS = ['trader', 'trader_orchids', 'price_regress', 'working']
+PRODUCTS = ['AMETHYSTS', 'STARFRUIT', 'ORCHIDS', 'CHOCOLATE', 'STRAWBERRIES', 'ROSES', 'GIFT_BASKET']
+BASE_PRICES = {'AMETHYSTS': 10000, 'STARFRUIT': 5000, 'ORCHIDS': 1100, 'CHOCOLATE': 7900, 'STRAWBERRIES': 4000, 'ROSES': 14500}
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# name: (book depth, warm-up ticks run before timing starts)
+SCENARIOS = {
+    'empty': (0, 0),
+    'all_products': (3, 0),
+    'deep': (15, 0),
+    'long_history': (3, 2000),
+}
+
+
+def make_states(depth: int, num_ticks: int, seed: int = 0) -> list[TradingState]:
+    '''
+    Seeded random walk books for all seven products, `depth` levels a side (0 gives empty
+    books). traderData is left empty and filled in from the trader's output while replaying.
+    '''
+    rng = np.random.default_rng(seed)
+    listings = {product: {'symbol': product, 'product': product, 'denomination': 'SEASHELLS'} for product in PRODUCTS}
+    mids = {product: base + np.cumsum(rng.normal(0, 1, num_ticks)) for product, base in BASE_PRICES.items()}
+    mids['GIFT_BASKET'] = 4 * mids['CHOCOLATE'] + 6 * mids['STRAWBERRIES'] + mids['ROSES'] + 380 + rng.normal(0, 75, num_ticks)
+    mids['AMETHYSTS'] = 10000 + rng.normal(0, 2, num_ticks)
+
+    states = []
+    for t in range(num_ticks):
+        order_depths = {}
+        for product in PRODUCTS:
+            order_depth = OrderDepth()
+            mid = int(round(mids[product][t]))
+            for level in range(depth):
+                order_depth.buy_orders[mid - 1 - level] = int(rng.integers(1, 30))
+                order_depth.sell_orders[mid + 1 + level] = -int(rng.integers(1, 30))
+            order_depths[product] = order_depth
+        orchids = mids['ORCHIDS'][t]
+        observations = Observation({}, {'ORCHIDS': ConversionObservation(orchids - 1, orchids + 1, 1.0, 9.5, -5.0, 2500 + 500 * np.sin(t / 300), 70 + 10 * np.cos(t / 500))})
+        states.append(TradingState('', t * 100, listings, order_depths, {}, {}, {}, observations))
+    return states
+
+
+def replay(trader: Any, states: list[TradingState], trader_data: str = '') -> str:
+    for state in states:
+        state.traderData = trader_data
+        output = trader.run(state)
+        if isinstance(output, tuple):
+            trader_data = output[2]
+    return trader_data
+
+
+def calibrate(num_loops: int = 200) -> float:
+    '''
+    Loops per second of a fixed workload shaped like a trader tick: walking a sorted
+    book, dict updates, float arithmetic and a small NumPy dot product. Throughput is
+    compared relative to this, so a baseline taken on one machine still holds on another.
+    '''
+    book = {10000 + level: level + 6 for level in range(-5, 5)}
+    coefs = np.array([0.34, 0.26, 0.2, 0.2])
+    values = np.array([5000.0, 5001.0, 4999.5, 5000.5])
+    start = time.perf_counter()
+    total = 0.0
+    positions: dict[int, int] = {}
+    for i in range(num_loops):
+        for price, qty in sorted(book.items(), reverse=True):
+            total += price * qty * 1e-4
+        positions[i & 7] = positions.get(i & 7, 0) + 1
+        total += float(np.multiply(coefs, values).sum())
+    return num_loops / (time.perf_counter() - start)
+
+
+def bench(module: str, scenario: str, num_ticks: int, repeat: int, chunk: int = 50) -> dict[str, float]:
+    '''
+    Times Trader.run over a scenario's states in ticks per second, and as `cost`, the
+    tick's time in calibrate() loops. Machine speed drifts within seconds, so every chunk
+    of ticks is timed between two calibrate() blocks and costed against their mean, and
+    keeps its cheapest of `repeat` runs. A further run under tracemalloc gives the peak memory
+    allocated within a tick and the memory blocks still held per tick once it returns.
+    '''
+    depth, warmup = SCENARIOS[scenario]
+    warmup_states = make_states(depth, warmup, seed=1)
+    states = make_states(depth, num_ticks)
+    chunks = [states[i:i + chunk] for i in range(0, len(states), chunk)]
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        # As timeit does, so collections scanning every live state do not land in a timing
+        gc.collect()
+        gc.disable()
+        try:
+            fastest = [float('inf')] * len(chunks)
+            cheapest = [float('inf')] * len(chunks)
+            for _ in range(repeat):
+                trader = load_trader(module)
+                trader_data = replay(trader, warmup_states)
+                calibration = calibrate()
+                for i, ticks in enumerate(chunks):
+                    start = time.perf_counter()
+                    trader_data = replay(trader, ticks, trader_data)
+                    elapsed = time.perf_counter() - start
+                    after = calibrate()
+                    fastest[i] = min(fastest[i], elapsed)
+                    cheapest[i] = min(cheapest[i], elapsed * (calibration + after) / 2)
+                    calibration = after
+        finally:
+            gc.enable()
+
+        trader = load_trader(module)
+        trader_data = replay(trader, warmup_states)
+        tracemalloc.start()
+        peak = 0
+        blocks = sys.getallocatedblocks()
+        for state in states:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            trader_data = replay(trader, [state], trader_data)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        blocks = sys.getallocatedblocks() - blocks
+        tracemalloc.stop()
+
+    return {
+        'ticks_per_sec': num_ticks / sum(fastest),
+        'cost': sum(cheapest) / num_ticks,
+        'peak_kb': peak / 1024,
+        'blocks_per_tick': blocks / num_ticks,
+    }
+
+
+def compare(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]], tolerance: float) -> list[tuple[str, str]]:
+    # (benchmark, reason) for calibrated cost, peak memory or blocks kept per tick above
+    # the baseline by more than the tolerance, and for any benchmark that raised. The
+    # allocation checks allow a little absolute slack, as their baselines are near zero
+    failures = []
+    for key, result in results.items():
+        if 'error' in result:
+            failures.append((key, result['error']))
+            continue
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        if result['cost'] > expected['cost'] * (1 + tolerance):
+            failures.append((key, f'{result["cost"]:.1f} calibration loops per tick, baseline {expected["cost"]:.1f} '
+                                  f'({result["ticks_per_sec"]:,.0f} ticks/s here)'))
+        if result['peak_kb'] > expected['peak_kb'] * (1 + tolerance) + 1:
+            failures.append((key, f'peak {result["peak_kb"]:.1f} KB per tick, baseline {expected["peak_kb"]:.1f}'))
+        if result['blocks_per_tick'] > abs(expected['blocks_per_tick']) * (1 + tolerance) + 0.1:
+            failures.append((key, f'{result["blocks_per_tick"]:.2f} memory blocks kept per tick, baseline {expected["blocks_per_tick"]:.2f}'))
+    return failures
+
+
+def best_of(first: dict[str, float], second: dict[str, float]) -> dict[str, float]:
+    # Noise only ever adds time and memory, so a re-run keeps the better of each figure
+    best = {name: min(value, second[name]) for name, value in first.items()}
+    best['ticks_per_sec'] = max(first['ticks_per_sec'], second['ticks_per_sec'])
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark Trader.run for every trader variant')
+    parser.add_argument('--traders', nargs='+', default=TRADERS)
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark, the fastest is kept')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed fractional slowdown before failing')
+    parser.add_argument('--retries', type=int, default=2, help='times a benchmark over the baseline is measured again before failing')
+    parser.add_argument('--update', action='store_true', help='store these results in the baseline, replacing only the benchmarks run')
+    args = parser.parse_args()
+
+    # Trader modules import their neighbours by bare name
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    print(f'{"benchmark":<32}{"ticks/s":>12}{"cost":>8}{"peak KB":>10}{"blocks/tick":>13}')
+    for module in args.traders:
+        for scenario in args.scenarios:
+            key = f'{module}/{scenario}'
+            try:
+                result = results[key] = bench(module, scenario, args.ticks, args.repeat)
+            except Exception as e:
+                results[key] = {'error': f'{type(e).__name__}: {e}'}
+                print(f'{key:<32}failed: {results[key]["error"]}')
+                continue
+            print(f'{key:<32}{result["ticks_per_sec"]:>12,.0f}{result["cost"]:>8.1f}{result["peak_kb"]:>10.1f}{result["blocks_per_tick"]:>13.2f}')
+
+    failed = [key for key, result in results.items() if 'error' in result]
+    if args.update and failed:
+        # A baseline that records a crash would hide it from every later comparison
+        print(f'Baseline not written: {", ".join(failed)} failed')
+        sys.exit(1)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.update:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f'Baseline written to {args.baseline}')
+        return
+
+    if not baseline:
+        print(f'No baseline at {args.baseline}, run with --update to create one')
+        return
+    failures = compare(results, baseline, args.tolerance)
+    for _ in range(args.retries):
+        # A busy machine can slow one measurement down; only a benchmark that stays over
+        # the baseline when measured again counts as a regression
+        again = sorted({key for key, _ in failures if 'error' not in results[key]})
+        if not again:
+            break
+        for key in again:
+            module, scenario = key.split('/')
+            results[key] = best_of(results[key], bench(module, scenario, args.ticks, args.repeat))
+            print(f'{key + " (again)":<32}{results[key]["ticks_per_sec"]:>12,.0f}{results[key]["cost"]:>8.1f}'
+                  f'{results[key]["peak_kb"]:>10.1f}{results[key]["blocks_per_tick"]:>13.2f}')
+        failures = compare(results, baseline, args.tolerance)
+    if failures:
+        print(f'REGRESSION: {len(failures)} benchmark(s) worse than baseline by more than {args.tolerance:.0%}')
+        for key, reason in failures:
+            print(f'  {key}: {reason}')
+        sys.exit(1)
+    print('All benchmarks within tolerance of the baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+from functools import cached_property
+from itertools import accumulate
+
+from datamodel import OrderDepth
+
+
+class BookSnapshot:
+    '''
+    One product's OrderDepth sorted once per tick. Bids are highest first and asks lowest
+    first, both as (price, volume) pairs with positive volumes. The per-level price and
+    volume lists and the cumulative volumes are only built if a strategy asks for them.
+    '''
+    def __init__(self, order_depth: OrderDepth) -> None:
+        self.bids = sorted(order_depth.buy_orders.items(), reverse=True)
+        self.asks = [(price, -volume) for price, volume in sorted(order_depth.sell_orders.items())]
+        self.best_bid = self.bids[0][0] if self.bids else None
+        self.best_ask = self.asks[0][0] if self.asks else None
+        if self.best_bid is not None and self.best_ask is not None:
+            self.mid = (self.best_bid + self.best_ask) / 2
+        else:
+            self.mid = None
+
+    @cached_property
+    def bid_prices(self) -> list[int]:
+        return [price for price, _ in self.bids]
+
+    @cached_property
+    def bid_volumes(self) -> list[int]:
+        return [volume for _, volume in self.bids]
+
+    @cached_property
+    def ask_prices(self) -> list[int]:
+        return [price for price, _ in self.asks]
+
+    @cached_property
+    def ask_volumes(self) -> list[int]:
+        return [volume for _, volume in self.asks]
+
+    @cached_property
+    def bid_cum_volume(self) -> list[int]:
+        # Volume available at or above each bid level
+        return list(accumulate(self.bid_volumes))
+
+    @cached_property
+    def ask_cum_volume(self) -> list[int]:
+        # Volume available at or below each ask level
+        return list(accumulate(self.ask_volumes))
+
+
+def snapshot_books(order_depths: dict[str, OrderDepth]) -> dict[str, BookSnapshot]:
+    return {product: BookSnapshot(order_depth) for product, order_depth in order_depths.items()}
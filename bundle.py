@@ -0,0 +1,429 @@
+import argparse
+import ast
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from typing import Any, Iterator
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Supplied by the platform next to the submission, so imported rather than inlined
+PROVIDED = {'datamodel'}
+# Imported on first use instead of at import time unless --eager is given. The per-tick paths
+# are plain Python, so only opt-in ones such as the STARFRUIT_FORGETTING online fit load numpy
+LAZY_MODULES = {'numpy', 'pandas', 'scipy'}
+# Import plus first tick in a fresh interpreter, datamodel excluded and deferred imports included.
+# The bundled traders measure 3-15 ms; importing numpy alone takes about 50 ms
+IMPORT_BUDGET_MS = 20.0
+
+LAZY_MODULE_SOURCE = '''class LazyModule:
+    # Stands in for a module until an attribute is first used, then swaps itself for it
+    def __init__(self, name: str, alias: str) -> None:
+        self.name = name
+        self.alias = alias
+
+    def __getattr__(self, attr: str) -> Any:
+        module = importlib.import_module(self.name)
+        globals()[self.alias] = module
+        return getattr(module, attr)
+'''
+
+
+def is_local(module_name: str) -> bool:
+    return module_name not in PROVIDED and os.path.exists(os.path.join(HERE, f'{module_name}.py'))
+
+
+def walk(node: ast.AST, skipped: set[ast.AST] = frozenset()) -> Iterator[ast.AST]:
+    # ast.walk, leaving out the subtrees of members a bundle drops
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        if current not in skipped:
+            yield current
+            pending.extend(ast.iter_child_nodes(current))
+
+
+def names_used(node: ast.AST, skipped: set[ast.AST] = frozenset()) -> set[str]:
+    return {child.id for child in walk(node, skipped) if isinstance(child, ast.Name)}
+
+
+def references(node: ast.AST, skipped: set[ast.AST] = frozenset()) -> Counter[str]:
+    # Every way code can reach a class member by name: bare names, attributes, and strings for getattr
+    counts: Counter[str] = Counter()
+    for child in walk(node, skipped):
+        if isinstance(child, ast.Name):
+            counts[child.id] += 1
+        elif isinstance(child, ast.Attribute):
+            counts[child.attr] += 1
+        elif isinstance(child, ast.Constant) and isinstance(child.value, str):
+            counts[child.value] += 1
+    return counts
+
+
+def names_defined(node: ast.stmt) -> list[str]:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return [node.name]
+    if isinstance(node, ast.Assign):
+        return [child.id for target in node.targets for child in ast.walk(target) if isinstance(child, ast.Name)]
+    if isinstance(node, (ast.AnnAssign, ast.AugAssign)) and isinstance(node.target, ast.Name):
+        return [node.target.id]
+    return []
+
+
+def first_line(node: ast.stmt) -> int:
+    return min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])])
+
+
+class SourceModule:
+    '''
+    One repo module split into its top-level definitions, so a bundle can take just the
+    ones it needs. Imports are recorded per bound name; any other top-level statement
+    (the __main__ block, bare calls) is left out of bundles.
+    '''
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.path = os.path.join(HERE, f'{name}.py')
+        with open(self.path) as f:
+            self.source = f.read()
+        self.lines = self.source.splitlines()
+        # bound name -> (module, attribute or None for a plain import)
+        self.imports: dict[str, tuple[str, str | None]] = {}
+        # bound name -> indexes of the statements that define it
+        self.definitions: dict[str, list[int]] = {}
+        self.statements: list[ast.stmt] = []
+
+        for node in ast.parse(self.source).body:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    self.imports[alias.asname or alias.name.split('.')[0]] = (alias.name, None)
+            elif isinstance(node, ast.ImportFrom):
+                if node.level or node.module == '__future__':
+                    continue
+                for alias in node.names:
+                    self.imports[alias.asname or alias.name] = (node.module, alias.name)
+            else:
+                for bound in names_defined(node):
+                    self.definitions.setdefault(bound, []).append(len(self.statements))
+                self.statements.append(node)
+
+    def members(self, index: int) -> dict[str, list[ast.stmt]]:
+        # A class statement's methods and properties by name; a property's setter shares its getter's name
+        members: dict[str, list[ast.stmt]] = {}
+        node = self.statements[index]
+        if isinstance(node, ast.ClassDef):
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    members.setdefault(child.name, []).append(child)
+        return members
+
+    def segment(self, index: int, skipped: set[ast.AST] = frozenset()) -> str:
+        node = self.statements[index]
+        cut = set()
+        for child in getattr(node, 'body', []):
+            if child in skipped:
+                # A dropped member goes with the comments and blank lines above it
+                first = first_line(child)
+                while first > node.lineno + 1 and (not self.lines[first - 2].strip() or self.lines[first - 2].lstrip().startswith('#')):
+                    first -= 1
+                cut.update(range(first, child.end_lineno + 1))
+        return '\n'.join(self.lines[line - 1] for line in range(first_line(node), node.end_lineno + 1) if line not in cut)
+
+
+class Bundle:
+    '''
+    The transitive closure of the definitions an entry module's Trader needs, collected
+    across repo modules, with the external imports they use. Class members named in
+    `dropped` as (module, class, member) are left out, along with whatever only they used.
+    '''
+    def __init__(self, entry: str, lazy: set[str], dropped: set[tuple[str, str, str]] = frozenset()) -> None:
+        self.entry = entry
+        self.lazy = lazy
+        self.dropped = dropped
+        self.modules: dict[str, SourceModule] = {}
+        self.order: list[str] = []
+        self.included: dict[str, set[int]] = {}
+        self.external: dict[str, tuple[str, str | None]] = {}
+        self.owners: dict[str, str] = {}
+        self.aliases: list[str] = []
+
+        pending = [(entry, 'Trader')]
+        seen = set()
+        while pending:
+            module_name, name = pending.pop()
+            if (module_name, name) in seen:
+                continue
+            seen.add((module_name, name))
+            pending.extend(self.require(module_name, name))
+
+    def module(self, name: str) -> SourceModule:
+        if name not in self.modules:
+            self.modules[name] = SourceModule(name)
+            self.included[name] = set()
+        return self.modules[name]
+
+    def claim(self, bound: str, owner: str) -> None:
+        # Every module shares one namespace in the bundle, so a name can only mean one thing
+        previous = self.owners.setdefault(bound, owner)
+        if previous != owner:
+            raise ValueError(f'{bound} is both {previous} and {owner}; rename one of them to bundle')
+
+    def require(self, module_name: str, name: str) -> list[tuple[str, str]]:
+        module = self.module(module_name)
+        if name in module.definitions:
+            self.claim(name, f'{module_name}.{name}')
+            needed = []
+            for index in module.definitions[name]:
+                if index not in self.included[module_name]:
+                    self.included[module_name].add(index)
+                    needed.extend((module_name, used) for used in names_used(module.statements[index], self.skipped(module_name, index)))
+            return needed
+        if name in module.imports:
+            source, attribute = module.imports[name]
+            if is_local(source):
+                if source not in self.order:
+                    self.order.append(source)
+                if attribute is None:
+                    raise ValueError(f'{module_name} imports the repo module {source} whole; use from {source} import ...')
+                if attribute != name:
+                    self.aliases.append(f'{name} = {attribute}')
+                self.claim(attribute, f'{source}.{attribute}')
+                return [(source, attribute)]
+            self.claim(name, f'import {source}.{attribute}' if attribute else f'import {source}')
+            self.external[name] = (source, attribute)
+        # Anything else is a builtin or a local variable that shares a top-level name
+        return []
+
+    def skipped(self, module_name: str, index: int) -> set[ast.AST]:
+        module = self.modules[module_name]
+        node = module.statements[index]
+        return {member for name, members in module.members(index).items()
+                if (module_name, getattr(node, 'name', ''), name) in self.dropped for member in members}
+
+    def unused_members(self) -> set[tuple[str, str, str]]:
+        '''
+        Methods and properties of the bundled classes that nothing else in the bundle names,
+        as a name, an attribute or a string. Matching by name alone keeps anything that
+        could be reached. Dunders and the Trader.run the platform calls always stay.
+        '''
+        counts: Counter[str] = Counter()
+        for module_name, indexes in self.included.items():
+            for index in indexes:
+                counts.update(references(self.modules[module_name].statements[index], self.skipped(module_name, index)))
+
+        unused = set()
+        for module_name, indexes in self.included.items():
+            module = self.modules[module_name]
+            for index in indexes:
+                for name, members in module.members(index).items():
+                    key = (module_name, module.statements[index].name, name)
+                    if key in self.dropped or name.startswith('__') or key == (self.entry, 'Trader', 'run'):
+                        continue
+                    own = sum((references(member) for member in members), Counter())
+                    if counts[name] <= own[name]:
+                        unused.add(key)
+        return unused
+
+    def module_order(self) -> list[str]:
+        # Dependencies before dependants, so every module's definitions run in their original order
+        ordered: list[str] = []
+
+        def visit(name: str) -> None:
+            if name in ordered:
+                return
+            for source, _ in self.modules[name].imports.values():
+                if source in self.modules and source != name:
+                    visit(source)
+            ordered.append(name)
+
+        for name in self.modules:
+            visit(name)
+        return ordered
+
+    def import_lines(self) -> tuple[list[str], list[str]]:
+        # (import statements with one from-import per module, LazyModule stand-ins)
+        plain, grouped, lazy = set(), {}, []
+        for bound, (source, attribute) in sorted(self.external.items()):
+            if attribute is None and source.split('.')[0] in self.lazy:
+                lazy.append(f'{bound} = LazyModule({source!r}, {bound!r})')
+            elif attribute is None:
+                plain.add(f'import {source}' if bound == source.split('.')[0] else f'import {source} as {bound}')
+            else:
+                grouped.setdefault(source, set()).add(attribute if bound == attribute else f'{attribute} as {bound}')
+        if lazy:
+            plain.add('import importlib')
+            grouped.setdefault('typing', set()).add('Any')
+        lines = sorted(plain) + [f'from {source} import {", ".join(sorted(names))}' for source, names in sorted(grouped.items())]
+        return lines, lazy
+
+    def render(self, overrides: dict[str, Any]) -> str:
+        imports, lazy = self.import_lines()
+        header = [f'# Built by bundle.py from {self.entry}.py; edit the sources and rebuild rather than this file',
+                  'from __future__ import annotations', ''] + imports
+        sections = ['\n'.join(header)]
+        if lazy:
+            sections += [LAZY_MODULE_SOURCE.rstrip(), '\n'.join(lazy)]
+        for name in self.module_order():
+            module = self.modules[name]
+            indexes = sorted(self.included[name])
+            if indexes:
+                sections.append(f'# --- {name}.py\n\n' + '\n\n\n'.join(module.segment(index, self.skipped(name, index)) for index in indexes))
+        if self.aliases:
+            sections.append('\n'.join(self.aliases))
+        if overrides:
+            sections.append('\n'.join(f'Trader.{name} = {value!r}' for name, value in overrides.items()))
+        return '\n\n\n'.join(section for section in sections if section) + '\n'
+
+
+def build(entry: str, overrides: dict[str, Any] | None = None, lazy: set[str] | None = None) -> str:
+    # Dropping a member can leave others unused in turn, so collect until nothing more goes
+    dropped: set[tuple[str, str, str]] = set()
+    while True:
+        bundle = Bundle(entry, LAZY_MODULES if lazy is None else lazy, dropped)
+        unused = bundle.unused_members()
+        if not unused:
+            break
+        dropped |= unused
+    source = bundle.render(overrides or {})
+    tree = ast.parse(source)
+    leftover = [node.module for node in ast.walk(tree) if isinstance(node, ast.ImportFrom) and node.module and is_local(node.module)]
+    if leftover:
+        raise ValueError(f'bundle still imports repo modules {leftover}')
+    compile(tree, f'{entry}_bundle', 'exec')
+    return source
+
+
+MEASURE_SCRIPT = '''
+import contextlib, importlib.util, json, os, sys, time
+from datamodel import ConversionObservation, Observation, OrderDepth, TradingState
+
+spec = json.loads(sys.argv[2])
+order_depths = {}
+for product, (bids, asks) in spec['order_depths'].items():
+    order_depths[product] = OrderDepth()
+    order_depths[product].buy_orders = {int(price): volume for price, volume in bids.items()}
+    order_depths[product].sell_orders = {int(price): volume for price, volume in asks.items()}
+listings = {product: {'symbol': product, 'product': product, 'denomination': 'SEASHELLS'} for product in order_depths}
+conversions = {product: ConversionObservation(*fields) for product, fields in spec['conversions'].items()}
+state = TradingState('', spec['timestamp'], listings, order_depths, {}, {}, {}, Observation({}, conversions))
+
+# Times the imports LazyModule defers, so the report can show what the first tick paid for
+deferred = {}
+import_module = importlib.import_module
+def timed_import_module(name, *args):
+    if name in sys.modules:
+        return import_module(name, *args)
+    begin = time.perf_counter()
+    module = import_module(name, *args)
+    deferred[name] = (time.perf_counter() - begin) * 1000
+    return module
+importlib.import_module = timed_import_module
+
+with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+    start = time.perf_counter()
+    module_spec = importlib.util.spec_from_file_location('submission', sys.argv[1])
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    imported = time.perf_counter()
+    module.Trader().run(state)
+    done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'tick_ms': (done - imported) * 1000, 'deferred_ms': sum(deferred.values()),
+                  'deferred': sorted(deferred), 'numpy': 'numpy' in sys.modules}))
+'''
+
+
+def sample_state_spec() -> dict[str, Any]:
+    # One tick of bench.py's all-products books, as plain JSON for the measuring process
+    from bench import make_states
+    state = make_states(3, 1)[0]
+    return {
+        'timestamp': state.timestamp,
+        'order_depths': {product: [{str(price): volume for price, volume in depth.buy_orders.items()},
+                                   {str(price): volume for price, volume in depth.sell_orders.items()}]
+                         for product, depth in state.order_depths.items()},
+        'conversions': {product: [observation.bidPrice, observation.askPrice, observation.transportFees, observation.exportTariff,
+                                  observation.importTariff, observation.sunlight, observation.humidity]
+                        for product, observation in state.observations.conversionObservations.items()},
+    }
+
+
+def measure(path: str, repeat: int = 5, search_path: list[str] | None = None) -> dict[str, float]:
+    '''
+    Times importing the file at path and its first Trader().run in fresh interpreters and
+    returns the medians, with deferred_ms the part of the first tick spent in imports that
+    LazyModule put off. The process only sees datamodel's directory (plus search_path),
+    so a bundle that still needs a repo module fails here. datamodel is imported before
+    the clock starts, as it is the platform's and not the submission's.
+    '''
+    datamodel_dir = os.path.dirname(importlib.util.find_spec('datamodel').origin)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([datamodel_dir] + (search_path or [])), PYTHONDONTWRITEBYTECODE='1')
+    spec = json.dumps(sample_state_spec())
+    runs = []
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, '-c', MEASURE_SCRIPT, os.path.abspath(path), spec], cwd=cwd, env=env,
+                                    capture_output=True, text=True)
+            if output.returncode != 0:
+                raise RuntimeError(f'{path} failed to import or trade:\n{output.stderr}')
+            runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return {
+        'import_ms': statistics.median(run['import_ms'] for run in runs),
+        'tick_ms': statistics.median(run['tick_ms'] for run in runs),
+        'total_ms': statistics.median(run['import_ms'] + run['tick_ms'] for run in runs),
+        'deferred_ms': statistics.median(run['deferred_ms'] for run in runs),
+        'deferred': sorted({name for run in runs for name in run['deferred']}),
+        'numpy': any(run['numpy'] for run in runs),
+    }
+
+
+def report(timings: dict[str, Any]) -> str:
+    deferred = f' ({timings["deferred_ms"]:.1f} ms of it importing {", ".join(timings["deferred"])} on first use)' if timings['deferred'] else ''
+    never = '' if timings['numpy'] else ', numpy never imported'
+    return f'import {timings["import_ms"]:.1f} ms, first tick {timings["tick_ms"]:.1f} ms{deferred}, total {timings["total_ms"]:.1f} ms{never}'
+
+
+def parse_override(spec: str) -> tuple[str, Any]:
+    # NAME=JSON, or NAME=@file.json to embed a file such as an exported ORCHIDS_MODEL
+    name, value = spec.split('=', 1)
+    if value.startswith('@'):
+        with open(value[1:]) as f:
+            return name, json.load(f)
+    return name, json.loads(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build a single-file submission from a trader module and check its cold start time')
+    parser.add_argument('trader', help='trader module name, e.g. trader_orchids')
+    parser.add_argument('--out', help='default submission/<trader>.py')
+    parser.add_argument('--param', action='append', default=[], type=parse_override, help='Trader attribute baked in, NAME=JSON or NAME=@file.json')
+    parser.add_argument('--eager', action='store_true', help='import numpy and friends at import time instead of on first use')
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS, help='limit for import plus first tick, deferred imports included')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--compare', action='store_true', help='also time the unbundled trader module')
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(HERE, 'submission', f'{args.trader}.py')
+    source = build(args.trader, dict(args.param), set() if args.eager else None)
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        f.write(source)
+    print(f'{out}: {len(source.splitlines()):,} lines')
+
+    timings = measure(out, args.repeat)
+    print(report(timings))
+    if args.compare:
+        original = measure(os.path.join(HERE, f'{args.trader}.py'), args.repeat, [HERE])
+        print(f'unbundled {args.trader}.py: {report(original)}')
+    # The budget is for the whole cold start, so imports deferred into the first tick count
+    if timings['total_ms'] > args.budget_ms:
+        print(f'OVER BUDGET: {timings["total_ms"]:.1f} ms > {args.budget_ms:.0f} ms for import plus first tick')
+        sys.exit(1)
+    print(f'Within the {args.budget_ms:.0f} ms budget for import plus first tick')
+
+
+if __name__ == '__main__':
+    main()
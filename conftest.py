@@ -0,0 +1,16 @@
+import pytest
+
+from backtester import DayData, load_day
+from synthetic import MarketGenerator, write_day
+
+# bundle.py writes single-file copies of the traders, test_trader.py included, to
+# submission/; they are build output, not tests
+collect_ignore = ['submission', 'synthetic_data']
+
+
+@pytest.fixture(scope='session')
+def synthetic_day(tmp_path_factory: pytest.TempPathFactory) -> DayData:
+    # A seeded synthetic round 3 day, which has every product the traders handle
+    out_dir = str(tmp_path_factory.mktemp('synthetic'))
+    write_day(MarketGenerator(seed=0, ticks_per_day=3000), out_dir, 3, 1)
+    return load_day(out_dir, 3, 1)
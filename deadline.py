@@ -0,0 +1,68 @@
+import time
+from typing import Any, Callable
+
+from profiling import Profiler
+
+
+class DeadlineRunner:
+    '''
+    Runs a tick's strategies, in the order they are called, against a time budget.
+    A strategy whose typical cost (an EWMA of its past run times) no longer fits in the
+    time left is skipped and the given default is returned, and its cost estimate decays
+    so it is tried again later. Stages that must run every tick go through always(); their
+    costs are learned the same way, and those still to come this tick are kept free of
+    strategies. Skips are listed in `skipped` for the current tick and counted in the
+    profiler report.
+    '''
+    def __init__(self, profiler: Profiler, alpha: float = 0.2) -> None:
+        self.profiler = profiler
+        self.alpha = alpha
+        self.costs: dict[str, float] = {}
+        # Stages run through always(), and the ones already run this tick
+        self.required: dict[str, None] = {}
+        self.done: set[str] = set()
+        self.deadline: int | None = None
+        self.skipped: list[str] = []
+
+    def start(self, budget_ms: float | None) -> None:
+        self.skipped = []
+        self.done = set()
+        self.deadline = None if budget_ms is None else time.perf_counter_ns() + int(budget_ms * 1_000_000)
+
+    def pending(self) -> float:
+        # Expected cost of the required stages that have not run yet this tick
+        return sum(self.costs.get(stage, 0.0) for stage in self.required if stage not in self.done)
+
+    def learn(self, stage: str, elapsed: int) -> None:
+        cost = self.costs.get(stage)
+        self.costs[stage] = elapsed if cost is None else cost + self.alpha * (elapsed - cost)
+        if self.profiler.enabled:
+            self.profiler.record(stage, elapsed)
+
+    def run(self, stage: str, default: Any, func: Callable[..., Any], *args: Any) -> Any:
+        start = time.perf_counter_ns()
+        cost = self.costs.get(stage)
+        if self.deadline is not None and start + (cost or 0.0) + self.pending() > self.deadline:
+            # Decay the estimate so one slow outlier does not skip the strategy for good.
+            # Orders from an earlier tick were sized for an earlier position, so nothing is reused
+            if cost is not None:
+                self.costs[stage] = cost * (1 - self.alpha)
+            self.skipped.append(stage)
+            self.profiler.skip(stage)
+            return default
+
+        result = func(*args)
+        self.learn(stage, time.perf_counter_ns() - start)
+        return result
+
+    def always(self, stage: str, func: Callable[..., Any], *args: Any) -> Any:
+        # A stage that is never skipped, such as saving state; timed only when a budget or
+        # the profiler needs it, so without either this is a plain call
+        self.required[stage] = None
+        if self.deadline is None and not self.profiler.enabled:
+            return func(*args)
+        start = time.perf_counter_ns()
+        result = func(*args)
+        self.learn(stage, time.perf_counter_ns() - start)
+        self.done.add(stage)
+        return result
@@ -0,0 +1,120 @@
+import math
+from array import array
+from typing import Callable
+
+import numpy as np
+
+from rolling import LagWindow
+
+# Series derived from a mid price, each available at lags 0..N
+SERIES = ('price', 'return', 'log_return')
+
+
+def column_names(lags: int) -> list[str]:
+    # Same names as the notebooks' shift() columns: price, price_lag1, ..., log_return_lag4
+    return [name if lag == 0 else f'{name}_lag{lag}' for name in SERIES for lag in range(lags + 1)]
+
+
+def shift(values: np.ndarray, lag: int) -> np.ndarray:
+    # pandas Series.shift(lag) on an array
+    if lag == 0:
+        return values
+    shifted = np.full_like(values, np.nan)
+    shifted[lag:] = values[:-lag]
+    return shifted
+
+
+def elementwise(func: Callable[[float], float], values: np.ndarray) -> np.ndarray:
+    # func (math.log, math.exp) one float at a time, the libm call the per-tick path makes.
+    # NumPy's vectorised log and exp differ from it in the last bit on a few percent of inputs
+    values = np.asarray(values, dtype=np.float64)
+    return np.fromiter(map(func, values.ravel().tolist()), np.float64, values.size).reshape(values.shape)
+
+
+def batch_features(prices: np.ndarray, lags: int) -> dict[str, np.ndarray]:
+    '''
+    Every feature for a whole day of prices at once, keyed by column_names(lags) and
+    NaN where pandas' shift / pct_change would give NaN, so
+    pd.DataFrame(batch_features(prices, 4)) is a drop-in for the notebook frames.
+    '''
+    prices = np.asarray(prices, dtype=np.float64)
+    ratio = prices / shift(prices, 1)
+    series = {'price': prices, 'return': ratio - 1, 'log_return': elementwise(math.log, ratio)}
+    columns = {}
+    for name in SERIES:
+        for lag in range(lags + 1):
+            columns[name if lag == 0 else f'{name}_lag{lag}'] = shift(series[name], lag)
+    return columns
+
+
+def lag_matrix(values: np.ndarray, lags: int) -> np.ndarray:
+    '''
+    Every LagWindow(lags) a streamed series passes through, one row per tick: row t is
+    values[t], values[t - 1], ..., values[t - lags + 1], with NaN before the window fills.
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    return np.column_stack([shift(values, lag) for lag in range(lags)])
+
+
+def lag_dot(matrix: np.ndarray, coefs: list[float]) -> np.ndarray:
+    # LagWindow.dot for every row of a lag_matrix. Adding the products one lag at a time, in
+    # the order the per-tick loop does, makes the two agree bitwise, which matmul does not
+    total = np.zeros(len(matrix))
+    for lag, coef in enumerate(coefs):
+        total += matrix[:, lag] * coef
+    return total
+
+
+class FeatureEngine:
+    '''
+    The streaming side of batch_features: push one price per tick and read the current
+    row. Each series sits in a LagWindow, so a push is O(1) and an AR prediction is
+    windows[name].dot(coefs). It works on plain floats with math.log, the same float64
+    operations batch mode makes element by element, so the two produce identical values
+    and coefficients fitted offline on batch_features apply unchanged live.
+    '''
+    def __init__(self, lags: int) -> None:
+        self.lags = lags
+        self.windows = {name: LagWindow(lags + 1, fill=math.nan) for name in SERIES}
+        self.prev = math.nan
+        self.count = 0
+
+    def push(self, price: float) -> None:
+        price = float(price)
+        ratio = price / self.prev
+        self.windows['price'].push(price)
+        self.windows['return'].push(ratio - 1)
+        self.windows['log_return'].push(math.log(ratio))
+        self.prev = price
+        self.count += 1
+
+    def ready(self, name: str) -> bool:
+        # Whether every lag of the series is defined; returns need one extra price
+        return self.count > self.lags + (name != 'price')
+
+    def row(self) -> list[float]:
+        # The current values in column_names order, the last row of batch_features
+        return [value for name in SERIES for value in self.windows[name].values]
+
+    def reset(self) -> None:
+        for window in self.windows.values():
+            window.reset()
+        self.prev = math.nan
+        self.count = 0
+
+    def get_state(self) -> tuple[list[float], array]:
+        header = [self.count, self.prev]
+        values = array('d')
+        for name in SERIES:
+            window_header, window_values = self.windows[name].get_state()
+            header += window_header
+            values += window_values
+        return header, values
+
+    def set_state(self, header: list[float], values: list[float]) -> None:
+        size = self.lags + 1
+        if len(header) != 2 + 2 * len(SERIES) or len(values) != size * len(SERIES):
+            return
+        self.count, self.prev = int(header[0]), header[1]
+        for i, name in enumerate(SERIES):
+            self.windows[name].set_state(header[2 + 2 * i:4 + 2 * i], values[size * i:size * (i + 1)])
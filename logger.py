@@ -0,0 +1,167 @@
+import json
+from typing import Any
+
+from datamodel import Listing, Observation, Order, OrderDepth, ProsperityEncoder, Symbol, Trade, TradingState
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+OFF = 100
+
+
+def discard(*args: Any, **kwargs: Any) -> None:
+    pass
+
+
+class Logger:
+    '''
+    Collects log lines for the visualizer payload printed by flush. Messages take a
+    %-style format string and are only formatted if their level is enabled and the
+    buffer is still within the part of the payload flush can keep. Methods below the
+    active level are replaced with a no-op, and OFF also turns flush into a no-op.
+    '''
+    def __init__(self, level: int = INFO) -> None:
+        self.parts: list[str] = []
+        self.length = 0
+        self.max_log_length = 3750
+        self.set_level(level)
+
+    def set_level(self, level: int) -> None:
+        self.level = level
+        for name, method_level in (("debug", DEBUG), ("info", INFO), ("print", INFO), ("warning", WARNING)):
+            if method_level < level:
+                setattr(self, name, discard)
+            else:
+                self.__dict__.pop(name, None)
+
+        if level >= OFF:
+            self.flush = discard
+        else:
+            self.__dict__.pop("flush", None)
+
+    @property
+    def budget(self) -> int:
+        # flush keeps at most a third of max_log_length of logs, anything past that is cut
+        return self.max_log_length // 3
+
+    def log(self, level: int, message: str, *args: Any) -> None:
+        if level < self.level or self.length > self.budget:
+            return
+        self.write((message % args if args else message) + "\n")
+
+    def debug(self, message: str, *args: Any) -> None:
+        self.log(DEBUG, message, *args)
+
+    def info(self, message: str, *args: Any) -> None:
+        self.log(INFO, message, *args)
+
+    def warning(self, message: str, *args: Any) -> None:
+        self.log(WARNING, message, *args)
+
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n") -> None:
+        if self.length > self.budget:
+            return
+        self.write(sep.join(map(str, objects)) + end)
+
+    def write(self, text: str) -> None:
+        self.parts.append(text)
+        self.length += len(text)
+
+    def flush(self, state: TradingState, orders: dict[Symbol, list[Order]], conversions: int, trader_data: str) -> None:
+        # Everything except the three free-form strings is encoded exactly once
+        timestamp = self.to_json(state.timestamp)
+        state_tail = self.to_json([
+            self.compress_listings(state.listings),
+            self.compress_order_depths(state.order_depths),
+            self.compress_trades(state.own_trades),
+            self.compress_trades(state.market_trades),
+            state.position,
+            self.compress_observations(state.observations),
+        ])[1:-1]
+        compressed_orders = self.to_json(self.compress_orders(orders))
+        encoded_conversions = self.to_json(conversions)
+
+        base_length = len(self.assemble(timestamp, '""', state_tail, compressed_orders, encoded_conversions, '""', '""'))
+
+        # We truncate state.traderData, trader_data, and the logs to the same max. length to fit the log limit
+        max_item_length = (self.max_log_length - base_length) // 3
+
+        print(self.assemble(
+            timestamp,
+            self.to_json(self.truncate(state.traderData, max_item_length)),
+            state_tail,
+            compressed_orders,
+            encoded_conversions,
+            self.to_json(self.truncate(trader_data, max_item_length)),
+            self.to_json(self.truncate("".join(self.parts), max_item_length)),
+        ))
+
+        self.parts = []
+        self.length = 0
+
+    def assemble(self, timestamp: str, state_trader_data: str, state_tail: str, orders: str, conversions: str, trader_data: str, logs: str) -> str:
+        # Splices pre-encoded JSON into the visualizer's layout: [[timestamp, traderData, listings, order depths,
+        # own trades, market trades, position, observations], orders, conversions, trader_data, logs]
+        return f"[[{timestamp},{state_trader_data},{state_tail}],{orders},{conversions},{trader_data},{logs}]"
+
+    def compress_listings(self, listings: dict[Symbol, Listing]) -> list[list[Any]]:
+        compressed = []
+        for listing in listings.values():
+            compressed.append([listing["symbol"], listing["product"], listing["denomination"]])
+
+        return compressed
+
+    def compress_order_depths(self, order_depths: dict[Symbol, OrderDepth]) -> dict[Symbol, list[Any]]:
+        compressed = {}
+        for symbol, order_depth in order_depths.items():
+            compressed[symbol] = [order_depth.buy_orders, order_depth.sell_orders]
+
+        return compressed
+
+    def compress_trades(self, trades: dict[Symbol, list[Trade]]) -> list[list[Any]]:
+        compressed = []
+        for arr in trades.values():
+            for trade in arr:
+                compressed.append([
+                    trade.symbol,
+                    trade.price,
+                    trade.quantity,
+                    trade.buyer,
+                    trade.seller,
+                    trade.timestamp,
+                ])
+
+        return compressed
+
+    def compress_observations(self, observations: Observation) -> list[Any]:
+        conversion_observations = {}
+        for product, observation in observations.conversionObservations.items():
+            conversion_observations[product] = [
+                observation.bidPrice,
+                observation.askPrice,
+                observation.transportFees,
+                observation.exportTariff,
+                observation.importTariff,
+                observation.sunlight,
+                observation.humidity,
+            ]
+
+        return [observations.plainValueObservations, conversion_observations]
+
+    def compress_orders(self, orders: dict[Symbol, list[Order]]) -> list[list[Any]]:
+        compressed = []
+        for arr in orders.values():
+            for order in arr:
+                compressed.append([order.symbol, order.price, order.quantity])
+
+        return compressed
+
+    def to_json(self, value: Any) -> str:
+        return json.dumps(value, cls=ProsperityEncoder, separators=(",", ":"))
+
+    def truncate(self, value: str, max_length: int) -> str:
+        if len(value) <= max_length:
+            return value
+
+        return value[:max_length - 3] + "..."
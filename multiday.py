@@ -0,0 +1,162 @@
+import argparse
+import csv
+import glob
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+
+import numpy as np
+
+from backtester import POSITION_LIMITS, Backtester, BacktestResult, load_day, load_trader
+
+DAY_PATTERN = re.compile(r'prices_round_(-?\d+)_day_(-?\d+)(?:\.csv)?$')
+PRODUCT_FIELDS = ['round', 'day', 'product', 'pnl', 'max_drawdown', 'mean_utilization', 'peak_utilization']
+
+
+def find_days(data_dir: str, rounds: list[int] | None = None) -> list[tuple[int, int]]:
+    # Every prices_round_R_day_D.csv or converted tick store in data_dir, sorted
+    days = set()
+    for path in glob.glob(os.path.join(data_dir, 'prices_round_*_day_*')):
+        match = DAY_PATTERN.search(os.path.basename(path))
+        if match:
+            days.add((int(match.group(1)), int(match.group(2))))
+    return sorted(day for day in days if rounds is None or day[0] in rounds)
+
+
+def max_drawdown(pnl: np.ndarray) -> np.ndarray:
+    # Largest fall from a running peak, per column
+    if not len(pnl):
+        return np.zeros(pnl.shape[1:])
+    return (np.maximum.accumulate(pnl, axis=0) - pnl).max(axis=0)
+
+
+def summarize(result: BacktestResult, position_limits: dict[str, int]) -> dict[str, Any]:
+    '''
+    Reduces a day's BacktestResult to the numbers the reports need, so workers send back a
+    few floats per product instead of every tick and trade.
+    '''
+    limits = np.array([position_limits.get(product, 0) for product in result.products], dtype=np.float64)
+    held = np.abs(result.position_history)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilization = np.where(limits > 0, held / limits, 0.0)
+    num_ticks = len(result.timestamps)
+    products = {}
+    for i, product in enumerate(result.products):
+        products[product] = {
+            'pnl': float(result.pnl[-1, i]) if num_ticks else 0.0,
+            'max_drawdown': float(max_drawdown(result.pnl[:, i:i + 1])[0]),
+            'mean_utilization': float(utilization[:, i].mean()) if num_ticks else 0.0,
+            'peak_utilization': float(utilization[:, i].max()) if num_ticks else 0.0,
+        }
+    return {
+        'products': products,
+        'total_pnl': result.total_pnl,
+        'max_drawdown': float(max_drawdown(result.pnl.sum(axis=1, keepdims=True))[0]),
+        'ticks': num_ticks,
+        'elapsed': result.elapsed,
+    }
+
+
+def run_day(trader_module: str, data_dir: str, round_num: int, day: int) -> dict[str, Any]:
+    start = time.perf_counter()
+    data = load_day(data_dir, round_num, day)
+    loaded = time.perf_counter() - start
+    summary = summarize(Backtester(load_trader(trader_module)).run(data), POSITION_LIMITS)
+    summary['load'] = loaded
+    return summary
+
+
+def run_days(trader_module: str, days: list[tuple[int, int]], data_dir: str, workers: int | None = None) -> dict[tuple[int, int], dict[str, Any]]:
+    '''
+    Backtests every day in its own process, one worker per day unless workers says
+    otherwise, so the whole pass takes about as long as the slowest day. Days that raise
+    are reported and left out of the results.
+    '''
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers or len(days) or 1) as pool:
+        futures = {pool.submit(run_day, trader_module, data_dir, round_num, day): (round_num, day) for round_num, day in days}
+        for future in as_completed(futures):
+            round_num, day = futures[future]
+            try:
+                results[round_num, day] = future.result()
+            except Exception as e:
+                print(f'FAILED round {round_num} day {day}: {e!r}')
+                continue
+            print(f'Round {round_num} day {day}: {results[round_num, day]["total_pnl"]:,.1f}')
+    return dict(sorted(results.items()))
+
+
+def day_table(results: dict[tuple[int, int], dict[str, Any]]) -> str:
+    lines = [f'{"round":>6}{"day":>5}{"pnl":>14}{"drawdown":>12}{"ticks":>8}{"load s":>8}{"run s":>8}']
+    for (round_num, day), summary in results.items():
+        lines.append(f'{round_num:>6}{day:>5}{summary["total_pnl"]:>14,.1f}{summary["max_drawdown"]:>12,.1f}{summary["ticks"]:>8}{summary["load"]:>8.2f}{summary["elapsed"]:>8.2f}')
+    lines.append(f'{"total":>11}{sum(summary["total_pnl"] for summary in results.values()):>14,.1f}')
+    return '\n'.join(lines)
+
+
+def product_table(results: dict[tuple[int, int], dict[str, Any]]) -> str:
+    '''
+    Per product over every day it traded: summed PnL, the worst single day drawdown, the
+    mean of the daily average utilization and the highest utilization reached.
+    '''
+    merged: dict[str, list[dict[str, float]]] = {}
+    for summary in results.values():
+        for product, stats in summary['products'].items():
+            merged.setdefault(product, []).append(stats)
+
+    lines = [f'{"product":<14}{"days":>5}{"pnl":>14}{"drawdown":>12}{"mean util":>11}{"peak util":>11}']
+    for product in sorted(merged):
+        days = merged[product]
+        lines.append(
+            f'{product:<14}{len(days):>5}'
+            f'{sum(stats["pnl"] for stats in days):>14,.1f}'
+            f'{max(stats["max_drawdown"] for stats in days):>12,.1f}'
+            f'{np.mean([stats["mean_utilization"] for stats in days]):>11.1%}'
+            f'{max(stats["peak_utilization"] for stats in days):>11.1%}'
+        )
+    return '\n'.join(lines)
+
+
+def write_csv(results: dict[tuple[int, int], dict[str, Any]], path: str) -> None:
+    # One row per (day, product) for comparing runs in a notebook
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=PRODUCT_FIELDS)
+        writer.writeheader()
+        for (round_num, day), summary in results.items():
+            for product, stats in summary['products'].items():
+                writer.writerow({'round': round_num, 'day': day, 'product': product, **stats})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Backtest one trader over many days in parallel and merge the results')
+    parser.add_argument('trader', help='trader module name, e.g. trader_orchids')
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--rounds', type=int, nargs='+', help='only these rounds; every day found by default')
+    parser.add_argument('--workers', type=int, help='default one per day')
+    parser.add_argument('--csv', help='also write per day, per product rows to this file')
+    args = parser.parse_args()
+
+    days = find_days(args.data_dir, args.rounds)
+    if not days:
+        parser.error(f'no prices_round_*_day_* files in {args.data_dir}')
+
+    start = time.perf_counter()
+    results = run_days(args.trader, days, args.data_dir, args.workers)
+    wall = time.perf_counter() - start
+
+    print()
+    print(day_table(results))
+    print()
+    print(product_table(results))
+    if results:
+        slowest = max(summary['load'] + summary['elapsed'] for summary in results.values())
+        serial = sum(summary['load'] + summary['elapsed'] for summary in results.values())
+        print(f'\n{len(results)} days in {wall:.1f}s wall, slowest day {slowest:.1f}s, {serial:.1f}s run one after another')
+    if args.csv:
+        write_csv(results, args.csv)
+
+
+if __name__ == '__main__':
+    main()
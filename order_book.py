@@ -0,0 +1,131 @@
+import numpy as np
+
+from datamodel import Order, OrderDepth, Trade
+
+
+class OrderBook:
+    '''
+    Matching engine for simulated fills. Price levels, market trades, positions and cash
+    live in arrays preallocated per product, so loading and matching a tick never
+    allocates a dict. Rows follow the order of `products`, levels are stored best first.
+    '''
+    def __init__(self, products: list[str], position_limits: dict[str, int], depth: int = 3, max_trades: int = 64) -> None:
+        self.products = list(products)
+        self.index = {product: i for i, product in enumerate(self.products)}
+        self.depth = depth
+        self.max_trades = max_trades
+        n = len(self.products)
+
+        self.bid_prices = np.zeros((n, depth), dtype=np.int64)
+        self.bid_volumes = np.zeros((n, depth), dtype=np.int64)
+        self.bid_count = np.zeros(n, dtype=np.int64)
+        self.ask_prices = np.zeros((n, depth), dtype=np.int64)
+        self.ask_volumes = np.zeros((n, depth), dtype=np.int64)
+        self.ask_count = np.zeros(n, dtype=np.int64)
+
+        self.trade_prices = np.zeros((n, max_trades), dtype=np.int64)
+        self.trade_volumes = np.zeros((n, max_trades), dtype=np.int64)
+        self.trade_count = np.zeros(n, dtype=np.int64)
+
+        self.limits = np.array([position_limits.get(product, 0) for product in self.products], dtype=np.int64)
+        self.positions = np.zeros(n, dtype=np.int64)
+        self.cash = np.zeros(n, dtype=np.float64)
+
+    def load(self, order_depths: dict[str, OrderDepth], market_trades: dict[str, list[Trade]]) -> None:
+        self.bid_count[:] = 0
+        self.ask_count[:] = 0
+        self.trade_count[:] = 0
+
+        for product, order_depth in order_depths.items():
+            i = self.index.get(product)
+            if i is None:
+                continue
+            bids = sorted(order_depth.buy_orders.items(), reverse=True)[:self.depth]
+            asks = sorted(order_depth.sell_orders.items())[:self.depth]
+            for level, (price, volume) in enumerate(bids):
+                self.bid_prices[i, level] = price
+                self.bid_volumes[i, level] = volume
+            for level, (price, volume) in enumerate(asks):
+                self.ask_prices[i, level] = price
+                self.ask_volumes[i, level] = -volume
+            self.bid_count[i] = len(bids)
+            self.ask_count[i] = len(asks)
+
+        for product, trades in market_trades.items():
+            i = self.index.get(product)
+            if i is None:
+                continue
+            trades = trades[:self.max_trades]
+            for k, trade in enumerate(trades):
+                self.trade_prices[i, k] = trade.price
+                self.trade_volumes[i, k] = trade.quantity
+            self.trade_count[i] = len(trades)
+
+    def within_limits(self, i: int, orders: list[Order]) -> bool:
+        # The exchange cancels every order for a product if they could breach the limit when all filled
+        total_buy = sum(order.quantity for order in orders if order.quantity > 0)
+        total_sell = sum(-order.quantity for order in orders if order.quantity < 0)
+        position, limit = self.positions[i], self.limits[i]
+        return position + total_buy <= limit and position - total_sell >= -limit
+
+    def match(self, product: str, orders: list[Order], timestamp: int) -> list[Trade]:
+        '''
+        Fills orders against the loaded book levels at the level price, then against the
+        market trades at the order price. Volume taken by one order is not available to
+        the next, and all orders are rejected if they breach the position limit.
+        '''
+        i = self.index.get(product)
+        if i is None or not orders or not self.within_limits(i, orders):
+            return []
+
+        fills = []
+        for order in orders:
+            is_buy = order.quantity > 0
+            if is_buy:
+                prices = self.ask_prices[i, :self.ask_count[i]]
+                volumes = self.ask_volumes[i, :self.ask_count[i]]
+                eligible = prices <= order.price
+            else:
+                prices = self.bid_prices[i, :self.bid_count[i]]
+                volumes = self.bid_volumes[i, :self.bid_count[i]]
+                eligible = prices >= order.price
+            taken = sweep(volumes, eligible, abs(order.quantity))
+            for level in np.flatnonzero(taken):
+                fills.append(self.fill(i, int(prices[level]), int(taken[level]), is_buy, timestamp))
+
+            remaining = abs(order.quantity) - int(taken.sum())
+            if remaining == 0 or self.trade_count[i] == 0:
+                continue
+            trade_prices = self.trade_prices[i, :self.trade_count[i]]
+            trade_volumes = self.trade_volumes[i, :self.trade_count[i]]
+            eligible = trade_prices <= order.price if is_buy else trade_prices >= order.price
+            taken = sweep(trade_volumes, eligible, remaining)
+            if taken.any():
+                fills.append(self.fill(i, order.price, int(taken.sum()), is_buy, timestamp))
+
+        return fills
+
+    def fill(self, i: int, price: int, quantity: int, is_buy: bool, timestamp: int) -> Trade:
+        product = self.products[i]
+        if is_buy:
+            self.positions[i] += quantity
+            self.cash[i] -= price * quantity
+            return Trade(product, price, quantity, 'SUBMISSION', '', timestamp)
+        self.positions[i] -= quantity
+        self.cash[i] += price * quantity
+        return Trade(product, price, quantity, '', 'SUBMISSION', timestamp)
+
+    def position_dict(self) -> dict[str, int]:
+        return {product: int(self.positions[i]) for i, product in enumerate(self.products) if self.positions[i] != 0}
+
+
+def sweep(volumes: np.ndarray, eligible: np.ndarray, quantity: int) -> np.ndarray:
+    '''
+    Takes up to `quantity` from the eligible levels in order and removes it from
+    `volumes` in place. Returns the amount taken from each level.
+    '''
+    available = np.where(eligible, volumes, 0)
+    taken_before = np.cumsum(available) - available
+    taken = np.clip(quantity - taken_before, 0, available)
+    volumes -= taken
+    return taken
@@ -1,115 +1,34 @@
+# Imports helpers from this repo, so it cannot be pasted into the platform as it is: submit
+# the single file `python bundle.py price_regress` writes to submission/price_regress.py instead
 from datamodel import OrderDepth, TradingState, Order
 from typing import List
 import numpy as np
-import collections
 import json
 from datamodel import Listing, Observation, Order, OrderDepth, ProsperityEncoder, Symbol, Trade, TradingState
 from typing import Any
-
-class Logger:
-    def __init__(self) -> None:
-        self.logs = ""
-        self.max_log_length = 3750
-
-    def print(self, *objects: Any, sep: str = " ", end: str = "\n") -> None:
-        self.logs += sep.join(map(str, objects)) + end
-
-    def flush(self, state: TradingState, orders: dict[Symbol, list[Order]], conversions: int, trader_data: str) -> None:
-        base_length = len(self.to_json([
-            self.compress_state(state, ""),
-            self.compress_orders(orders),
-            conversions,
-            "",
-            "",
-        ]))
-
-        # We truncate state.traderData, trader_data, and self.logs to the same max. length to fit the log limit
-        max_item_length = (self.max_log_length - base_length) // 3
-
-        print(self.to_json([
-            self.compress_state(state, self.truncate(state.traderData, max_item_length)),
-            self.compress_orders(orders),
-            conversions,
-            self.truncate(trader_data, max_item_length),
-            self.truncate(self.logs, max_item_length),
-        ]))
-
-        self.logs = ""
-
-    def compress_state(self, state: TradingState, trader_data: str) -> list[Any]:
-        return [
-            state.timestamp,
-            trader_data,
-            self.compress_listings(state.listings),
-            self.compress_order_depths(state.order_depths),
-            self.compress_trades(state.own_trades),
-            self.compress_trades(state.market_trades),
-            state.position,
-            self.compress_observations(state.observations),
-        ]
-
-    def compress_listings(self, listings: dict[Symbol, Listing]) -> list[list[Any]]:
-        compressed = []
-        for listing in listings.values():
-            compressed.append([listing["symbol"], listing["product"], listing["denomination"]])
-
-        return compressed
-
-    def compress_order_depths(self, order_depths: dict[Symbol, OrderDepth]) -> dict[Symbol, list[Any]]:
-        compressed = {}
-        for symbol, order_depth in order_depths.items():
-            compressed[symbol] = [order_depth.buy_orders, order_depth.sell_orders]
-
-        return compressed
-
-    def compress_trades(self, trades: dict[Symbol, list[Trade]]) -> list[list[Any]]:
-        compressed = []
-        for arr in trades.values():
-            for trade in arr:
-                compressed.append([
-                    trade.symbol,
-                    trade.price,
-                    trade.quantity,
-                    trade.buyer,
-                    trade.seller,
-                    trade.timestamp,
-                ])
-
-        return compressed
-
-    def compress_observations(self, observations: Observation) -> list[Any]:
-        conversion_observations = {}
-        for product, observation in observations.conversionObservations.items():
-            conversion_observations[product] = [
-                observation.bidPrice,
-                observation.askPrice,
-                observation.transportFees,
-                observation.exportTariff,
-                observation.importTariff,
-                observation.sunlight,
-                observation.humidity,
-            ]
-
-        return [observations.plainValueObservations, conversion_observations]
-
-    def compress_orders(self, orders: dict[Symbol, list[Order]]) -> list[list[Any]]:
-        compressed = []
-        for arr in orders.values():
-            for order in arr:
-                compressed.append([order.symbol, order.price, order.quantity])
-
-        return compressed
-
-    def to_json(self, value: Any) -> str:
-        return json.dumps(value, cls=ProsperityEncoder, separators=(",", ":"))
-
-    def truncate(self, value: str, max_length: int) -> str:
-        if len(value) <= max_length:
-            return value
-
-        return value[:max_length - 3] + "..."
-
-logger = Logger()
+from logger import Logger
+from profiling import Profiler
+from deadline import DeadlineRunner
+from book_snapshot import BookSnapshot, snapshot_books
+from features import lag_dot, lag_matrix
+from rolling import LagWindow
+from rls import RecursiveLeastSquares
+from state_codec import decode_state, encode_state
+
+
+class RunState:
+    '''
+    Everything a Trader accumulates over a run. Each Trader owns one, so traders replayed
+    side by side in one process never share positions or caches. It is built from the
+    trader's parameters, so Trader.reset() after changing them starts a consistent run.
+    '''
+    def __init__(self, trader: 'Trader') -> None:
+        self.positions = {product: 0 for product in trader.POSITION_LIMITS}
+        self.starfruit_cache = LagWindow(len(trader.STARFRUIT_COEF))
+        # Online STARFRUIT fit, created on first use when STARFRUIT_FORGETTING is set
+        self.starfruit_rls: RecursiveLeastSquares | None = None
+        # traderData as last saved or loaded
+        self.trader_data = ''
 
 
 class Trader:
@@ -119,190 +38,254 @@ class Trader:
  0.20454692911372097,
  0.19720337509805655]
     STARFRUIT_INT = 11.802383435338925
-    starfruit_cache = []
     POSITION_LIMITS = {'AMETHYSTS': 20, 'STARFRUIT': 20, 'CHOCOLATE': 250, 'STRAWBERRIES': 350, 'ROSES': 60, 'GIFT_BASKET': 60} 
-    POSITIONS = {'AMETHYSTS': 0, 'STARFRUIT': 0, 'CHOCOLATE': 0, 'STRAWBERRIES': 0, 'ROSES': 0, 'GIFT_BASKET': 0}
-    curr_starfruit_price = 0
+    STATE_VERSION = 1
+    # Per-tick time budget in milliseconds, None runs every strategy
+    TIME_BUDGET_MS = None
+    # Forgetting factor for re-fitting STARFRUIT_COEF online, None keeps the fixed fit
+    STARFRUIT_FORGETTING = None
 
     basket_std = 162
 
-    def calc_starfruit_price(self):
-        if len(self.starfruit_cache) < 4:
+    def __init__(self) -> None:
+        # Per trader, so traders replayed side by side never share a log buffer or timings
+        self.logger = Logger()
+        self.profiler = Profiler()
+        self.reset()
+
+    def reset(self) -> None:
+        # Forgets every earlier tick; also needed after changing parameters on an instance
+        self.run_state = RunState(self)
+        self.runner = DeadlineRunner(self.profiler)
+
+    def save_state(self) -> str:
+        self.run_state.trader_data = encode_state(self.STATE_VERSION, [
+            *self.run_state.starfruit_cache.get_state(),
+            *(self.run_state.starfruit_rls.get_state() if self.run_state.starfruit_rls is not None else []),
+        ])
+        return self.run_state.trader_data
+
+    def load_state(self, trader_data: str) -> None:
+        # Restores the cache when the platform has started a fresh process
+        sections = decode_state(self.STATE_VERSION, trader_data)
+        if sections is None or len(sections) not in (2, 4):
+            return
+        self.run_state.starfruit_cache.set_state(sections[0], sections[1])
+        if len(sections) == 4 and self.starfruit_model() is not None:
+            self.run_state.starfruit_rls.set_state(sections[2], sections[3])
+        self.run_state.trader_data = trader_data
+
+    def starfruit_model(self) -> RecursiveLeastSquares | None:
+        # Created on first use so STARFRUIT_FORGETTING can be set after __init__, as sweep.py does
+        if self.STARFRUIT_FORGETTING is None:
             return None
-        next_price = self.STARFRUIT_INT
-        for i, price in enumerate(reversed(self.starfruit_cache)):
-            next_price += price * self.STARFRUIT_COEF[i]
-        return next_price
+        if self.run_state.starfruit_rls is None:
+            self.run_state.starfruit_rls = RecursiveLeastSquares(self.STARFRUIT_COEF, self.STARFRUIT_INT, self.STARFRUIT_FORGETTING)
+        return self.run_state.starfruit_rls
 
-    def handle_amethysts_orders(self, state):
+    def calc_starfruit_price(self):
+        if not self.run_state.starfruit_cache.full:
+            return None
+        model = self.starfruit_model()
+        if model is not None:
+            return model.predict(self.run_state.starfruit_cache.values)
+        return self.STARFRUIT_INT + self.run_state.starfruit_cache.dot(self.STARFRUIT_COEF)
+
+    def calc_starfruit_prices(self, mid_prices: np.ndarray) -> np.ndarray:
+        '''
+        calc_starfruit_price for a whole day in one NumPy call: element t is what it returns
+        once mid_prices[:t + 1] have been pushed, NaN where it returns None. The online fit
+        depends on every earlier update, so it has no batch form.
+        '''
+        if self.starfruit_model() is not None:
+            raise ValueError('STARFRUIT_FORGETTING is set; the online fit can only run tick by tick')
+        return self.STARFRUIT_INT + lag_dot(lag_matrix(mid_prices, len(self.STARFRUIT_COEF)), self.STARFRUIT_COEF)
+
+    def handle_amethysts_orders(self, state, books):
         orders = []
-        order_depth: OrderDepth = state.order_depths['AMETHYSTS']
-        current_position = self.POSITIONS['AMETHYSTS']
+        book: BookSnapshot = books['AMETHYSTS']
+        current_position = self.run_state.positions['AMETHYSTS']
         position_limit = self.POSITION_LIMITS['AMETHYSTS']
         amethysts_lb = 9999
         amethysts_ub = 10001
 
-        for ask, qty in order_depth.sell_orders.items():
+        for ask, qty in book.asks:
             if ask < amethysts_lb and current_position < position_limit:
-                quantity = min(-qty, position_limit - current_position)
+                quantity = min(qty, position_limit - current_position)
                 orders.append(Order('AMETHYSTS', ask, quantity))
                 current_position += quantity
 
-        for bid, qty in order_depth.buy_orders.items():
+        for bid, qty in book.bids:
             if bid > amethysts_ub and current_position > -position_limit:
                 quantity = min(qty, current_position + position_limit)
                 orders.append(Order('AMETHYSTS', bid, -quantity))
                 current_position -= quantity
 
-        self.POSITIONS['AMETHYSTS'] = current_position
+        self.run_state.positions['AMETHYSTS'] = current_position
         return orders
 
-    def handle_starfruit_orders(self, state):
+    def handle_starfruit_orders(self, state, books):
         orders = []
-        order_depth: OrderDepth = state.order_depths['STARFRUIT']
-        current_position = self.POSITIONS['STARFRUIT']
+        book: BookSnapshot = books['STARFRUIT']
+        current_position = self.run_state.positions['STARFRUIT']
         position_limit = self.POSITION_LIMITS['STARFRUIT']
         next_price = self.calc_starfruit_price()
 
         if next_price:
-            for ask, qty in order_depth.sell_orders.items():
+            for ask, qty in book.asks:
                 if ask < next_price + 0.75 and current_position < position_limit:
-                    quantity = min(-qty, position_limit - current_position)
+                    quantity = min(qty, position_limit - current_position)
                     orders.append(Order('STARFRUIT', ask, quantity))
                     current_position += quantity
 
-            for bid, qty in order_depth.buy_orders.items():
+            for bid, qty in book.bids:
                 if bid > next_price - 0.75 and current_position > -position_limit:
                     quantity = min(qty, current_position + position_limit)
                     orders.append(Order('STARFRUIT', bid, -quantity))
                     current_position -= quantity
 
-        self.POSITIONS['STARFRUIT'] = current_position
+        self.run_state.positions['STARFRUIT'] = current_position
         return orders
     
-    def compute_orders_basket(self, state):
+    def compute_orders_basket(self, state, books):
         orders = {'GIFT_BASKET': [], 'STRAWBERRIES': [], 'CHOCOLATE': [], 'ROSES': []}
         prods = ['STRAWBERRIES', 'CHOCOLATE', 'ROSES']
-        order_depth = state.order_depths
-
-        osell, obuy, best_sell, best_buy, mid_price = {}, {}, {}, {}, {}
-        for p in list(orders.keys()):
-            osell[p] = collections.OrderedDict(sorted(order_depth[p].sell_orders.items()))
-            obuy[p] = collections.OrderedDict(sorted(order_depth[p].buy_orders.items(), reverse=True))
 
-            best_sell[p] = next(iter(osell[p]))
-            best_buy[p] = next(iter(obuy[p]))
-
-            mid_price[p] = (best_sell[p] + best_buy[p]) / 2
+        mid_price = {p: books[p].mid if p in books else None for p in orders}
+        if any(mid is None for mid in mid_price.values()):
+            # A basket leg is not listed or one side of its book is empty, so there is no spread this tick
+            return orders
 
         theoretical_price = mid_price['STRAWBERRIES'] * 6 + mid_price['CHOCOLATE'] * 4 + mid_price['ROSES'] + 370
         actual_price = mid_price['GIFT_BASKET']
         price_difference = actual_price - theoretical_price
 
         threshold = 162*0.4  
-        current_position_gb = self.POSITIONS['GIFT_BASKET']
+        # The rule was written against raw sell_orders, whose volumes are negative, so ask
+        # volumes from the snapshot are negated back below
+        current_position_gb = self.run_state.positions['GIFT_BASKET']
         position_limit_gb = self.POSITION_LIMITS['GIFT_BASKET']
 
         # Determine actions based on the price difference
         if price_difference > threshold:
             # Actual basket price is higher than theoretical, sell the basket and buy the assets
-            for ask, qty in state.order_depths['GIFT_BASKET'].sell_orders.items():
+            for ask, volume in books['GIFT_BASKET'].asks:
+                qty = -volume
                 if current_position_gb > -position_limit_gb:
                     quantity = min(qty, current_position_gb + position_limit_gb)
                     orders['GIFT_BASKET'].append(Order('GIFT_BASKET', ask, -quantity))
                     current_position_gb -= quantity
 
             for p in prods:
-                order_depth: OrderDepth = state.order_depths[p]
-                curr_position = self.POSITIONS[p]
+                book: BookSnapshot = books[p]
+                curr_position = self.run_state.positions[p]
                 pos_lim = self.POSITION_LIMITS[p]
-                for bid, qty in order_depth.buy_orders.items():
+                for bid, qty in book.bids:
                     if pos_lim > curr_position:
                         quantity = min(qty, pos_lim-curr_position)
                         orders[p].append(Order(p, bid, quantity))
-                        self.POSITIONS[p] += quantity
-                logger.print(f'SUBMITTING NEW LONG on {p} from QUANTITY {curr_position} TO MAKE POSITION {self.POSITIONS[p]} WHILE SHORTING BASKET')
+                        self.run_state.positions[p] += quantity
+                self.logger.info('SUBMITTING NEW LONG on %s from QUANTITY %s TO MAKE POSITION %s WHILE SHORTING BASKET', p, curr_position, self.run_state.positions[p])
 
         elif price_difference < -threshold:
             # Actual basket price is lower than theoretical, consider buying the basket
-            for bid, qty in state.order_depths['GIFT_BASKET'].buy_orders.items():
+            for bid, qty in books['GIFT_BASKET'].bids:
                 if position_limit_gb > current_position_gb:
                     quantity = min(qty, position_limit_gb - current_position_gb)
                     orders['GIFT_BASKET'].append(Order('GIFT_BASKET', bid, quantity))
                     current_position_gb += quantity
             
             for p in prods:
-                order_depth: OrderDepth = state.order_depths[p]
-                curr_position = self.POSITIONS[p]
+                book: BookSnapshot = books[p]
+                curr_position = self.run_state.positions[p]
                 pos_lim = -self.POSITION_LIMITS[p]
-                for ask, qty in order_depth.sell_orders.items():
+                for ask, volume in book.asks:
+                    qty = -volume
                     if curr_position > -pos_lim:
                         quantity = min(qty, pos_lim+curr_position)
                         orders[p].append(Order(p, ask, -quantity))
-                        self.POSITIONS[p] -= quantity   
-                logger.print(f'SUBMITTING NEW SHORT on {p} from QUANTITY {curr_position} TO MAKE POSITION {self.POSITIONS[p]} WHILE LONGING BASKET')
+                        self.run_state.positions[p] -= quantity   
+                self.logger.info('SUBMITTING NEW SHORT on %s from QUANTITY %s TO MAKE POSITION %s WHILE LONGING BASKET', p, curr_position, self.run_state.positions[p])
 
         if 0 < price_difference <= 10 and current_position_gb > 0:
-            logger.print('EXITING LONG BASKET AND SHORT PRODS POSITION')
-            for ask, qty in state.order_depths['GIFT_BASKET'].sell_orders.items():
+            self.logger.info('EXITING LONG BASKET AND SHORT PRODS POSITION')
+            for ask, volume in books['GIFT_BASKET'].asks:
+                qty = -volume
                 quantity = min(qty, current_position_gb)
                 orders['GIFT_BASKET'].append(Order('GIFT_BASKET', ask, -quantity))
                 current_position_gb -= quantity
 
             for p in prods:
-                order_depth: OrderDepth = state.order_depths[p]
-                curr_position = self.POSITIONS[p]
+                book: BookSnapshot = books[p]
+                curr_position = self.run_state.positions[p]
                 pos_lim = self.POSITION_LIMITS[p]
-                for bid, qty in order_depth.buy_orders.items():
+                for bid, qty in book.bids:
                     if curr_position > - pos_lim:
                         quantity = min(qty, -curr_position)
                         orders[p].append(Order(p, bid, quantity))
-                        self.POSITIONS[p] += quantity
-                    logger.print(f'COVERING SHORTS ON {p} from QUANTITY {curr_position} to {self.POSITIONS[p]} AFTER CLOSING LONG BASKET')
+                        self.run_state.positions[p] += quantity
+                    self.logger.info('COVERING SHORTS ON %s from QUANTITY %s to %s AFTER CLOSING LONG BASKET', p, curr_position, self.run_state.positions[p])
 
 
         elif -30 <= price_difference < 0 and current_position_gb < 0:
-            logger.print('EXITING SHORT BASKET AND LONG PRODS POSITION')
-            for bid, qty in state.order_depths['GIFT_BASKET'].buy_orders.items():
+            self.logger.info('EXITING SHORT BASKET AND LONG PRODS POSITION')
+            for bid, qty in books['GIFT_BASKET'].bids:
                 quantity = min(qty, -current_position_gb)
                 orders['GIFT_BASKET'].append(Order('GIFT_BASKET', bid, quantity))
                 current_position_gb += quantity
 
             for p in prods:
-                order_depth: OrderDepth = state.order_depths[p]
-                curr_position = self.POSITIONS[p]
+                book: BookSnapshot = books[p]
+                curr_position = self.run_state.positions[p]
                 pos_lim = self.POSITION_LIMITS[p]
-                for ask, qty in order_depth.sell_orders.items():
+                for ask, volume in book.asks:
+                    qty = -volume
                     if 0 < curr_position <= pos_lim:
                         quantity = min(qty, -curr_position)
                         orders[p].append(Order(p, ask, -quantity))
-                        self.POSITIONS[p] -= quantity
-                        logger.print(f'SELLING LONG {p} from QUANTITY {curr_position} to {self.POSITIONS[p]} AFTER COVERING SHORT BASKET')
+                        self.run_state.positions[p] -= quantity
+                        self.logger.info('SELLING LONG %s from QUANTITY %s to %s AFTER COVERING SHORT BASKET', p, curr_position, self.run_state.positions[p])
         
-        self.POSITIONS['GIFT_BASKET'] = current_position_gb
+        self.run_state.positions['GIFT_BASKET'] = current_position_gb
         return orders
 
     
-    def run(self, state: TradingState) -> tuple[dict[Symbol, list[Order]], int, str]:
+    def run(self, state: TradingState, budget_ms: float | None = None) -> tuple[dict[Symbol, list[Order]], int, str]:
+        # Everything run() does counts against the budget, strategies are fitted into what is left
+        runner = self.runner
+        runner.start(self.TIME_BUDGET_MS if budget_ms is None else budget_ms)
+        if state.traderData != self.run_state.trader_data:
+            self.load_state(state.traderData)
+
         result = {}
-        if 'AMETHYSTS' in state.order_depths:
-            result['AMETHYSTS'] = self.handle_amethysts_orders(state)
-        if 'STARFRUIT' in state.order_depths:
-            result['STARFRUIT'] = self.handle_starfruit_orders(state)
+        books = runner.always('snapshot', snapshot_books, state.order_depths)
+
+        # The exchange's positions rather than our own count, so fills that did not happen and
+        # a restarted process both start the tick from the truth
+        for product in self.run_state.positions:
+            self.run_state.positions[product] = state.position.get(product, 0)
+
+        # Strategies run cheapest and most valuable first, so a tight budget drops the basket first
+        if 'AMETHYSTS' in books:
+            result['AMETHYSTS'] = runner.run('amethysts', [], self.handle_amethysts_orders, state, books)
+        if 'STARFRUIT' in books:
+            result['STARFRUIT'] = runner.run('starfruit', [], self.handle_starfruit_orders, state, books)
+        orders = runner.run('basket', {prod: [] for prod in ['GIFT_BASKET', 'STRAWBERRIES', 'CHOCOLATE', 'ROSES']}, self.compute_orders_basket, state, books)
         for prod in ['GIFT_BASKET', 'STRAWBERRIES', 'CHOCOLATE', 'ROSES']:
-            result[prod] = self.compute_orders_basket(state)[prod]
+            result[prod] = orders[prod]
 
         
-        if 'STARFRUIT' in state.order_depths:
-            mid_price = (list(state.order_depths['STARFRUIT'].sell_orders.keys())[0] +
-                            list(state.order_depths['STARFRUIT'].buy_orders.keys())[0]) / 2
-            self.starfruit_cache.append(mid_price)
-            if len(self.starfruit_cache) > 4:
-                self.starfruit_cache.pop(0)
+        if 'STARFRUIT' in books and books['STARFRUIT'].mid is not None:
+            model = self.starfruit_model()
+            if model is not None and self.run_state.starfruit_cache.full:
+                runner.always('rls', model.update, self.run_state.starfruit_cache.values, books['STARFRUIT'].mid)
+            self.run_state.starfruit_cache.push(books['STARFRUIT'].mid)
 
 
         
-        traderData = f"Current POSITIONS: {self.POSITIONS}"  # Format for better readability
+        if runner.skipped:
+            self.logger.warning('SKIPPED %s', runner.skipped)
+        traderData = runner.always('state', self.save_state)
         conversions = 1  # Placeholder for conversion logic
-        logger.flush(state, result, conversions, traderData)
+        runner.always('flush', self.logger.flush, state, result, conversions, traderData)
         return result, conversions, traderData
\ No newline at end of file
@@ -0,0 +1,96 @@
+import numpy as np
+
+# ORCHIDS production falls 2% for every full 5 points of humidity outside 60-80 and 4% for
+# every 10 minutes of sunlight short of 7 hours a day
+HUMIDITY_LOW = 60
+HUMIDITY_HIGH = 80
+HUMIDITY_STEP = 5
+HUMIDITY_PENALTY = -0.02
+SUNLIGHT_HOURS = 7
+SUNLIGHT_PENALTY = -0.04
+
+
+def total_production_change(H: float, s: float) -> float:
+    '''
+    Production change for humidity H (%) and sunlight s (hours), one observation at a time.
+    '''
+    if HUMIDITY_LOW <= H <= HUMIDITY_HIGH:
+        humidity_change = 0
+    elif H < HUMIDITY_LOW:
+        num_fives = (HUMIDITY_LOW - H) // HUMIDITY_STEP
+        humidity_change = num_fives * HUMIDITY_PENALTY
+    else:  # H > 80
+        num_fives = (H - HUMIDITY_HIGH) // HUMIDITY_STEP
+        humidity_change = num_fives * HUMIDITY_PENALTY
+
+    minutes = s * 60  # Converts hours to minutes
+    rounded_minutes = (minutes // 10) * 10  # Rounds down to the nearest 10 minutes
+    rounded_hours = rounded_minutes / 60  # Converts back to hours
+
+    if rounded_hours < SUNLIGHT_HOURS:
+        ten_minute_intervals = (SUNLIGHT_HOURS - rounded_hours) * 6
+        sunlight_change = SUNLIGHT_PENALTY * ten_minute_intervals
+    else:
+        sunlight_change = 0
+
+    return humidity_change + sunlight_change
+
+
+def production_change(H: np.ndarray, s: np.ndarray) -> np.ndarray:
+    '''
+    total_production_change over whole columns at once, e.g.
+    df['ProductionChange'] = production_change(df['HUMIDITY'], df['SUNLIGHT']).
+    Every element goes through the same floating point operations as the scalar version,
+    so the results are identical, NaN included.
+    '''
+    H = np.asarray(H, dtype=np.float64)
+    s = np.asarray(s, dtype=np.float64)
+
+    below = H < HUMIDITY_LOW
+    in_range = (HUMIDITY_LOW <= H) & (H <= HUMIDITY_HIGH)
+    distance = np.where(below, HUMIDITY_LOW - H, H - HUMIDITY_HIGH)
+    humidity_change = np.where(in_range, 0.0, (distance // HUMIDITY_STEP) * HUMIDITY_PENALTY)
+
+    rounded_hours = (((s * 60) // 10) * 10) / 60
+    sunlight_change = np.where(rounded_hours < SUNLIGHT_HOURS, SUNLIGHT_PENALTY * ((SUNLIGHT_HOURS - rounded_hours) * 6), 0.0)
+
+    return humidity_change + sunlight_change
+
+
+# Lookup table covering humidity 0-105 and sunlight 0-7 hours. Humidity gets two rows per
+# 5 point bucket: one for the exact multiple of 5, where the rule below 60 changes step,
+# and one for the rest of the bucket. Sunlight gets one column per 10 minutes, the last
+# standing for 7 hours or more.
+HUMIDITY_BUCKETS = 21
+SUNLIGHT_BUCKETS = SUNLIGHT_HOURS * 6 + 1
+
+
+def build_production_table() -> list[list[float]]:
+    table = []
+    for row in range(2 * HUMIDITY_BUCKETS):
+        H = HUMIDITY_STEP * (row // 2) + (HUMIDITY_STEP / 2 if row % 2 else 0)
+        table.append([total_production_change(H, (column * 10 + 5) / 60) for column in range(SUNLIGHT_BUCKETS)])
+    return table
+
+
+PRODUCTION_TABLE = build_production_table()
+
+
+def production_lookup(H: float, s: float) -> float:
+    '''
+    total_production_change as two index computations and a table lookup. Identical to
+    the scalar version for finite humidity in [0, 105) and any sunlight of at least 0;
+    values outside those ranges are clamped to the nearest bucket.
+    '''
+    q = H // HUMIDITY_STEP
+    row = int(2 * q) + (H != HUMIDITY_STEP * q)
+    column = int((s * 60) // 10)
+    if row < 0:
+        row = 0
+    elif row >= 2 * HUMIDITY_BUCKETS:
+        row = 2 * HUMIDITY_BUCKETS - 1
+    if column < 0:
+        column = 0
+    elif column >= SUNLIGHT_BUCKETS:
+        column = SUNLIGHT_BUCKETS - 1
+    return PRODUCTION_TABLE[row][column]
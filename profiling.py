@@ -0,0 +1,110 @@
+import time
+from typing import Any, Callable
+
+# Four buckets per power of two of nanoseconds, about 19% resolution, up to 2**63 ns
+SUB_BUCKETS = 4
+NUM_BUCKETS = 64 * SUB_BUCKETS
+
+
+def bucket_index(ns: int) -> int:
+    if ns < SUB_BUCKETS:
+        return max(ns, 0)
+    bits = ns.bit_length()
+    return (bits - 2) * SUB_BUCKETS + ((ns >> (bits - 3)) & (SUB_BUCKETS - 1))
+
+
+def bucket_upper(index: int) -> int:
+    # Smallest latency that falls in the next bucket
+    if index < SUB_BUCKETS:
+        return index + 1
+    octave, sub = divmod(index, SUB_BUCKETS)
+    return (SUB_BUCKETS + sub + 1) << (octave - 1)
+
+
+class LatencyHistogram:
+    '''
+    Fixed-size latency histogram in nanoseconds. Recording is a couple of integer
+    operations and memory does not grow with the number of samples; percentiles are
+    reported as the upper edge of their bucket, capped at the exact maximum.
+    '''
+    def __init__(self) -> None:
+        self.buckets = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns: int) -> None:
+        self.buckets[bucket_index(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, q: float) -> int:
+        if self.count == 0:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(bucket_upper(index), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+def call(stage: str, func: Callable[..., Any], *args: Any) -> Any:
+    return func(*args)
+
+
+class Profiler:
+    '''
+    Per-stage latency histograms for Trader.run. Strategies are called through
+    measure(stage, func, *args); while the profiler is disabled measure is replaced by a
+    plain call, so leaving the hooks in a submission costs one extra function call.
+    '''
+    def __init__(self, enabled: bool = False) -> None:
+        self.stages: dict[str, LatencyHistogram] = {}
+        self.skips: dict[str, int] = {}
+        self.set_enabled(enabled)
+
+    def set_enabled(self, enabled: bool) -> None:
+        self.enabled = enabled
+        if enabled:
+            self.__dict__.pop('measure', None)
+        else:
+            self.measure = call
+
+    def measure(self, stage: str, func: Callable[..., Any], *args: Any) -> Any:
+        start = time.perf_counter_ns()
+        try:
+            return func(*args)
+        finally:
+            self.record(stage, time.perf_counter_ns() - start)
+
+    def record(self, stage: str, ns: int) -> None:
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.record(ns)
+
+    def skip(self, stage: str) -> None:
+        # Stages skipped to meet a deadline are counted even while timing is disabled
+        self.skips[stage] = self.skips.get(stage, 0) + 1
+
+    def reset(self) -> None:
+        self.stages = {}
+        self.skips = {}
+
+    def report(self) -> str:
+        lines = [f'{"stage":<12}{"calls":>8}{"skipped":>9}{"mean us":>10}{"p50 us":>10}{"p99 us":>10}{"max us":>10}']
+        for stage in list(self.stages) + [stage for stage in self.skips if stage not in self.stages]:
+            histogram = self.stages.get(stage, LatencyHistogram())
+            lines.append(
+                f'{stage:<12}{histogram.count:>8}{self.skips.get(stage, 0):>9}{histogram.mean / 1000:>10.1f}'
+                f'{histogram.percentile(50) / 1000:>10.1f}{histogram.percentile(99) / 1000:>10.1f}{histogram.max / 1000:>10.1f}'
+            )
+        return '\n'.join(lines)
@@ -0,0 +1,109 @@
+import argparse
+import time
+
+import numpy as np
+
+
+class RecursiveLeastSquares:
+    '''
+    Online least squares fit of y = intercept + coefs . x, warm-started from an existing
+    fit. Each update is a rank one correction of the inverse information matrix P, so
+    it costs O(p^2) whatever the history length. With forgetting < 1 an observation's
+    weight decays by that factor per update, an effective window of 1 / (1 - forgetting).
+
+    The warm-start coefficients count as prior_weight observations: P starts diagonal,
+    scaled per coordinate by the first regressor vector, so with the default the first
+    few hundred ticks only nudge the offline fit. Forgetting lets P grow without bound in
+    directions the data does not excite (neighbouring price lags are nearly collinear),
+    so its trace is capped at the starting value.
+    '''
+    def __init__(self, coefs: list[float], intercept: float = 0.0, forgetting: float = 1.0, prior_weight: float = 1000.0) -> None:
+        self.theta = np.array([intercept, *coefs], dtype=np.float64)
+        self.forgetting = forgetting
+        self.prior_weight = prior_weight
+        self.P: np.ndarray | None = None
+        self.max_trace = 0.0
+        self.z = np.ones(len(self.theta))
+        self.count = 0
+
+    @property
+    def intercept(self) -> float:
+        return float(self.theta[0])
+
+    @property
+    def coefs(self) -> np.ndarray:
+        return self.theta[1:]
+
+    def predict(self, x: np.ndarray) -> float:
+        return float(self.theta[0] + np.dot(self.theta[1:], x))
+
+    def update(self, x: np.ndarray, y: float) -> float:
+        # Returns the prediction error before the update
+        z = self.z
+        z[1:] = x
+        if self.P is None:
+            self.P = np.diag(1 / (self.prior_weight * np.maximum(z * z, 1e-12)))
+            self.max_trace = np.trace(self.P)
+        Pz = self.P @ z
+        gain = Pz / (self.forgetting + np.dot(z, Pz))
+        error = y - np.dot(self.theta, z)
+        self.theta += gain * error
+        self.P -= np.outer(gain, Pz)
+        if self.forgetting != 1.0:
+            self.P /= self.forgetting
+            trace = np.trace(self.P)
+            if trace > self.max_trace:
+                self.P *= self.max_trace / trace
+        self.count += 1
+        return float(error)
+
+    def get_state(self) -> tuple[list[float], list[float]]:
+        P = self.P if self.P is not None else np.zeros((len(self.theta), len(self.theta)))
+        return [self.count, self.max_trace, *self.theta], P.ravel()
+
+    def set_state(self, header: list[float], values: list[float]) -> None:
+        size = len(self.theta)
+        if len(header) != size + 2 or len(values) != size * size:
+            return
+        self.count, self.max_trace = int(header[0]), header[1]
+        self.theta = np.array(header[2:], dtype=np.float64)
+        self.P = np.array(values, dtype=np.float64).reshape(size, size) if self.count else None
+
+
+def benchmark(lags: int, num_ticks: int, forgetting: float, seed: int = 0) -> tuple[float, float]:
+    '''
+    Times update + predict on an AR price series and returns (mean us per tick, worst
+    us per tick over blocks of 1000 ticks).
+    '''
+    prices = 5000 + np.cumsum(np.random.default_rng(seed).normal(0, 1, num_ticks + lags))
+    model = RecursiveLeastSquares([1 / lags] * lags, 0.0, forgetting)
+    windows = [prices[t - lags:t][::-1].copy() for t in range(lags, num_ticks + lags)]
+    block_times = []
+    start = time.perf_counter_ns()
+    block_start = start
+    for t, window in enumerate(windows):
+        model.predict(window)
+        model.update(window, prices[t + lags])
+        if t % 1000 == 999:
+            now = time.perf_counter_ns()
+            block_times.append((now - block_start) / 1000)
+            block_start = now
+    total = time.perf_counter_ns() - start
+    return total / num_ticks / 1000, max(block_times) / 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark RecursiveLeastSquares per-tick cost')
+    parser.add_argument('--ticks', type=int, default=100_000)
+    parser.add_argument('--lags', type=int, nargs='+', default=[4, 6, 12])
+    parser.add_argument('--forgetting', type=float, default=0.9995)
+    args = parser.parse_args()
+
+    print(f'{"lags":>6}{"mean us":>10}{"worst us":>10}')
+    for lags in args.lags:
+        mean, worst = benchmark(lags, args.ticks, args.forgetting)
+        print(f'{lags:>6}{mean:>10.2f}{worst:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import math
+from array import array
+
+
+class RollingStats:
+    '''
+    Mean and population standard deviation (same as np.mean / np.std) of the last
+    `window` values. Values sit in a fixed ring buffer and the statistics are updated
+    with Welford's add/remove step, so a push is O(1) and memory never grows. The buffer
+    is an array('d') so get_state hands state_codec bytes to copy rather than floats to box.
+    '''
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self.values = array('d', bytes(8 * window))
+        self.head = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, value: float) -> None:
+        if self.count < self.window:
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        else:
+            # Slide the window: replace the oldest value in a single update
+            self.count += 1
+            oldest = self.values[self.head]
+            old_mean = self.mean
+            self.mean += (value - oldest) / self.window
+            self.m2 += (value - oldest) * (value - self.mean + oldest - old_mean)
+
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.window
+
+    def __len__(self) -> int:
+        # Number of values currently in the window
+        return min(self.count, self.window)
+
+    @property
+    def variance(self) -> float:
+        n = len(self)
+        return max(self.m2, 0.0) / n if n else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def reset(self) -> None:
+        self.values = array('d', bytes(8 * self.window))
+        self.head = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def get_state(self) -> tuple[list[float], array]:
+        return [self.count, self.head, self.mean, self.m2], self.values
+
+    def set_state(self, header: list[float], values: list[float]) -> None:
+        # Ignores state saved for a different window size
+        if len(header) != 4 or len(values) != self.window:
+            return
+        self.count, self.head = int(header[0]), int(header[1])
+        self.mean, self.m2 = header[2], header[3]
+        self.values = array('d', values)
+
+
+class EwmaStats:
+    '''
+    Exponentially weighted mean and standard deviation, the O(1) alternative to
+    RollingStats when a hard window edge is not needed. `span` has the pandas meaning,
+    alpha = 2 / (span + 1).
+    '''
+    def __init__(self, span: float) -> None:
+        self.span = span
+        self.alpha = 2 / (span + 1)
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+
+    def push(self, value: float) -> None:
+        self.count += 1
+        if self.count == 1:
+            self.mean = value
+            return
+        delta = value - self.mean
+        self.mean += self.alpha * delta
+        self.variance = (1 - self.alpha) * (self.variance + self.alpha * delta * delta)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def reset(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+
+
+class LagWindow:
+    '''
+    The last `lags` values of a series, most recent first, for AR style predictors.
+    Every value is written twice into a buffer of length 2 * lags, so the current window
+    is always the contiguous slice buffer[head:head + lags]. Slots not yet written hold
+    `fill`. Plain Python floats throughout, so the per-tick path never needs NumPy.
+    '''
+    def __init__(self, lags: int, fill: float = 0.0) -> None:
+        self.lags = lags
+        self.fill = fill
+        self.buffer = array('d', [fill]) * (2 * lags)
+        self.head = 0
+        self.count = 0
+
+    def push(self, value: float) -> None:
+        self.head = (self.head - 1) % self.lags
+        self.buffer[self.head] = value
+        self.buffer[self.head + self.lags] = value
+        self.count += 1
+
+    def __len__(self) -> int:
+        return min(self.count, self.lags)
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.lags
+
+    @property
+    def values(self) -> array:
+        # The window, most recent value first
+        return self.buffer[self.head:self.head + self.lags]
+
+    def dot(self, coefs: list[float]) -> float:
+        # coefs[0] weights the most recent value, as STARFRUIT_COEF is laid out. Summed in
+        # that order, as features.lag_dot does over a whole day, so the two agree bitwise
+        buffer = self.buffer
+        total = 0.0
+        for i, coef in enumerate(coefs, self.head):
+            total += coef * buffer[i]
+        return total
+
+    def reset(self) -> None:
+        self.buffer = array('d', [self.fill]) * (2 * self.lags)
+        self.head = 0
+        self.count = 0
+
+    def get_state(self) -> tuple[list[float], array]:
+        # The first half of the buffer holds every slot, the second half mirrors it
+        return [self.count, self.head], self.buffer[:self.lags]
+
+    def set_state(self, header: list[float], values: list[float]) -> None:
+        if len(header) != 2 or len(values) != self.lags:
+            return
+        self.count, self.head = int(header[0]), int(header[1])
+        self.buffer = array('d', values) * 2
@@ -0,0 +1,64 @@
+import base64
+import binascii
+import struct
+import sys
+from array import array
+from typing import Any
+
+# Layout: version (uint8), section count (uint8), one uint16 length per section, then
+# every section's values as little-endian float64, all base64 encoded
+HEADER = struct.Struct('<BB')
+
+
+def pack_section(section: Any) -> bytes:
+    # float64 buffers (array('d'), NumPy float64 arrays) are copied as they are on
+    # little-endian machines, without boxing every value; short lists go through struct
+    if not isinstance(section, list) and sys.byteorder == 'little':
+        view = memoryview(section)
+        if view.format == 'd' and view.c_contiguous:
+            return view.tobytes()
+    return struct.pack(f'<{len(section)}d', *section)
+
+
+def encode_state(version: int, sections: list[Any]) -> str:
+    '''
+    Packs sections of floats into a compact traderData string. A section is any sequence
+    of floats; float64 buffers such as the RollingStats window are copied in one go.
+    '''
+    header = HEADER.pack(version, len(sections)) + struct.pack(f'<{len(sections)}H', *[len(section) for section in sections])
+    return base64.b64encode(header + b''.join(pack_section(section) for section in sections)).decode('ascii')
+
+
+def decode_state(version: int, trader_data: str) -> list[array] | None:
+    '''
+    Unpacks a string written by encode_state. Returns None for an empty string, a
+    different version, or anything else that was not written by encode_state.
+    '''
+    if not trader_data:
+        return None
+    try:
+        raw = base64.b64decode(trader_data, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) < HEADER.size:
+        return None
+
+    saved_version, num_sections = HEADER.unpack_from(raw)
+    offset = HEADER.size + 2 * num_sections
+    if saved_version != version or len(raw) < offset:
+        return None
+    lengths = struct.unpack_from(f'<{num_sections}H', raw, HEADER.size)
+    if len(raw) - offset != 8 * sum(lengths):
+        return None
+
+    values = array('d')
+    values.frombytes(raw[offset:])
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    sections = []
+    start = 0
+    for length in lengths:
+        sections.append(values[start:start + length])
+        start += length
+    return sections
@@ -0,0 +1,131 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Any
+
+from backtester import Backtester, DayData, load_day, load_trader
+
+RESULT_FIELDS = ['key', 'trader', 'params', 'round', 'day', 'total_pnl', 'product_pnl', 'ticks', 'elapsed']
+
+
+class Job:
+    '''
+    One backtest: a trader module with class attribute overrides, replayed over one day.
+    '''
+    def __init__(self, trader: str, params: dict[str, Any], round_num: int, day: int, data_dir: str) -> None:
+        self.trader = trader
+        self.params = params
+        self.round_num = round_num
+        self.day = day
+        self.data_dir = data_dir
+
+    @property
+    def key(self) -> str:
+        return f'{self.trader}|{json.dumps(self.params, sort_keys=True)}|{self.round_num}|{self.day}'
+
+
+@lru_cache(maxsize=8)
+def cached_day(data_dir: str, round_num: int, day: int) -> DayData:
+    # Each worker parses a day once and reuses it for every job on that day
+    return load_day(data_dir, round_num, day)
+
+
+def run_job(job: Job) -> dict[str, Any]:
+    trader = load_trader(job.trader)
+    for name, value in job.params.items():
+        setattr(trader, name, value)
+    # Rebuild the run state from the overridden parameters, e.g. a longer STARFRUIT_COEF
+    trader.reset()
+
+    result = Backtester(trader).run(cached_day(job.data_dir, job.round_num, job.day))
+    return {
+        'key': job.key,
+        'trader': job.trader,
+        'params': json.dumps(job.params, sort_keys=True),
+        'round': job.round_num,
+        'day': job.day,
+        'total_pnl': result.total_pnl,
+        'product_pnl': json.dumps(result.product_pnl),
+        'ticks': len(result.timestamps),
+        'elapsed': round(result.elapsed, 3),
+    }
+
+
+def build_jobs(traders: list[str], param_grid: dict[str, list[Any]], days: list[tuple[int, int]], data_dir: str) -> list[Job]:
+    names = sorted(param_grid)
+    param_sets = [dict(zip(names, values)) for values in itertools.product(*(param_grid[name] for name in names))]
+    return [Job(trader, params, round_num, day, data_dir) for trader in traders for params in param_sets for round_num, day in days]
+
+
+def finished_keys(results_path: str) -> set[str]:
+    if not os.path.exists(results_path):
+        return set()
+    with open(results_path, newline='') as f:
+        return {row['key'] for row in csv.DictReader(f)}
+
+
+def run_sweep(jobs: list[Job], results_path: str, workers: int | None = None) -> int:
+    '''
+    Runs every job not already recorded in results_path across a process pool. Each
+    result is appended and flushed as soon as it completes, so an interrupted sweep
+    resumes from where it stopped. Returns the number of jobs run.
+    '''
+    done = finished_keys(results_path)
+    pending = [job for job in jobs if job.key not in done]
+    if not pending:
+        return 0
+
+    write_header = not os.path.exists(results_path) or os.path.getsize(results_path) == 0
+    with open(results_path, 'a', newline='') as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if write_header:
+            writer.writeheader()
+
+        futures = {pool.submit(run_job, job): job for job in pending}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                print(f'FAILED {job.key}: {e!r}')
+                continue
+            writer.writerow(row)
+            f.flush()
+            print(f'{row["key"]}: {row["total_pnl"]:,.1f}')
+
+    return len(pending)
+
+
+def parse_param(spec: str) -> tuple[str, list[Any]]:
+    # NAME=v1;v2;... where each value is JSON, e.g. STARFRUIT_INT=11.8;12.0
+    name, values = spec.split('=', 1)
+    return name, [json.loads(value) for value in values.split(';')]
+
+
+def parse_day(spec: str) -> tuple[int, int]:
+    # ROUND:DAY, e.g. 1:-2
+    round_num, day = spec.split(':')
+    return int(round_num), int(day)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Sweep trader modules x parameter sets x days across a process pool')
+    parser.add_argument('--traders', nargs='+', required=True)
+    parser.add_argument('--days', nargs='+', required=True, type=parse_day, help='ROUND:DAY pairs, e.g. 1:-2 1:-1 1:0')
+    parser.add_argument('--param', action='append', default=[], type=parse_param, help='Trader attribute override NAME=v1;v2;... (JSON values)')
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--results', default='sweep_results.csv')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    jobs = build_jobs(args.traders, dict(args.param), args.days, args.data_dir)
+    ran = run_sweep(jobs, args.results, args.workers)
+    print(f'{ran} of {len(jobs)} jobs run, results in {args.results}')
+
+
+if __name__ == '__main__':
+    main()
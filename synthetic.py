@@ -0,0 +1,284 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+PRODUCTS = ['AMETHYSTS', 'STARFRUIT', 'ORCHIDS', 'CHOCOLATE', 'STRAWBERRIES', 'ROSES', 'GIFT_BASKET']
+BASKET_WEIGHTS = {'CHOCOLATE': 4, 'STRAWBERRIES': 6, 'ROSES': 1}
+BASKET_PREMIUM = 380
+TICK = 100
+DEPTH = 3
+
+# Half spread of the best quotes and the chance each extra level is shown
+HALF_SPREADS = {'AMETHYSTS': 2.5, 'STARFRUIT': 2.5, 'ORCHIDS': 4.0, 'CHOCOLATE': 1.0, 'STRAWBERRIES': 0.75, 'ROSES': 1.0, 'GIFT_BASKET': 6.0}
+LEVEL_PROBS = [1.0, 0.8, 0.3]
+TRADE_PROB = 0.08
+# Chance per tick that a second AMETHYSTS bot quotes one side 1-2 through 10000
+AMETHYSTS_CROSS_PROB = 0.1
+
+PRICES_HEADER = ['day', 'timestamp', 'product'] + [f'{side}_{field}_{level}' for side in ('bid', 'ask') for level in range(1, DEPTH + 1) for field in ('price', 'volume')] + ['mid_price', 'profit_and_loss']
+TRADES_HEADER = ['timestamp', 'buyer', 'seller', 'symbol', 'currency', 'price', 'quantity']
+OBSERVATIONS_HEADER = ['timestamp', 'bidPrice', 'askPrice', 'transportFees', 'exportTariff', 'importTariff', 'sunlight', 'humidity']
+
+
+def impulse_response(coefs: list[float], tol: float = 1e-10) -> np.ndarray:
+    '''
+    MA(infinity) weights of a stationary AR(p) process, truncated once the last p weights
+    are all below tol.
+    '''
+    p = len(coefs)
+    weights = [1.0]
+    while len(weights) < p or max(abs(w) for w in weights[-p:]) >= tol:
+        weights.append(sum(c * weights[-1 - i] for i, c in enumerate(coefs) if len(weights) > i))
+        if len(weights) > 1_000_000:
+            raise ValueError(f'AR coefficients {coefs} are not stationary')
+    return np.array(weights)
+
+
+def fft_convolve(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    size = len(a) + len(b) - 1
+    n = 1 << (size - 1).bit_length()
+    return np.fft.irfft(np.fft.rfft(a, n) * np.fft.rfft(b, n), n)[:size]
+
+
+class ArNoise:
+    '''
+    Zero mean AR(p) noise drawn through its truncated impulse response with an FFT
+    convolution, so a chunk of n values costs O(n log n) whatever the order and memory.
+    The innovations that still matter are carried between chunks, so chunks join up
+    exactly as if the whole series had been drawn at once.
+    '''
+    def __init__(self, coefs: list[float], sigma: float) -> None:
+        self.weights = impulse_response(coefs)
+        self.sigma = sigma
+        self.tail = np.zeros(len(self.weights) - 1)
+
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        innovations = np.concatenate([self.tail, rng.normal(0, self.sigma, n)])
+        values = fft_convolve(innovations, self.weights)[len(self.tail):len(innovations)]
+        if len(self.tail):
+            self.tail = innovations[-len(self.tail):]
+        return values
+
+
+def stationary_sigma(phi: float, std: float) -> float:
+    # Innovation size that gives an AR(1) with coefficient phi the stationary deviation std
+    return std * math.sqrt(1 - phi * phi)
+
+
+class Chunk:
+    '''
+    n consecutive ticks of one day. Books are (n, DEPTH) price and volume arrays per
+    product with volume 0 marking a missing level, trades are flat arrays and the ORCHIDS
+    conversion observations are one array per field.
+    '''
+    def __init__(self, timestamps: np.ndarray) -> None:
+        self.timestamps = timestamps
+        self.bid_prices: dict[str, np.ndarray] = {}
+        self.bid_volumes: dict[str, np.ndarray] = {}
+        self.ask_prices: dict[str, np.ndarray] = {}
+        self.ask_volumes: dict[str, np.ndarray] = {}
+        self.trades: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.observations: dict[str, np.ndarray] = {}
+
+    def mid_prices(self, product: str) -> np.ndarray:
+        return (self.bid_prices[product][:, 0] + self.ask_prices[product][:, 0]) / 2
+
+
+class MarketGenerator:
+    '''
+    Seeded generator for every product the traders handle. Each call to chunk continues
+    the same price paths, so consecutive days (and chunks within a day) join up.
+
+    - AMETHYSTS: AR(1) mean reversion around 10000, with a small quote through 10000 on
+      about one tick in ten
+    - STARFRUIT: random walk whose returns are AR(2) with negative autocorrelation
+    - CHOCOLATE, STRAWBERRIES, ROSES: random walks
+    - GIFT_BASKET: 4 CHOCOLATE + 6 STRAWBERRIES + ROSES + premium plus a slowly reverting
+      AR(1) spread, so it is cointegrated with its legs
+    - ORCHIDS: random walk pushed up while sunlight is short of 2500 or humidity is
+      outside 60-80, quoted abroad with stepwise transport fees and tariffs
+    '''
+    def __init__(self, seed: int = 0, ticks_per_day: int = 10_000) -> None:
+        self.rng = np.random.default_rng(seed)
+        self.ticks_per_day = ticks_per_day
+        self.tick = 0
+        self.amethysts = ArNoise([0.5], stationary_sigma(0.5, 1.5))
+        self.starfruit_returns = ArNoise([-0.35, -0.15], 1.0)
+        self.basket_spread = ArNoise([0.998], stationary_sigma(0.998, 75))
+        self.humidity = ArNoise([0.9995], stationary_sigma(0.9995, 12))
+        self.levels = {'STARFRUIT': 5000.0, 'ORCHIDS': 1100.0, 'CHOCOLATE': 7900.0, 'STRAWBERRIES': 4000.0, 'ROSES': 14500.0}
+        self.sigmas = {'ORCHIDS': 1.0, 'CHOCOLATE': 0.8, 'STRAWBERRIES': 0.4, 'ROSES': 1.8}
+        self.fees = {'transportFees': 1.0, 'exportTariff': 9.5, 'importTariff': -5.0}
+
+    def walk(self, product: str, steps: np.ndarray) -> np.ndarray:
+        path = self.levels[product] + np.cumsum(steps)
+        self.levels[product] = path[-1]
+        return path
+
+    def step_series(self, name: str, n: int, jump: float, low: float, high: float) -> np.ndarray:
+        # Piecewise constant, moving by +-jump about every 2000 ticks
+        jumps = np.where(self.rng.random(n) < 5e-4, self.rng.choice([-jump, jump], n), 0.0)
+        values = np.clip(self.fees[name] + np.cumsum(jumps), low, high)
+        self.fees[name] = values[-1]
+        return values
+
+    def fair_values(self, n: int) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+        rng = self.rng
+        fair = {'AMETHYSTS': 10000 + self.amethysts.draw(rng, n)}
+        fair['STARFRUIT'] = self.walk('STARFRUIT', self.starfruit_returns.draw(rng, n))
+        for product in BASKET_WEIGHTS:
+            fair[product] = self.walk(product, rng.normal(0, self.sigmas[product], n))
+        fair['GIFT_BASKET'] = sum(weight * fair[product] for product, weight in BASKET_WEIGHTS.items()) + BASKET_PREMIUM + self.basket_spread.draw(rng, n)
+
+        # Sunlight follows one arc per day, humidity wanders around 72
+        day_fraction = ((self.tick + np.arange(n)) % self.ticks_per_day) / self.ticks_per_day
+        sunlight = np.maximum(1500 + 3000 * np.sin(np.pi * day_fraction) + rng.normal(0, 20, n), 0)
+        humidity = np.clip(72 + self.humidity.draw(rng, n), 0, 100)
+        shortfall = np.maximum(2500 - sunlight, 0) / 2500 + (np.maximum(60 - humidity, 0) + np.maximum(humidity - 80, 0)) / 5
+        fair['ORCHIDS'] = self.walk('ORCHIDS', rng.normal(0.02 * shortfall, self.sigmas['ORCHIDS']))
+
+        south_mid = fair['ORCHIDS'] + rng.normal(0, 1.0, n)
+        observations = {
+            'bidPrice': np.round((south_mid - 0.75) * 4) / 4,
+            'askPrice': np.round((south_mid + 0.75) * 4) / 4,
+            'transportFees': self.step_series('transportFees', n, 0.1, 0.5, 2.0),
+            'exportTariff': self.step_series('exportTariff', n, 0.5, 5.0, 14.0),
+            'importTariff': self.step_series('importTariff', n, 0.5, -7.0, -1.0),
+            'sunlight': np.round(sunlight, 2),
+            'humidity': np.round(humidity, 2),
+        }
+        return fair, observations
+
+    def chunk(self, n: int) -> Chunk:
+        rng = self.rng
+        day_tick = self.tick % self.ticks_per_day
+        chunk = Chunk((day_tick + np.arange(n, dtype=np.int64)) * TICK)
+        fair, chunk.observations = self.fair_values(n)
+        self.tick += n
+
+        offsets = np.arange(DEPTH)
+        for product in PRODUCTS:
+            value = fair[product][:, None]
+            bid_prices = np.floor(value - HALF_SPREADS[product]).astype(np.int64) - offsets
+            ask_prices = np.ceil(value + HALF_SPREADS[product]).astype(np.int64) + offsets
+            # Deeper levels only appear behind the ones above them
+            shown = np.cumprod(rng.random((n, DEPTH)) < LEVEL_PROBS, axis=1)
+            chunk.bid_prices[product] = bid_prices
+            chunk.ask_prices[product] = ask_prices
+            chunk.bid_volumes[product] = np.where(shown, rng.integers(1, 31, (n, DEPTH)), 0)
+            chunk.ask_volumes[product] = np.where(shown, rng.integers(1, 31, (n, DEPTH)), 0)
+
+            # Market trades hit the best bid or lift the best ask
+            traded = np.flatnonzero(rng.random(n) < TRADE_PROB)
+            at_ask = rng.random(len(traded)) < 0.5
+            prices = np.where(at_ask, ask_prices[traded, 0], bid_prices[traded, 0])
+            chunk.trades[product] = (chunk.timestamps[traded], prices, rng.integers(1, 6, len(traded)))
+        self.cross_amethysts(chunk, n)
+        return chunk
+
+    def cross_amethysts(self, chunk: Chunk, n: int) -> None:
+        # The quote through 10000 goes in front of the other levels on its side, pushing the
+        # deepest one out, and the opposite side is moved back behind it if it would cross
+        rng = self.rng
+        offsets = np.arange(DEPTH)
+        ticks = np.flatnonzero(rng.random(n) < AMETHYSTS_CROSS_PROB)
+        through = rng.integers(1, 3, len(ticks))
+        volumes = rng.integers(1, 11, len(ticks))
+        selling = rng.random(len(ticks)) < 0.5
+        for side, sign in ((True, -1), (False, 1)):
+            rows = ticks[selling == side]
+            price = (10000 + sign * through[selling == side])[:, None]
+            quoted, other = ('ask', 'bid') if side else ('bid', 'ask')
+            prices = getattr(chunk, f'{quoted}_prices')['AMETHYSTS']
+            sizes = getattr(chunk, f'{quoted}_volumes')['AMETHYSTS']
+            prices[rows] = np.concatenate([price, prices[rows, :-1]], axis=1)
+            sizes[rows] = np.concatenate([volumes[selling == side][:, None], sizes[rows, :-1]], axis=1)
+            opposite = getattr(chunk, f'{other}_prices')['AMETHYSTS']
+            if side:
+                opposite[rows] = np.minimum(opposite[rows], price - 1 - offsets)
+            else:
+                opposite[rows] = np.maximum(opposite[rows], price + 1 + offsets)
+
+
+def strings(values: np.ndarray, shown: np.ndarray | None = None) -> list[str]:
+    # str() on Python scalars is several times faster than NumPy's astype(str)
+    text = list(map(str, values.tolist()))
+    if shown is not None:
+        for i in np.flatnonzero(~shown).tolist():
+            text[i] = ''
+    return text
+
+
+def format_price_rows(day: int, chunk: Chunk, product: str) -> list[str]:
+    # Columns are converted to strings in bulk and joined once per row
+    n = len(chunk.timestamps)
+    columns = [[str(day)] * n, strings(chunk.timestamps), [product] * n]
+    for prices, volumes in ((chunk.bid_prices[product], chunk.bid_volumes[product]), (chunk.ask_prices[product], chunk.ask_volumes[product])):
+        for level in range(DEPTH):
+            shown = volumes[:, level] > 0
+            columns.append(strings(prices[:, level], shown))
+            columns.append(strings(volumes[:, level], shown))
+    columns.append(strings(chunk.mid_prices(product)))
+    columns.append(['0.0'] * n)
+    return [';'.join(row) for row in zip(*columns)]
+
+
+def write_day(generator: MarketGenerator, out_dir: str, round_num: int, day: int, chunk_size: int = 100_000) -> None:
+    '''
+    Writes prices_round_R_day_D.csv, trades_round_R_day_D_nn.csv and
+    observations_round_R_day_D.csv for one day in the competition formats, chunk_size
+    ticks at a time so memory stays flat however long the day is. The output depends on
+    the seed, the ticks per day and the chunk size.
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    base = f'round_{round_num}_day_{day}'
+    with open(os.path.join(out_dir, f'prices_{base}.csv'), 'w') as prices, \
+            open(os.path.join(out_dir, f'trades_{base}_nn.csv'), 'w') as trades, \
+            open(os.path.join(out_dir, f'observations_{base}.csv'), 'w') as observations:
+        prices.write(';'.join(PRICES_HEADER) + '\n')
+        trades.write(';'.join(TRADES_HEADER) + '\n')
+        observations.write(','.join(OBSERVATIONS_HEADER) + '\n')
+
+        remaining = generator.ticks_per_day
+        while remaining > 0:
+            chunk = generator.chunk(min(chunk_size, remaining))
+            remaining -= len(chunk.timestamps)
+
+            # Rows within a timestamp are grouped together, as in the competition files
+            rows = [format_price_rows(day, chunk, product) for product in PRODUCTS]
+            prices.write('\n'.join(row for tick_rows in zip(*rows) for row in tick_rows) + '\n')
+
+            trade_rows = []
+            for product in PRODUCTS:
+                for timestamp, price, quantity in zip(*[column.tolist() for column in chunk.trades[product]]):
+                    trade_rows.append((timestamp, f'{timestamp};;;{product};SEASHELLS;{price};{quantity}'))
+            trade_rows.sort(key=lambda row: row[0])
+            if trade_rows:
+                trades.write('\n'.join(row for _, row in trade_rows) + '\n')
+
+            columns = [chunk.timestamps.tolist()] + [chunk.observations[field].tolist() for field in OBSERVATIONS_HEADER[1:]]
+            observations.write('\n'.join(','.join(map(str, row)) for row in zip(*columns)) + '\n')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Write seeded synthetic prices, trades and observations CSVs')
+    parser.add_argument('round', type=int)
+    parser.add_argument('days', type=int, nargs='+')
+    parser.add_argument('--out-dir', default='synthetic_data')
+    parser.add_argument('--ticks', type=int, default=10_000, help='ticks per day')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    generator = MarketGenerator(args.seed, args.ticks)
+    for day in args.days:
+        start = time.perf_counter()
+        write_day(generator, args.out_dir, args.round, day, args.chunk_size)
+        print(f'Round {args.round} day {day}: {args.ticks:,} ticks in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
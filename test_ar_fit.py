@@ -0,0 +1,22 @@
+import numpy as np
+
+from ar_fit import LagFit, design_matrix
+
+
+def test_rss_matches_lstsq_on_price_levels() -> None:
+    # An AR(2) wobble of a few hundredths on a level of a million, where y'y is
+    # about 1e16 times the residual sum of squares
+    rng = np.random.default_rng(0)
+    noise = np.zeros(2000)
+    for t in range(2, len(noise)):
+        noise[t] = 0.5 * noise[t - 1] - 0.2 * noise[t - 2] + rng.normal(0, 0.01)
+    X, y = design_matrix(1e6 + noise, 'price', 5)
+    fit = LagFit(X, y)
+
+    # With an intercept, taking the level off y and the lags leaves the residuals as they were
+    centered_X = np.column_stack([X[:, 0], X[:, 1:] - 1e6])
+    for order in range(1, 6):
+        params, _, _, _ = np.linalg.lstsq(centered_X[:, :order + 1], y - 1e6, rcond=None)
+        residual = y - 1e6 - centered_X[:, :order + 1] @ params
+        np.testing.assert_allclose(fit.rss[order - 1], residual @ residual, rtol=1e-6)
+    assert fit.best_order() == 2
@@ -0,0 +1,40 @@
+import numpy as np
+from datamodel import OrderDepth
+
+from backtester import DayData
+from basket_grid import BASKET_PRODUCTS, BasketDay, band_grid, threshold_grid
+
+PRICES = {'GIFT_BASKET': 70000, 'STRAWBERRIES': 4000, 'CHOCOLATE': 8000, 'ROSES': 14000}
+
+
+def basket_day(num_ticks: int, empty: dict[int, tuple[str, str]]) -> DayData:
+    # Books one tick either side of a mid that rises by one a tick, with the
+    # (product, side) in `empty` left unquoted at that tick
+    data = DayData(3, 0)
+    for t in range(num_ticks):
+        timestamp = t * 100
+        data.timestamps.append(timestamp)
+        data.order_depths[timestamp] = {}
+        for product in BASKET_PRODUCTS:
+            order_depth = OrderDepth()
+            order_depth.buy_orders = {PRICES[product] + t - 1: 10}
+            order_depth.sell_orders = {PRICES[product] + t + 1: -10}
+            if empty.get(t) == (product, 'buy'):
+                order_depth.buy_orders = {}
+            if empty.get(t) == (product, 'sell'):
+                order_depth.sell_orders = {}
+            data.order_depths[timestamp][product] = order_depth
+    return data
+
+
+def test_ticks_with_an_empty_side_are_skipped() -> None:
+    data = basket_day(6, {1: ('GIFT_BASKET', 'sell'), 4: ('ROSES', 'buy')})
+    del data.order_depths[500]['CHOCOLATE']
+    day = BasketDay.from_day(data)
+
+    np.testing.assert_array_equal(day.mid['GIFT_BASKET'], [70000, 70002, 70003])
+    assert not np.isnan(day.spread).any()
+
+    bands = band_grid(day, windows=[2], upper=[0.5], lower=[0.5], premiums=[370])
+    thresholds = threshold_grid(day, thresholds=[20], premiums=[370])
+    assert np.isfinite(bands['pnl']).all() and np.isfinite(thresholds['pnl']).all()
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from backtester import DayData
+from batch_parity import check_trader
+
+
+@pytest.mark.parametrize('module_name', ['trader', 'trader_orchids', 'price_regress', 'working'])
+def test_batch_matches_run(module_name: str, synthetic_day: DayData) -> None:
+    # check_trader raises on the first prediction that is not bitwise equal
+    checked = check_trader(module_name, synthetic_day)
+    assert checked.get('calc_starfruit_prices', 0) > 0
+
+
+def test_batch_matches_run_with_trees(synthetic_day: DayData) -> None:
+    ensemble_module = pytest.importorskip('sklearn.ensemble')
+    from trees import from_sklearn
+
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(-7, -1, 5000), rng.uniform(5, 14, 5000), rng.uniform(-1, 0, 5000), rng.uniform(0.5, 2, 5000)])
+    y = -0.002 * X[:, 0] - 0.07 * X[:, 2] + rng.normal(0, 0.01, 5000)
+    model = ensemble_module.RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0).fit(X, y)
+    checked = check_trader('working', synthetic_day, orchids_model=from_sklearn(model).to_dict())
+    assert checked.get('calc_orchids_prices', 0) > 0
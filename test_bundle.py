@@ -0,0 +1,15 @@
+import pytest
+
+import bundle
+
+TRADERS = ['trader', 'trader_orchids', 'price_regress', 'working', 'test_trader', 'test_trader2']
+
+
+@pytest.mark.parametrize('module_name', TRADERS)
+def test_bundle_trades_without_numpy(module_name: str, tmp_path) -> None:
+    source = bundle.build(module_name)
+    # The batch pricing methods only serve research scripts, so nothing in the bundle reaches them
+    assert 'def calc_starfruit_prices' not in source
+    path = tmp_path / f'{module_name}.py'
+    path.write_text(source)
+    assert not bundle.measure(str(path), repeat=1)['numpy']
@@ -0,0 +1,25 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backtester import Backtester, DayData, load_trader
+
+
+def replay(trader: object, day: DayData) -> tuple[float, str]:
+    log = io.StringIO()
+    result = Backtester(trader, log_file=log).run(day)
+    return result.total_pnl, log.getvalue()
+
+
+@pytest.mark.parametrize('module_name', ['trader', 'trader_orchids', 'price_regress'])
+def test_threaded_replays_match_one_alone(module_name: str, synthetic_day: DayData) -> None:
+    # Traders replayed side by side share no state, their log buffers included, so each
+    # one's PnL and printed payloads are exactly those of a single replay
+    expected = replay(load_trader(module_name), synthetic_day)
+    traders = [load_trader(module_name) for _ in range(4)]
+    with ThreadPoolExecutor(len(traders)) as pool:
+        outputs = list(pool.map(lambda trader: replay(trader, synthetic_day), traders))
+    for pnl, log in outputs:
+        assert pnl == expected[0]
+        assert log == expected[1]
@@ -0,0 +1,14 @@
+import numpy as np
+
+from features import FeatureEngine, batch_features
+
+
+def test_streaming_matches_batch() -> None:
+    # Every row FeatureEngine streams is bitwise equal to batch_features, NaN included
+    prices = 5000 + np.cumsum(np.random.default_rng(0).normal(0, 1, 100_000)).round() / 2
+    expected = np.column_stack(list(batch_features(prices, 6).values()))
+    engine = FeatureEngine(6)
+    for t, price in enumerate(prices.tolist()):
+        engine.push(price)
+        row = engine.row()
+        assert np.array_equal(row, expected[t], equal_nan=True), f'tick {t}: streaming {row} != batch {expected[t]}'
@@ -0,0 +1,30 @@
+import pytest
+
+from backtester import load_trader
+from datamodel import Observation, OrderDepth, TradingState
+
+
+def amethysts_state(timestamp: int, position: dict[str, int]) -> TradingState:
+    # One AMETHYSTS ask below 10000, deeper than the position limit, so every trader buys
+    # up to its limit from whatever position it starts the tick with
+    order_depth = OrderDepth()
+    order_depth.buy_orders = {9996: 10}
+    order_depth.sell_orders = {9998: -30}
+    listings = {'AMETHYSTS': {'symbol': 'AMETHYSTS', 'product': 'AMETHYSTS', 'denomination': 'SEASHELLS'}}
+    return TradingState('', timestamp, listings, {'AMETHYSTS': order_depth}, {}, {}, position, Observation({}, {}))
+
+
+def bought(output: object) -> int:
+    # test_trader2 returns just its orders, as (symbol, price, quantity) tuples
+    orders = (output[0] if isinstance(output, tuple) else output)['AMETHYSTS']
+    return sum(order[2] if isinstance(order, tuple) else order.quantity for order in orders)
+
+
+@pytest.mark.parametrize('module_name', ['trader', 'trader_orchids', 'price_regress', 'working', 'test_trader', 'test_trader2'])
+def test_flat_product_missing_from_position(module_name: str) -> None:
+    # The first tick ends with the trader counting itself at its limit. The exchange then
+    # reports AMETHYSTS flat by leaving it out of state.position, so it buys the full limit
+    trader = load_trader(module_name)
+    limit = trader.POSITION_LIMITS['AMETHYSTS']
+    assert bought(trader.run(amethysts_state(0, {'AMETHYSTS': 5}))) == limit - 5
+    assert bought(trader.run(amethysts_state(100, {}))) == limit
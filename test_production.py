@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from production import production_change, production_lookup, total_production_change
+
+
+@pytest.fixture(scope='module')
+def observations() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Random observations, then every quarter point of humidity against every minute of
+    # sunlight to cover the bucket edges, then NaN
+    rng = np.random.default_rng(0)
+    grid_H, grid_s = np.meshgrid(np.arange(0, 100.25, 0.25), np.arange(0, 12, 1 / 60))
+    H = np.concatenate([rng.uniform(0, 100, 1_000_000), grid_H.ravel(), [np.nan, 70.0, np.nan]])
+    s = np.concatenate([rng.uniform(0, 24, 1_000_000), grid_s.ravel(), [8.0, np.nan, np.nan]])
+    expected = np.array([total_production_change(h, x) for h, x in zip(H.tolist(), s.tolist())])
+    return H, s, expected
+
+
+def test_production_change(observations: tuple[np.ndarray, np.ndarray, np.ndarray]) -> None:
+    H, s, expected = observations
+    actual = production_change(H, s)
+    mismatched = np.flatnonzero(~((actual == expected) | (np.isnan(actual) & np.isnan(expected))))
+    assert not len(mismatched), f'production_change({H[mismatched[0]]}, {s[mismatched[0]]}) = {actual[mismatched[0]]}, expected {expected[mismatched[0]]}'
+
+
+def test_production_lookup(observations: tuple[np.ndarray, np.ndarray, np.ndarray]) -> None:
+    H, s, expected = observations
+    finite = ~np.isnan(H) & ~np.isnan(s)
+    for h, x, value in zip(H[finite].tolist(), s[finite].tolist(), expected[finite].tolist()):
+        assert production_lookup(h, x) == value, f'production_lookup({h}, {x})'
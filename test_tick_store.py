@@ -0,0 +1,29 @@
+import os
+
+from backtester import load_day
+from tick_store import convert_prices, is_current, store_path
+
+HEADER = 'day;timestamp;product;bid_price_1;bid_volume_1;ask_price_1;ask_volume_1;mid_price;profit_and_loss'
+
+
+def write_prices(path: str, mid: int) -> None:
+    with open(path, 'w') as f:
+        f.write(HEADER + '\n')
+        for timestamp in range(0, 300, 100):
+            f.write(f'0;{timestamp};AMETHYSTS;{mid - 1};10;{mid + 1};10;{mid}.0;0\n')
+
+
+def test_stale_store_is_converted_again(tmp_path) -> None:
+    csv_path = str(tmp_path / 'prices_round_1_day_0.csv')
+    write_prices(csv_path, 10000)
+    convert_prices(csv_path)
+    assert is_current(store_path(csv_path), csv_path)
+    assert load_day(str(tmp_path), 1, 0).mid_prices[0]['AMETHYSTS'] == 10000
+
+    # The same size as before, with the mtime nudged in case the filesystem clock is coarse
+    write_prices(csv_path, 10002)
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert not is_current(store_path(csv_path), csv_path)
+    assert load_day(str(tmp_path), 1, 0).mid_prices[0]['AMETHYSTS'] == 10002
+    assert is_current(store_path(csv_path), csv_path)
@@ -1,85 +1,86 @@
+# Imports helpers from this repo, so it cannot be pasted into the platform as it is: submit
+# the single file `python bundle.py test_trader` writes to submission/test_trader.py instead
 from datamodel import OrderDepth, TradingState, Order
 from typing import List
-import numpy as np
+import math
+from rolling import LagWindow
+from production import production_lookup
+from book_snapshot import snapshot_books
+
+class RunState:
+    '''
+    Everything a Trader accumulates over a run, owned by one Trader so instances in the
+    same process never share positions or caches.
+    '''
+    def __init__(self, trader: 'Trader') -> None:
+        self.positions = {product: 0 for product in trader.POSITION_LIMITS}
+        self.starfruit_cache = LagWindow(len(trader.STARFRUIT_COEF))
+        self.curr_starfruit_price = 0
+        self.curr_orchids_price = 0
+        self.curr_import = 0
+        self.curr_export = 0
+        self.curr_production = 0
+        self.curr_transport = 0
 
 class Trader:
     STARFRUIT_COEF = [-0.703591491407734, -0.4918330007028236, -0.3442257990494724, -0.23474182959132742, -0.13766592122288243, -0.06159321908371221]
     STARFRUIT_INT = 1.0285830994358876e-06
-    starfruit_cache = []
 
     ORCHIDS_COEF = [-0.00222597542860434, -0.0001782550473343116, -0.06775987455596787, -0.0034279249954251075]
     ORCHIDS_INT = -0.11628586488710894
 
     POSITION_LIMITS = {'AMETHYSTS': 20, 'STARFRUIT': 20, 'ORCHIDS': 100}
-    POSITIONS = {'AMETHYSTS': 0, 'STARFRUIT': 0, 'ORCHIDS': 0}
-    
-    curr_starfruit_price = 0
-    curr_orchids_price = 0
 
-    def total_production_change(self, H, s):
-        if 60 <= H <= 80:
-            humidity_change = 0
-        elif H < 60:
-            num_fives = (60 - H) // 5
-            humidity_change = num_fives * -0.02
-        else:  # H > 80
-            num_fives = (H - 80) // 5
-            humidity_change = num_fives * -0.02
-        
-        minutes = s * 60  # Converts hours to minutes
-        rounded_minutes = (minutes // 10) * 10  # Rounds down to the nearest 10 minutes
-        rounded_hours = rounded_minutes / 60  # Converts back to hours
-        
-        if rounded_hours < 7:
-            ten_minute_intervals = (7 - rounded_hours) * 6
-            sunlight_change = -0.04 * ten_minute_intervals
-        else:
-            sunlight_change = 0
+    def __init__(self) -> None:
+        self.reset()
 
-        production_change = humidity_change + sunlight_change
-        return production_change
+    def reset(self) -> None:
+        # Forgets every earlier tick; also needed after changing parameters on an instance
+        self.run_state = RunState(self)
+
+    def total_production_change(self, H, s):
+        return production_lookup(H, s)
 
     def calc_orchids_price(self):
         next_ret = self.ORCHIDS_INT
-        next_ret += self.curr_import*self.ORCHIDS_COEF[0] 
-        next_ret += self.curr_export*self.ORCHIDS_COEF[1] 
-        next_ret += self.curr_production*self.ORCHIDS_COEF[2] 
-        next_ret += self.curr_transport*self.ORCHIDS_COEF[3]
-        return self.curr_orchids_price * np.exp(next_ret)
+        next_ret += self.run_state.curr_import*self.ORCHIDS_COEF[0] 
+        next_ret += self.run_state.curr_export*self.ORCHIDS_COEF[1] 
+        next_ret += self.run_state.curr_production*self.ORCHIDS_COEF[2] 
+        next_ret += self.run_state.curr_transport*self.ORCHIDS_COEF[3]
+        return self.run_state.curr_orchids_price * math.exp(next_ret)
 
     def calc_starfruit_price(self):
-        if len(self.starfruit_cache) < 6:
+        if not self.run_state.starfruit_cache.full:
             return None
-        next_ret = self.STARFRUIT_INT
-        for i, ret in enumerate(reversed(self.starfruit_cache)):
-            next_ret += ret * self.STARFRUIT_COEF[i]
-        return self.curr_starfruit_price * np.exp(next_ret)
+        next_ret = self.STARFRUIT_INT + self.run_state.starfruit_cache.dot(self.STARFRUIT_COEF)
+        return self.run_state.curr_starfruit_price * math.exp(next_ret)
 
     def run(self, state: TradingState):
         print("traderData: " + state.traderData)
         print("Observations: " + str(state.observations))
 
-        result = {}
-        for product in state.order_depths:
-            if product not in self.POSITIONS:
-                self.POSITIONS[product] = 0
+        # The exchange's positions rather than our own count, so fills that did not happen and
+        # a restarted process both start the tick from the truth
+        for product in self.run_state.positions:
+            self.run_state.positions[product] = state.position.get(product, 0)
 
-            order_depth: OrderDepth = state.order_depths[product]
+        result = {}
+        for product, book in snapshot_books(state.order_depths).items():
             orders: List[Order] = []
-            current_position = self.POSITIONS[product]
+            current_position = self.run_state.positions.get(product, 0)
             position_limit = self.POSITION_LIMITS.get(product, 0)
 
             if product == 'AMETHYSTS':
                 amethysts_lb = 10000
                 amethysts_ub = 10000
 
-                for ask, qty in order_depth.sell_orders.items():
+                for ask, qty in book.asks:
                     if ask < amethysts_lb and current_position < position_limit:
-                        quantity = min(-qty, position_limit - current_position)
+                        quantity = min(qty, position_limit - current_position)
                         orders.append(Order(product, ask, quantity))
                         current_position += quantity
                 
-                for bid, qty in order_depth.buy_orders.items():
+                for bid, qty in book.bids:
                     if bid > amethysts_ub and current_position > -position_limit:
                         quantity = min(qty, current_position + position_limit)
                         orders.append(Order(product, bid, -quantity))
@@ -88,13 +89,13 @@ class Trader:
             elif product == 'STARFRUIT':
                 next_price = self.calc_starfruit_price()
                 if next_price:
-                    for ask, qty in order_depth.sell_orders.items():
+                    for ask, qty in book.asks:
                         if ask < next_price - 2 and current_position < position_limit:
-                            quantity = min(-qty, position_limit - current_position)
+                            quantity = min(qty, position_limit - current_position)
                             orders.append(Order(product, ask, quantity))
                             current_position += quantity
                     
-                    for bid, qty in order_depth.buy_orders.items():
+                    for bid, qty in book.bids:
                         if bid > next_price + 2 and current_position > -position_limit:
                             quantity = min(qty, current_position + position_limit)
                             orders.append(Order(product, bid, -quantity))
@@ -103,24 +104,25 @@ class Trader:
             elif product == 'ORCHIDS':
                 next_price = self.calc_orchids_price()
                 if next_price:
-                    for ask, qty in order_depth.sell_orders.items():
+                    for ask, qty in book.asks:
                         if ask < next_price - 1 and current_position < position_limit:
-                            quantity = min(-qty, position_limit - current_position)
+                            quantity = min(qty, position_limit - current_position)
                             orders.append(Order(product, ask, quantity))
                             current_position += quantity
                     
-                    for bid, qty in order_depth.buy_orders.items():
+                    for bid, qty in book.bids:
                         if bid > next_price + 1 and current_position > -position_limit:
                             quantity = min(qty, current_position + position_limit)
                             orders.append(Order(product, bid, -quantity))
                             current_position -= quantity
 
-            self.POSITIONS[product] = current_position
+            self.run_state.positions[product] = current_position
             result[product] = orders
 
-        traderData = "Current POSITIONS: " + str(self.POSITIONS)  # Adjust this as needed based on what you want to monitor
+        traderData = "Current POSITIONS: " + str(self.run_state.positions)  # Adjust this as needed based on what you want to monitor
         conversions = 1  # Assuming a sample conversion logic
         
         return result, conversions, traderData  # Ensure to return all expected outputs
 
-# You can now paste this corrected code into the IMC competition's environment.
+# To submit, paste the single file `python bundle.py test_trader` writes to submission/test_trader.py
+# into the IMC competition's environment; this one imports rolling and production.
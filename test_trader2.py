@@ -1,70 +1,89 @@
+# Imports helpers from this repo, so it cannot be pasted into the platform as it is: submit
+# the single file `python bundle.py test_trader2` writes to submission/test_trader2.py instead
 from typing import List, Dict
-import numpy as np
+import math
+from features import FeatureEngine
+from book_snapshot import BookSnapshot, snapshot_books
+
+class RunState:
+    '''
+    Everything a Trader accumulates over a run, owned by one Trader so instances in the
+    same process never share positions or features.
+    '''
+    def __init__(self, trader: 'Trader') -> None:
+        self.positions = {product: 0 for product in trader.POSITION_LIMITS}
+        self.starfruit_features = FeatureEngine(len(trader.STARFRUIT_COEF) - 1)
+        self.curr_starfruit_price = 0
 
 class Trader:
     POSITION_LIMITS = {'AMETHYSTS': 20, 'STARFRUIT': 20}
-    POSITIONS = {'AMETHYSTS': 0, 'STARFRUIT': 0}
-    starfruit_cache = []
     STARFRUIT_COEF = [-0.6875135892542726, -0.4602404386137076, -0.2840509702833329, -0.13946125412947463]
     STARFRUIT_INT = 2.2567213536783118e-07
-    curr_starfruit_price = 0
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        # Forgets every earlier tick; also needed after changing parameters on an instance
+        self.run_state = RunState(self)
 
     def calc_starfruit_price(self) -> float:
-        if len(self.starfruit_cache) < 4:
+        if not self.run_state.starfruit_features.ready('log_return'):
             return None
-        next_ret = self.STARFRUIT_INT
-        for i, ret in enumerate(reversed(self.starfruit_cache)):
-            next_ret += ret * self.STARFRUIT_COEF[i]
-        return self.curr_starfruit_price * np.exp(next_ret)
+        next_ret = self.STARFRUIT_INT + self.run_state.starfruit_features.windows['log_return'].dot(self.STARFRUIT_COEF)
+        return self.run_state.curr_starfruit_price * math.exp(next_ret)
 
-    def compute_starfruit_orders(self, order_depth):
+    def compute_starfruit_orders(self, book: BookSnapshot):
         orders = []
         next_price = self.calc_starfruit_price()
         if next_price:
-            for ask, qty in order_depth.sell_orders.items():
-                if ask < next_price - 1 and self.POSITIONS['STARFRUIT'] < self.POSITION_LIMITS['STARFRUIT']:
-                    quantity = min(-qty, self.POSITION_LIMITS['STARFRUIT'] - self.POSITIONS['STARFRUIT'])
+            for ask, qty in book.asks:
+                if ask < next_price - 1 and self.run_state.positions['STARFRUIT'] < self.POSITION_LIMITS['STARFRUIT']:
+                    quantity = min(qty, self.POSITION_LIMITS['STARFRUIT'] - self.run_state.positions['STARFRUIT'])
                     orders.append(('STARFRUIT', ask, quantity))
-                    self.POSITIONS['STARFRUIT'] += quantity
-            for bid, qty in order_depth.buy_orders.items():
-                if bid > next_price + 1 and self.POSITIONS['STARFRUIT'] > -self.POSITION_LIMITS['STARFRUIT']:
-                    quantity = min(qty, self.POSITIONS['STARFRUIT'] + self.POSITION_LIMITS['STARFRUIT'])
+                    self.run_state.positions['STARFRUIT'] += quantity
+            for bid, qty in book.bids:
+                if bid > next_price + 1 and self.run_state.positions['STARFRUIT'] > -self.POSITION_LIMITS['STARFRUIT']:
+                    quantity = min(qty, self.run_state.positions['STARFRUIT'] + self.POSITION_LIMITS['STARFRUIT'])
                     orders.append(('STARFRUIT', bid, -quantity))
-                    self.POSITIONS['STARFRUIT'] -= quantity
+                    self.run_state.positions['STARFRUIT'] -= quantity
         return orders
 
-    def compute_amethysts_orders(self, order_depth):
+    def compute_amethysts_orders(self, book: BookSnapshot):
         orders = []
-        for ask, qty in order_depth.sell_orders.items():
-            if ask < 10000 and self.POSITIONS['AMETHYSTS'] < self.POSITION_LIMITS['AMETHYSTS']:
-                quantity = min(-qty, self.POSITION_LIMITS['AMETHYSTS'] - self.POSITIONS['AMETHYSTS'])
+        for ask, qty in book.asks:
+            if ask < 10000 and self.run_state.positions['AMETHYSTS'] < self.POSITION_LIMITS['AMETHYSTS']:
+                quantity = min(qty, self.POSITION_LIMITS['AMETHYSTS'] - self.run_state.positions['AMETHYSTS'])
                 orders.append(('AMETHYSTS', ask, quantity))
-                self.POSITIONS['AMETHYSTS'] += quantity
-        for bid, qty in order_depth.buy_orders.items():
-            if bid > 10000 and self.POSITIONS['AMETHYSTS'] > -self.POSITION_LIMITS['AMETHYSTS']:
-                quantity = min(qty, self.POSITIONS['AMETHYSTS'] + self.POSITION_LIMITS['AMETHYSTS'])
+                self.run_state.positions['AMETHYSTS'] += quantity
+        for bid, qty in book.bids:
+            if bid > 10000 and self.run_state.positions['AMETHYSTS'] > -self.POSITION_LIMITS['AMETHYSTS']:
+                quantity = min(qty, self.run_state.positions['AMETHYSTS'] + self.POSITION_LIMITS['AMETHYSTS'])
                 orders.append(('AMETHYSTS', bid, -quantity))
-                self.POSITIONS['AMETHYSTS'] -= quantity
+                self.run_state.positions['AMETHYSTS'] -= quantity
         return orders
 
     def run(self, state):
+        # The exchange's positions rather than our own count, so fills that did not happen and
+        # a restarted process both start the tick from the truth
+        for product in self.run_state.positions:
+            self.run_state.positions[product] = state.position.get(product, 0)
+
+        books = snapshot_books(state.order_depths)
+
         # Update current price from market data
-        if 'STARFRUIT' in state.order_depths:
-            mid_price = (list(state.order_depths['STARFRUIT'].sell_orders.keys())[0] +
-                         list(state.order_depths['STARFRUIT'].buy_orders.keys())[0]) / 2
-            if self.curr_starfruit_price:
-                self.starfruit_cache.append(np.log(mid_price / self.curr_starfruit_price))
-            self.curr_starfruit_price = mid_price
-            if len(self.starfruit_cache) > 4:
-                self.starfruit_cache.pop(0)
+        if 'STARFRUIT' in books and books['STARFRUIT'].mid is not None:
+            mid_price = books['STARFRUIT'].mid
+            self.run_state.starfruit_features.push(mid_price)
+            self.run_state.curr_starfruit_price = mid_price
 
         # Process orders for each product
         result = {}
-        for product, order_depth in state.order_depths.items():
+        for product, book in books.items():
             if product == 'AMETHYSTS':
-                result[product] = self.compute_amethysts_orders(order_depth)
+                result[product] = self.compute_amethysts_orders(book)
             elif product == 'STARFRUIT':
-                result[product] = self.compute_starfruit_orders(order_depth)
+                result[product] = self.compute_starfruit_orders(book)
 
         # Any additional processing needed for state update
 
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from trees import TreeEnsemble, from_sklearn, from_xgboost
+
+
+def orchids_like(num_rows: int = 20_000, seed: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Training rows shaped like the ORCHIDS features, and test rows close to and on them
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.uniform(-6, -2, num_rows), rng.uniform(9, 12, num_rows), rng.uniform(-1, 0, num_rows), rng.uniform(0.8, 1.2, num_rows)])
+    y = -0.002 * X[:, 0] - 0.07 * X[:, 2] + 0.01 * np.sin(4 * X[:, 3]) + rng.normal(0, 0.01, num_rows)
+    X_test = np.vstack([X[:2000] + rng.normal(0, 0.01, (2000, 4)), X[:100]])
+    return X, y, X_test
+
+
+def check_export(model: object, ensemble: TreeEnsemble, X_test: np.ndarray, tolerance: float) -> None:
+    expected = model.predict(X_test).astype(np.float64)
+    single = np.array([ensemble.predict(row) for row in X_test.tolist()])
+    batch = ensemble.predict_batch(X_test)
+    assert np.array_equal(single, batch), 'predict and predict_batch differ'
+    assert np.abs(batch - expected).max() <= tolerance
+    # And the same again after a round trip through the JSON form the traders load
+    assert np.array_equal(TreeEnsemble.from_dict(ensemble.to_dict()).predict_batch(X_test), batch)
+
+
+def test_random_forest() -> None:
+    ensemble_module = pytest.importorskip('sklearn.ensemble')
+    X, y, X_test = orchids_like()
+    model = ensemble_module.RandomForestRegressor(n_estimators=50, max_depth=12, random_state=0).fit(X, y)
+    check_export(model, from_sklearn(model), X_test, 0.0)
+
+
+def test_xgboost() -> None:
+    xgb = pytest.importorskip('xgboost')
+    X, y, X_test = orchids_like()
+    model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=100).fit(X, y)
+    expected = model.predict(X_test)
+    # XGBoost's float32 accumulation is the only source of difference
+    check_export(model, from_xgboost(model), X_test, 1e-6 * max(1.0, float(np.abs(expected).max())))
@@ -0,0 +1,179 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import shutil
+import time
+from typing import Any
+
+import numpy as np
+
+INDEX_FILE = 'index.json'
+INT_FIELDS = {'day', 'timestamp'}
+CHUNK_ROWS = 1_000_000
+
+
+def store_path(csv_path: str) -> str:
+    # prices_round_3_day_0.csv is stored in the directory prices_round_3_day_0/
+    return os.path.splitext(csv_path)[0]
+
+
+def parse_chunk(rows: list[list[str]], header: list[str], codes: dict[str, int]) -> dict[str, np.ndarray]:
+    columns = {}
+    for i, field in enumerate(header):
+        values = [row[i] for row in rows]
+        if field == 'product':
+            columns[field] = np.array([codes.setdefault(value, len(codes)) for value in values], dtype=np.uint8)
+        elif field in INT_FIELDS:
+            columns[field] = np.array(values, dtype=np.int64)
+        else:
+            # Missing book levels are empty strings, kept as NaN like pd.read_csv does
+            columns[field] = np.array([value or 'nan' for value in values], dtype=np.float64)
+    return columns
+
+
+def convert_prices(csv_path: str, out_dir: str | None = None) -> str:
+    '''
+    Converts a prices_round_R_day_D.csv file into a directory holding one .npy file per
+    column plus index.json. Rows are sorted by product and then timestamp, so every
+    product is one contiguous row range recorded in the index. The CSV is read in chunks
+    of CHUNK_ROWS and each column is spilled to disk as it goes, so memory stays bounded
+    for files of any length. index.json is written last and marks a complete store, with
+    the CSV's size and modification time as read so that later edits show up as stale.
+    '''
+    out_dir = out_dir or store_path(csv_path)
+    stamp = source_stamp(csv_path)
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+
+    codes: dict[str, int] = {}
+    num_rows = 0
+    with open(csv_path, newline='') as f:
+        reader = csv.reader(f, delimiter=';')
+        header = next(reader)
+        spills = {field: open(os.path.join(out_dir, f'{field}.raw'), 'wb') for field in header}
+        dtypes = {}
+        while True:
+            rows = [row for _, row in zip(range(CHUNK_ROWS), reader)]
+            if not rows:
+                break
+            num_rows += len(rows)
+            for field, values in parse_chunk(rows, header, codes).items():
+                values.tofile(spills[field])
+                dtypes[field] = values.dtype
+        for spill in spills.values():
+            spill.close()
+
+    products = sorted(codes)
+    # Recode products alphabetically and sort the rows by (product, timestamp)
+    recode = np.zeros(max(len(codes), 1), dtype=np.uint8)
+    for rank, product in enumerate(products):
+        recode[codes[product]] = rank
+    product_codes = recode[np.fromfile(os.path.join(out_dir, 'product.raw'), dtype=np.uint8)]
+    timestamps = np.fromfile(os.path.join(out_dir, 'timestamp.raw'), dtype=np.int64)
+    order = np.lexsort((timestamps, product_codes))
+    bounds = np.searchsorted(product_codes[order], np.arange(len(products) + 1))
+
+    for field in header:
+        raw_path = os.path.join(out_dir, f'{field}.raw')
+        values = product_codes if field == 'product' else np.memmap(raw_path, dtype=dtypes.get(field, np.float64), mode='r', shape=(num_rows,))
+        column = np.lib.format.open_memmap(os.path.join(out_dir, f'{field}.npy'), mode='w+', dtype=values.dtype, shape=(num_rows,))
+        column[:] = values[order]
+        column.flush()
+        del column, values
+        os.remove(raw_path)
+
+    index = {
+        'source': os.path.basename(csv_path),
+        'stamp': stamp,
+        'rows': num_rows,
+        'fields': header,
+        'products': {product: [int(bounds[i]), int(bounds[i + 1])] for i, product in enumerate(products)},
+    }
+    with open(os.path.join(out_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+    return out_dir
+
+
+def source_stamp(csv_path: str) -> list[int]:
+    stat = os.stat(csv_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def is_store(path: str) -> bool:
+    return os.path.exists(os.path.join(path, INDEX_FILE))
+
+
+def is_current(path: str, csv_path: str) -> bool:
+    # A complete store converted from the CSV as it is now, not one an edited, replaced
+    # or regenerated CSV has left behind
+    if not is_store(path):
+        return False
+    with open(os.path.join(path, INDEX_FILE)) as f:
+        return json.load(f).get('stamp') == source_stamp(csv_path)
+
+
+class TickStore:
+    '''
+    A converted prices file. Columns are memory-mapped the first time they are used and
+    product(name) returns views into them, so opening a day parses nothing and slicing
+    a product copies nothing. Missing book levels are NaN, as with pd.read_csv.
+    '''
+    def __init__(self, path: str) -> None:
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.path = path
+        self.num_rows: int = index['rows']
+        self.fields: list[str] = index['fields']
+        self.ranges: dict[str, tuple[int, int]] = {product: tuple(bounds) for product, bounds in index['products'].items()}
+        self.columns: dict[str, np.ndarray] = {}
+
+    @property
+    def products(self) -> list[str]:
+        return list(self.ranges)
+
+    def column(self, field: str) -> np.ndarray:
+        column = self.columns.get(field)
+        if column is None:
+            if field not in self.fields:
+                raise KeyError(field)
+            column = self.columns[field] = np.load(os.path.join(self.path, f'{field}.npy'), mmap_mode='r')
+        return column
+
+    def product(self, product: str) -> dict[str, np.ndarray]:
+        start, stop = self.ranges[product]
+        return {field: self.column(field)[start:stop] for field in self.fields if field != 'product'}
+
+    def to_frame(self, product: str | None = None) -> Any:
+        # pandas is only needed by the notebooks, so it is imported on demand
+        import pandas as pd
+        if product is not None:
+            frame = pd.DataFrame(self.product(product))
+            frame.insert(2, 'product', product)
+            return frame
+        frame = pd.DataFrame({field: self.column(field) for field in self.fields})
+        frame['product'] = pd.Categorical.from_codes(frame['product'], self.products)
+        return frame
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Convert prices_round_R_day_D.csv files into memory-mapped column stores')
+    parser.add_argument('paths', nargs='+', help='CSV files or directories to search for prices_round_*_day_*.csv')
+    parser.add_argument('--force', action='store_true', help='convert again even if a store already exists')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        csv_paths = sorted(glob.glob(os.path.join(path, 'prices_round_*_day_*.csv'))) if os.path.isdir(path) else [path]
+        for csv_path in csv_paths:
+            if is_current(store_path(csv_path), csv_path) and not args.force:
+                print(f'{csv_path}: already converted')
+                continue
+            start = time.perf_counter()
+            out_dir = convert_prices(csv_path)
+            print(f'{csv_path} -> {out_dir} ({TickStore(out_dir).num_rows:,} rows, {time.perf_counter() - start:.1f}s)')
+
+
+if __name__ == '__main__':
+    main()
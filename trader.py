@@ -1,115 +1,35 @@
+# Imports helpers from this repo, so it cannot be pasted into the platform as it is: submit
+# the single file `python bundle.py trader` writes to submission/trader.py instead
 from datamodel import OrderDepth, TradingState, Order
 from typing import List
 import numpy as np
-import collections
 import json
 from datamodel import Listing, Observation, Order, OrderDepth, ProsperityEncoder, Symbol, Trade, TradingState
 from typing import Any
-
-class Logger:
-    def __init__(self) -> None:
-        self.logs = ""
-        self.max_log_length = 3750
-
-    def print(self, *objects: Any, sep: str = " ", end: str = "\n") -> None:
-        self.logs += sep.join(map(str, objects)) + end
-
-    def flush(self, state: TradingState, orders: dict[Symbol, list[Order]], conversions: int, trader_data: str) -> None:
-        base_length = len(self.to_json([
-            self.compress_state(state, ""),
-            self.compress_orders(orders),
-            conversions,
-            "",
-            "",
-        ]))
-
-        # We truncate state.traderData, trader_data, and self.logs to the same max. length to fit the log limit
-        max_item_length = (self.max_log_length - base_length) // 3
-
-        print(self.to_json([
-            self.compress_state(state, self.truncate(state.traderData, max_item_length)),
-            self.compress_orders(orders),
-            conversions,
-            self.truncate(trader_data, max_item_length),
-            self.truncate(self.logs, max_item_length),
-        ]))
-
-        self.logs = ""
-
-    def compress_state(self, state: TradingState, trader_data: str) -> list[Any]:
-        return [
-            state.timestamp,
-            trader_data,
-            self.compress_listings(state.listings),
-            self.compress_order_depths(state.order_depths),
-            self.compress_trades(state.own_trades),
-            self.compress_trades(state.market_trades),
-            state.position,
-            self.compress_observations(state.observations),
-        ]
-
-    def compress_listings(self, listings: dict[Symbol, Listing]) -> list[list[Any]]:
-        compressed = []
-        for listing in listings.values():
-            compressed.append([listing["symbol"], listing["product"], listing["denomination"]])
-
-        return compressed
-
-    def compress_order_depths(self, order_depths: dict[Symbol, OrderDepth]) -> dict[Symbol, list[Any]]:
-        compressed = {}
-        for symbol, order_depth in order_depths.items():
-            compressed[symbol] = [order_depth.buy_orders, order_depth.sell_orders]
-
-        return compressed
-
-    def compress_trades(self, trades: dict[Symbol, list[Trade]]) -> list[list[Any]]:
-        compressed = []
-        for arr in trades.values():
-            for trade in arr:
-                compressed.append([
-                    trade.symbol,
-                    trade.price,
-                    trade.quantity,
-                    trade.buyer,
-                    trade.seller,
-                    trade.timestamp,
-                ])
-
-        return compressed
-
-    def compress_observations(self, observations: Observation) -> list[Any]:
-        conversion_observations = {}
-        for product, observation in observations.conversionObservations.items():
-            conversion_observations[product] = [
-                observation.bidPrice,
-                observation.askPrice,
-                observation.transportFees,
-                observation.exportTariff,
-                observation.importTariff,
-                observation.sunlight,
-                observation.humidity,
-            ]
-
-        return [observations.plainValueObservations, conversion_observations]
-
-    def compress_orders(self, orders: dict[Symbol, list[Order]]) -> list[list[Any]]:
-        compressed = []
-        for arr in orders.values():
-            for order in arr:
-                compressed.append([order.symbol, order.price, order.quantity])
-
-        return compressed
-
-    def to_json(self, value: Any) -> str:
-        return json.dumps(value, cls=ProsperityEncoder, separators=(",", ":"))
-
-    def truncate(self, value: str, max_length: int) -> str:
-        if len(value) <= max_length:
-            return value
-
-        return value[:max_length - 3] + "..."
-
-logger = Logger()
+from logger import Logger
+from profiling import Profiler
+from deadline import DeadlineRunner
+from book_snapshot import BookSnapshot, snapshot_books
+from features import lag_dot, lag_matrix
+from rolling import LagWindow, RollingStats
+from rls import RecursiveLeastSquares
+from state_codec import decode_state, encode_state
+
+
+class RunState:
+    '''
+    Everything a Trader accumulates over a run. Each Trader owns one, so traders replayed
+    side by side in one process never share positions or caches. It is built from the
+    trader's parameters, so Trader.reset() after changing them starts a consistent run.
+    '''
+    def __init__(self, trader: 'Trader') -> None:
+        self.positions = {product: 0 for product in trader.POSITION_LIMITS}
+        self.starfruit_cache = LagWindow(len(trader.STARFRUIT_COEF))
+        self.differences_cache = RollingStats(200)
+        # Online STARFRUIT fit, created on first use when STARFRUIT_FORGETTING is set
+        self.starfruit_rls: RecursiveLeastSquares | None = None
+        # traderData as last saved or loaded
+        self.trader_data = ''
 
 
 class Trader:
@@ -119,13 +39,44 @@ class Trader:
  0.20454692911372097,
  0.19720337509805655]
     STARFRUIT_INT = 11.802383435338925
-    starfruit_cache = []
     POSITION_LIMITS = {'AMETHYSTS': 20, 'STARFRUIT': 20, 'CHOCOLATE': 250, 'STRAWBERRIES': 350, 'ROSES': 60, 'GIFT_BASKET': 60} 
-    POSITIONS = {'AMETHYSTS': 0, 'STARFRUIT': 0, 'CHOCOLATE': 0, 'STRAWBERRIES': 0, 'ROSES': 0, 'GIFT_BASKET': 0}
-    curr_starfruit_price = 0
-    differences_cache = []
+    STATE_VERSION = 1
+    # Per-tick time budget in milliseconds, None runs every strategy
+    TIME_BUDGET_MS = None
+    # Forgetting factor for re-fitting STARFRUIT_COEF online, None keeps the fixed fit
+    STARFRUIT_FORGETTING = None
 
 
+    def __init__(self) -> None:
+        # Per trader, so traders replayed side by side never share a log buffer or timings
+        self.logger = Logger()
+        self.profiler = Profiler()
+        self.reset()
+
+    def reset(self) -> None:
+        # Forgets every earlier tick; also needed after changing parameters on an instance
+        self.run_state = RunState(self)
+        self.runner = DeadlineRunner(self.profiler)
+
+    def save_state(self) -> str:
+        self.run_state.trader_data = encode_state(self.STATE_VERSION, [
+            *self.run_state.starfruit_cache.get_state(),
+            *self.run_state.differences_cache.get_state(),
+            *(self.run_state.starfruit_rls.get_state() if self.run_state.starfruit_rls is not None else []),
+        ])
+        return self.run_state.trader_data
+
+    def load_state(self, trader_data: str) -> None:
+        # Restores the caches when the platform has started a fresh process
+        sections = decode_state(self.STATE_VERSION, trader_data)
+        if sections is None or len(sections) not in (4, 6):
+            return
+        self.run_state.starfruit_cache.set_state(sections[0], sections[1])
+        self.run_state.differences_cache.set_state(sections[2], sections[3])
+        if len(sections) == 6 and self.starfruit_model() is not None:
+            self.run_state.starfruit_rls.set_state(sections[4], sections[5])
+        self.run_state.trader_data = trader_data
+
     def values_extract(self, order_dict, buy=0):
         tot_vol = 0
         best_val = -1
@@ -141,94 +92,99 @@ class Trader:
         
         return tot_vol, best_val
     
-    def calc_starfruit_price(self):
-        if len(self.starfruit_cache) < 4:
+    def starfruit_model(self) -> RecursiveLeastSquares | None:
+        # Created on first use so STARFRUIT_FORGETTING can be set after __init__, as sweep.py does
+        if self.STARFRUIT_FORGETTING is None:
             return None
-        next_price = self.STARFRUIT_INT
-        for i, price in enumerate(reversed(self.starfruit_cache)):
-            next_price += price * self.STARFRUIT_COEF[i]
-        return next_price
+        if self.run_state.starfruit_rls is None:
+            self.run_state.starfruit_rls = RecursiveLeastSquares(self.STARFRUIT_COEF, self.STARFRUIT_INT, self.STARFRUIT_FORGETTING)
+        return self.run_state.starfruit_rls
 
-    def compute_amethysts_orders(self, state):
+    def calc_starfruit_price(self):
+        if not self.run_state.starfruit_cache.full:
+            return None
+        model = self.starfruit_model()
+        if model is not None:
+            return model.predict(self.run_state.starfruit_cache.values)
+        return self.STARFRUIT_INT + self.run_state.starfruit_cache.dot(self.STARFRUIT_COEF)
+
+    def calc_starfruit_prices(self, mid_prices: np.ndarray) -> np.ndarray:
+        '''
+        calc_starfruit_price for a whole day in one NumPy call: element t is what it returns
+        once mid_prices[:t + 1] have been pushed, NaN where it returns None. The online fit
+        depends on every earlier update, so it has no batch form.
+        '''
+        if self.starfruit_model() is not None:
+            raise ValueError('STARFRUIT_FORGETTING is set; the online fit can only run tick by tick')
+        return self.STARFRUIT_INT + lag_dot(lag_matrix(mid_prices, len(self.STARFRUIT_COEF)), self.STARFRUIT_COEF)
+
+    def compute_amethysts_orders(self, state, books):
         orders = []
-        order_depth: OrderDepth = state.order_depths['AMETHYSTS']
-        current_position = self.POSITIONS['AMETHYSTS']
+        book: BookSnapshot = books['AMETHYSTS']
+        current_position = self.run_state.positions['AMETHYSTS']
         position_limit = self.POSITION_LIMITS['AMETHYSTS']
         amethysts_lb = 10000
         amethysts_ub = 10000
 
-        for ask, qty in order_depth.sell_orders.items():
+        for ask, qty in book.asks:
             if ask < amethysts_lb and current_position < position_limit:
-                quantity = min(-qty, position_limit - current_position)
+                quantity = min(qty, position_limit - current_position)
                 orders.append(Order('AMETHYSTS', ask, quantity))
                 current_position += quantity
 
-        for bid, qty in order_depth.buy_orders.items():
+        for bid, qty in book.bids:
             if bid > amethysts_ub and current_position > -position_limit:
                 quantity = min(qty, current_position + position_limit)
                 orders.append(Order('AMETHYSTS', bid, -quantity))
                 current_position -= quantity
 
-        self.POSITIONS['AMETHYSTS'] = current_position
+        self.run_state.positions['AMETHYSTS'] = current_position
         return orders
 
-    def compute_starfruit_orders(self, state):
+    def compute_starfruit_orders(self, state, books):
         orders = []
-        order_depth: OrderDepth = state.order_depths['STARFRUIT']
-        current_position = self.POSITIONS['STARFRUIT']
+        book: BookSnapshot = books['STARFRUIT']
+        current_position = self.run_state.positions['STARFRUIT']
         position_limit = self.POSITION_LIMITS['STARFRUIT']
         next_price = self.calc_starfruit_price()
 
         if next_price:
-            for ask, qty in order_depth.sell_orders.items():
+            for ask, qty in book.asks:
                 if ask < next_price + 0.75 and current_position < position_limit:
-                    quantity = min(-qty, position_limit - current_position)
+                    quantity = min(qty, position_limit - current_position)
                     orders.append(Order('STARFRUIT', ask, quantity))
                     current_position += quantity
 
-            for bid, qty in order_depth.buy_orders.items():
+            for bid, qty in book.bids:
                 if bid > next_price - 0.75 and current_position > -position_limit:
                     quantity = min(qty, current_position + position_limit)
                     orders.append(Order('STARFRUIT', bid, -quantity))
                     current_position -= quantity
 
-        self.POSITIONS['STARFRUIT'] = current_position
+        self.run_state.positions['STARFRUIT'] = current_position
         return orders
     
 
-    def compute_orders_basket(self, state):
-
-        orders = {'GIFT_BASKET': [], 'STRAWBERRIES': [], 'CHOCOLATE': [], 'ROSES': []}
-        prods = ['ROSES', 'GIFT_BASKET', 'STRAWBERRIES', 'CHOCOLATE']
-
-        order_depth = state.order_depths
-
-        osell, obuy, best_sell, best_buy, mid_price, worst_buy, worst_sell = {}, {}, {}, {}, {}, {}, {}
-
-        for p in list(orders.keys()):
-            osell[p] = collections.OrderedDict(sorted(order_depth[p].sell_orders.items()))
-            obuy[p] = collections.OrderedDict(sorted(order_depth[p].buy_orders.items(), reverse=True))
-
-            best_sell[p] = next(iter(osell[p]))
-            best_buy[p] = next(iter(obuy[p]))
-
-            worst_sell[p] = next(reversed(osell[p]))
-            worst_buy[p] = next(reversed(obuy[p]))
-
-            mid_price[p] = (best_sell[p] + best_buy[p]) / 2
+    def basket_difference(self, books):
+        # Basket mid minus the mids of its legs, None when a leg is not listed or one side of its book is empty
+        mid_price = {p: books[p].mid if p in books else None for p in ['GIFT_BASKET', 'STRAWBERRIES', 'CHOCOLATE', 'ROSES']}
+        if any(mid is None for mid in mid_price.values()):
+            return None
 
         theoretical_price = mid_price['STRAWBERRIES'] * 6 + mid_price['CHOCOLATE'] * 4 + mid_price['ROSES'] + 370
         actual_price = mid_price['GIFT_BASKET']
-        price_difference = actual_price - theoretical_price
+        return actual_price - theoretical_price
 
-        self.differences_cache.append(price_difference)
-        
-        # Computing the rolling mean and standard deviation of the price differences
-        window_size = 200
-        if len(self.differences_cache) > window_size:
-            windowed_data = self.differences_cache[-window_size:]
-            mean_difference = np.mean(windowed_data)
-            std_difference = np.std(windowed_data) # Only consider the last 'window_size' elements
+    def compute_orders_basket(self, state, books, price_difference):
+        orders = {'GIFT_BASKET': [], 'STRAWBERRIES': [], 'CHOCOLATE': [], 'ROSES': []}
+        prods = ['ROSES', 'GIFT_BASKET', 'STRAWBERRIES', 'CHOCOLATE']
+        if price_difference is None:
+            return orders
+
+        # Rolling mean and standard deviation of the last 'window' price differences, once more than a window has been seen
+        if self.run_state.differences_cache.count > self.run_state.differences_cache.window:
+            mean_difference = self.run_state.differences_cache.mean
+            std_difference = self.run_state.differences_cache.std
         else:
             mean_difference = 9
             std_difference = 75
@@ -238,63 +194,78 @@ class Trader:
         
         if price_difference > threshold_u: 
             for prod in prods:
-                curr_position = self.POSITIONS[prod]
+                curr_position = self.run_state.positions[prod]
                 position_limit = self.POSITION_LIMITS[prod]
-                for bid, qty in order_depth[prod].buy_orders.items():
+                for bid, qty in books[prod].bids:
                     vol = position_limit+curr_position
                     if vol > 0:
                         quantity = min(qty, vol)
                         orders[prod].append(Order(prod, bid, -quantity))
                         curr_position -= quantity
                     else: break
-                logger.print(f'SUBMITTED SHORT {prod}')
-                self.POSITIONS[prod] = curr_position
+                self.logger.info('SUBMITTED SHORT %s', prod)
+                self.run_state.positions[prod] = curr_position
 
         elif price_difference < threshold_d: 
             for prod in prods:
-                curr_position = self.POSITIONS[prod]
+                curr_position = self.run_state.positions[prod]
                 position_limit = self.POSITION_LIMITS[prod]
-                for ask, qty in order_depth[prod].sell_orders.items():
+                for ask, qty in books[prod].asks:
                     vol = position_limit-curr_position
                     if vol > 0:
-                        quantity = min(-qty, vol)
+                        quantity = min(qty, vol)
                         orders[prod].append(Order(prod, ask, quantity))
                         curr_position += quantity
                     else: break
-                logger.print(f'SUBMITTED LONG {prod}')
-                self.POSITIONS[prod] = curr_position
+                self.logger.info('SUBMITTED LONG %s', prod)
+                self.run_state.positions[prod] = curr_position
         
-        logger.print(f'SUBMITTING THE FOLLOWING ORDERS: {orders}')
+        self.logger.debug('SUBMITTING THE FOLLOWING ORDERS: %s', orders)
         return orders
 
 
     
-    def run(self, state: TradingState) -> tuple[dict[Symbol, list[Order]], int, str]:
-        result = {}
-
-        for key, val in state.position.items():
-            self.POSITIONS[key] = val
+    def run(self, state: TradingState, budget_ms: float | None = None) -> tuple[dict[Symbol, list[Order]], int, str]:
+        # Everything run() does counts against the budget, strategies are fitted into what is left
+        runner = self.runner
+        runner.start(self.TIME_BUDGET_MS if budget_ms is None else budget_ms)
+        if state.traderData != self.run_state.trader_data:
+            self.load_state(state.traderData)
 
-        if 'AMETHYSTS' in state.order_depths:
-            result['AMETHYSTS'] = self.compute_amethysts_orders(state)
-        if 'STARFRUIT' in state.order_depths:
-            result['STARFRUIT'] = self.compute_starfruit_orders(state)
+        result = {}
+        books = runner.always('snapshot', snapshot_books, state.order_depths)
+
+        # The exchange's positions rather than our own count, so fills that did not happen and
+        # a restarted process both start the tick from the truth
+        for product in self.run_state.positions:
+            self.run_state.positions[product] = state.position.get(product, 0)
+
+        # Strategies run cheapest and most valuable first, so a tight budget drops the basket first
+        if 'AMETHYSTS' in books:
+            result['AMETHYSTS'] = runner.run('amethysts', [], self.compute_amethysts_orders, state, books)
+        if 'STARFRUIT' in books:
+            result['STARFRUIT'] = runner.run('starfruit', [], self.compute_starfruit_orders, state, books)
         
-        orders = self.compute_orders_basket(state)
+        # Pushed outside the basket stage so the rolling statistics see every tick, skipped or not
+        price_difference = self.basket_difference(books)
+        if price_difference is not None:
+            self.run_state.differences_cache.push(price_difference)
+        orders = runner.run('basket', {prod: [] for prod in ['GIFT_BASKET', 'STRAWBERRIES', 'CHOCOLATE', 'ROSES']}, self.compute_orders_basket, state, books, price_difference)
         for prod in ['GIFT_BASKET', 'STRAWBERRIES', 'CHOCOLATE', 'ROSES']:
             result[prod] = orders[prod]
 
         
-        if 'STARFRUIT' in state.order_depths:
-            mid_price = (list(state.order_depths['STARFRUIT'].sell_orders.keys())[0] +
-                            list(state.order_depths['STARFRUIT'].buy_orders.keys())[0]) / 2
-            self.starfruit_cache.append(mid_price)
-            if len(self.starfruit_cache) > 4:
-                self.starfruit_cache.pop(0)
+        if 'STARFRUIT' in books and books['STARFRUIT'].mid is not None:
+            model = self.starfruit_model()
+            if model is not None and self.run_state.starfruit_cache.full:
+                runner.always('rls', model.update, self.run_state.starfruit_cache.values, books['STARFRUIT'].mid)
+            self.run_state.starfruit_cache.push(books['STARFRUIT'].mid)
 
 
         
-        traderData = f"Current POSITIONS: {self.POSITIONS}"  # Format for better readability
+        if runner.skipped:
+            self.logger.warning('SKIPPED %s', runner.skipped)
+        traderData = runner.always('state', self.save_state)
         conversions = 1  # Placeholder for conversion logic
-        logger.flush(state, result, conversions, traderData)
+        runner.always('flush', self.logger.flush, state, result, conversions, traderData)
         return result, conversions, traderData
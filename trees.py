@@ -0,0 +1,231 @@
+import argparse
+import json
+import math
+import time
+from typing import Any
+
+import numpy as np
+
+
+def float32_bound(threshold: float) -> float:
+    '''
+    The largest float64 x with float32(x) <= threshold, for a threshold that is itself a
+    float32. Both libraries compare features after casting them to float32; comparing the
+    float64 feature against this bound instead makes the same decision without the cast.
+    '''
+    t = np.float32(threshold)
+    if np.isinf(t):
+        return float(t)
+    above = np.nextafter(t, np.float32(np.inf))
+    if np.isinf(above):
+        return math.inf
+    # Halfway to the next float32 is exact in float64; ties round to even
+    middle = (float(t) + float(above)) / 2
+    return middle if np.float32(middle) <= t else float(np.nextafter(middle, -np.inf))
+
+
+def float32_floor(value: float) -> float:
+    # Largest float32 <= a float64 threshold, so float32(x) <= value iff float32(x) <= this
+    t = np.float32(value)
+    if float(t) > value:
+        t = np.nextafter(t, np.float32(-np.inf))
+    return float(t)
+
+
+class TreeEnsemble:
+    '''
+    A regression forest flattened into parallel lists, one entry per node of every tree.
+    Internal nodes send x to left when x[feature] <= threshold, or when x[feature] is NaN
+    and missing_left is set, and to right otherwise; leaves have feature -1 and hold
+    value. The prediction is base + (sum of one leaf per tree) / divisor, which covers
+    both XGBoost (base score plus leaves) and RandomForest (mean of trees).
+
+    predict() walks the lists in plain Python for one row a tick, predict_batch() walks
+    every row and tree at once with NumPy and gives bitwise identical results.
+    '''
+    def __init__(self, feature: list[int], threshold: list[float], left: list[int], right: list[int], missing_left: list[bool],
+                 value: list[float], roots: list[int], base: float = 0.0, divisor: float = 1.0, num_features: int = 0) -> None:
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.base = base
+        self.divisor = divisor
+        self.num_features = num_features
+        self.arrays: dict[str, np.ndarray] | None = None
+
+    @property
+    def num_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.feature)
+
+    def predict(self, x: list[float]) -> float:
+        feature, threshold, left, right, missing_left, value = self.feature, self.threshold, self.left, self.right, self.missing_left, self.value
+        total = 0.0
+        for node in self.roots:
+            f = feature[node]
+            while f >= 0:
+                v = x[f]
+                node = left[node] if v <= threshold[node] or (v != v and missing_left[node]) else right[node]
+                f = feature[node]
+            total += value[node]
+        return self.base + total / self.divisor
+
+    def predict_batch(self, X: np.ndarray) -> np.ndarray:
+        if self.arrays is None:
+            self.arrays = {
+                'feature': np.array(self.feature, dtype=np.int64),
+                'threshold': np.array(self.threshold, dtype=np.float64),
+                'left': np.array(self.left, dtype=np.int64),
+                'right': np.array(self.right, dtype=np.int64),
+                'missing_left': np.array(self.missing_left, dtype=bool),
+                'value': np.array(self.value, dtype=np.float64),
+            }
+        a = self.arrays
+        X = np.asarray(X, dtype=np.float64)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.tile(np.array(self.roots, dtype=np.int64), (len(X), 1))
+        features = a['feature'][nodes]
+        internal = features >= 0
+        while internal.any():
+            v = X[rows, np.where(internal, features, 0)]
+            go_left = (v <= a['threshold'][nodes]) | (np.isnan(v) & a['missing_left'][nodes])
+            nodes = np.where(internal, np.where(go_left, a['left'][nodes], a['right'][nodes]), nodes)
+            features = a['feature'][nodes]
+            internal = features >= 0
+
+        # Summed tree by tree in the same order as predict() so the two agree exactly
+        total = np.zeros(len(X))
+        leaves = a['value'][nodes]
+        for tree in range(self.num_trees):
+            total += leaves[:, tree]
+        return self.base + total / self.divisor
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'feature': self.feature, 'threshold': self.threshold, 'left': self.left, 'right': self.right,
+            'missing_left': self.missing_left, 'value': self.value, 'roots': self.roots,
+            'base': self.base, 'divisor': self.divisor, 'num_features': self.num_features,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'TreeEnsemble':
+        return cls(**data)
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'TreeEnsemble':
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def from_sklearn(model: Any) -> TreeEnsemble:
+    '''
+    Flattens a fitted RandomForestRegressor, ExtraTreesRegressor or DecisionTreeRegressor.
+    Only the fitted tree_ arrays are read, so sklearn itself is never imported.
+    '''
+    estimators = list(getattr(model, 'estimators_', [model]))
+    ensemble = TreeEnsemble([], [], [], [], [], [], [], 0.0, float(len(estimators)), int(model.n_features_in_))
+    for estimator in estimators:
+        tree = estimator.tree_
+        offset = ensemble.num_nodes
+        ensemble.roots.append(offset)
+        # Trees fitted without missing values send NaN right, since NaN <= t is false
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+        for node in range(tree.node_count):
+            if tree.children_left[node] == -1:
+                ensemble.feature.append(-1)
+                ensemble.threshold.append(0.0)
+                ensemble.left.append(-1)
+                ensemble.right.append(-1)
+                ensemble.missing_left.append(False)
+            else:
+                ensemble.feature.append(int(tree.feature[node]))
+                ensemble.threshold.append(float32_bound(float32_floor(tree.threshold[node])))
+                ensemble.left.append(offset + int(tree.children_left[node]))
+                ensemble.right.append(offset + int(tree.children_right[node]))
+                ensemble.missing_left.append(bool(missing_left[node]))
+            ensemble.value.append(float(tree.value[node, 0, 0]))
+    return ensemble
+
+
+def from_xgboost(model: Any) -> TreeEnsemble:
+    '''
+    Flattens a fitted XGBRegressor (or Booster) with an identity link such as
+    reg:squarederror, read from the booster's JSON model so xgboost is never imported.
+    XGBoost adds up leaves in float32, so predictions agree with model.predict to float32
+    precision rather than bitwise.
+    '''
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror', 'reg:quantileerror'):
+        raise ValueError(f'{objective} has a non-identity link and is not supported')
+    booster_model = learner['gradient_booster']
+    if booster_model['name'] != 'gbtree':
+        raise ValueError(f'{booster_model["name"]} boosters are not supported')
+
+    base = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    ensemble = TreeEnsemble([], [], [], [], [], [], [], base, 1.0, int(learner['learner_model_param']['num_feature']))
+    for tree in booster_model['model']['trees']:
+        offset = ensemble.num_nodes
+        ensemble.roots.append(offset)
+        for node, (left, right) in enumerate(zip(tree['left_children'], tree['right_children'])):
+            condition = tree['split_conditions'][node]
+            if left == -1:
+                ensemble.feature.append(-1)
+                ensemble.threshold.append(0.0)
+                ensemble.left.append(-1)
+                ensemble.right.append(-1)
+                ensemble.missing_left.append(False)
+                ensemble.value.append(float(np.float32(condition)))
+            else:
+                # XGBoost goes left when x < condition, i.e. x <= the float32 just below it
+                below = np.nextafter(np.float32(condition), np.float32(-np.inf))
+                ensemble.feature.append(int(tree['split_indices'][node]))
+                ensemble.threshold.append(float32_bound(below))
+                ensemble.left.append(offset + left)
+                ensemble.right.append(offset + right)
+                ensemble.missing_left.append(bool(tree['default_left'][node]))
+                ensemble.value.append(0.0)
+    return ensemble
+
+
+def export_model(model: Any, path: str) -> TreeEnsemble:
+    # The notebooks' models straight to a JSON file the traders load with TreeEnsemble.load
+    ensemble = from_xgboost(model) if hasattr(model, 'get_booster') else from_sklearn(model)
+    ensemble.save(path)
+    return ensemble
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Time a flattened tree ensemble exported with export_model')
+    parser.add_argument('model', help='JSON file written by export_model')
+    parser.add_argument('--rows', type=int, default=10_000)
+    args = parser.parse_args()
+
+    ensemble = TreeEnsemble.load(args.model)
+    X = np.random.default_rng(0).normal(0, 1, (args.rows, ensemble.num_features))
+    rows = X.tolist()
+    start = time.perf_counter()
+    for row in rows:
+        ensemble.predict(row)
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    ensemble.predict_batch(X)
+    batch = time.perf_counter() - start
+    print(f'{ensemble.num_trees} trees, {ensemble.num_nodes:,} nodes')
+    print(f'predict {single / args.rows * 1e6:.1f} us per row, predict_batch {batch / args.rows * 1e6:.2f} us per row')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,103 +1,194 @@
+# Imports helpers from this repo, so it cannot be pasted into the platform as it is: submit
+# the single file `python bundle.py working` writes to submission/working.py instead
 from datamodel import OrderDepth, TradingState, Order
 from typing import List
 import collections
+import math
 import numpy as np
+from features import FeatureEngine, batch_features, elementwise, lag_dot, lag_matrix
+from production import production_lookup
+from trees import TreeEnsemble
+from book_snapshot import BookSnapshot, snapshot_books
+from logger import Logger
+from state_codec import decode_state, encode_state
+
+class RunState:
+    '''
+    Everything a Trader accumulates over a run, owned by one Trader so instances in the
+    same process never share positions, features or the latest observations.
+    '''
+    def __init__(self, trader: 'Trader') -> None:
+        self.positions = {product: 0 for product in trader.POSITION_LIMITS}
+        # STARFRUIT_COEF weights log_return, log_return_lag1, ..., log_return_lag5
+        self.starfruit_features = FeatureEngine(len(trader.STARFRUIT_COEF) - 1)
+        self.curr_starfruit_price = 0
+        self.curr_orchids_price = 0
+        self.curr_import = 0
+        self.curr_export = 0
+        self.curr_production = 0
+        self.curr_transport = 0
+        self.trader_data = ''
+
 
 class Trader:
     
     STARFRUIT_COEF = [-0.703591491407734, -0.4918330007028236, -0.3442257990494724, -0.23474182959132742, -0.13766592122288243, -0.06159321908371221]
     STARFRUIT_INT = 1.0285830994358876e-06
-    starfruit_cache = []
 
     ORCHIDS_COEF = [-0.00222597542860434, -0.0001782550473343116, -0.06775987455596787, -0.0034279249954251075]
     ORCHIDS_INT =  -0.11628586488710894
-
-    curr_import = 0
-    curr_export = 0
-    curr_production = 0
-    curr_transport = 0
+    # A TreeEnsemble exported from the notebooks (JSON path or its to_dict()) replaces the linear
+    # model when set; it takes the same features in ORCHIDS_COEF order
+    ORCHIDS_MODEL = None
 
     POSITION_LIMITS = {
             'AMETHYSTS': 20,  # Maximum units of Amethysts that can be held
             'STARFRUIT': 20,  # Maximum units of Starfruit that can be held
             'ORCHIDS': 100
         }
-    
-    POSITIONS = {
-            'AMETHYSTS': 0, 
-            'STARFRUIT': 0,  
-            'ORCHIDS': 0
-        }
-    
-    curr_starfruit_price = 0
-    curr_orchids_price = 0
-    
-    def total_production_change(self, H, s):
-        if 60 <= H <= 80:
-            humidity_change = 0
-        elif H < 60:
-            num_fives = (60 - H) // 5
-            humidity_change = num_fives * -0.02
-        else:  # H > 80
-            num_fives = (H - 80) // 5
-            humidity_change = num_fives * -0.02
-        
-        minutes = s * 60  # Converts hours to minutes
-        rounded_minutes = (minutes // 10) * 10  # Rounds down to the nearest 10 minutes
-        rounded_hours = rounded_minutes / 60  # Converts back to hours
-        
-        if rounded_hours < 7:
-            ten_minute_intervals = (7 - rounded_hours) * 6
-            sunlight_change = -0.04 * ten_minute_intervals
-        else:
-            sunlight_change = 0
 
-        production_change = humidity_change + sunlight_change
+    STATE_VERSION = 2
     
-        return production_change
+    def __init__(self) -> None:
+        # Per trader, so traders replayed side by side never share a log buffer
+        self.logger = Logger()
+        self.reset()
+
+    def reset(self) -> None:
+        # Forgets every earlier tick; also needed after changing parameters on an instance
+        self.run_state = RunState(self)
+        self.orchids_trees = None
+
+    def save_state(self) -> str:
+        run_state = self.run_state
+        run_state.trader_data = encode_state(self.STATE_VERSION, [
+            *run_state.starfruit_features.get_state(),
+            [run_state.curr_starfruit_price, run_state.curr_orchids_price, run_state.curr_import, run_state.curr_export, run_state.curr_production, run_state.curr_transport],
+        ])
+        return run_state.trader_data
+
+    def load_state(self, trader_data: str) -> None:
+        # Restores the cache and latest observations when the platform has started a fresh process
+        sections = decode_state(self.STATE_VERSION, trader_data)
+        if sections is None or len(sections) != 3 or len(sections[2]) != 6:
+            return
+        run_state = self.run_state
+        run_state.starfruit_features.set_state(sections[0], sections[1])
+        (run_state.curr_starfruit_price, run_state.curr_orchids_price, run_state.curr_import,
+         run_state.curr_export, run_state.curr_production, run_state.curr_transport) = sections[2]
+        run_state.trader_data = trader_data
+
+    def total_production_change(self, H, s):
+        return production_lookup(H, s)
     
+    def orchids_model(self):
+        if self.ORCHIDS_MODEL is None:
+            return None
+        if self.orchids_trees is None:
+            model = self.ORCHIDS_MODEL
+            self.orchids_trees = TreeEnsemble.from_dict(model) if isinstance(model, dict) else TreeEnsemble.load(model)
+        return self.orchids_trees
+
     def calc_orchids_price(self):
+        run_state = self.run_state
+        model = self.orchids_model()
+        if model is not None:
+            next_ret = model.predict([run_state.curr_import, run_state.curr_export, run_state.curr_production, run_state.curr_transport])
+            return run_state.curr_orchids_price * math.exp(next_ret)
         next_ret = self.ORCHIDS_INT
-        next_ret += self.curr_import*self.ORCHIDS_COEF[0] 
-        next_ret += self.curr_export*self.ORCHIDS_COEF[1] 
-        next_ret += self.curr_production*self.ORCHIDS_COEF[2] 
-        next_ret += self.curr_transport*self.ORCHIDS_COEF[3]
-        return self.curr_orchids_price * np.exp(next_ret)
+        next_ret += run_state.curr_import*self.ORCHIDS_COEF[0] 
+        next_ret += run_state.curr_export*self.ORCHIDS_COEF[1] 
+        next_ret += run_state.curr_production*self.ORCHIDS_COEF[2] 
+        next_ret += run_state.curr_transport*self.ORCHIDS_COEF[3]
+        return run_state.curr_orchids_price * math.exp(next_ret)
+
+    def calc_orchids_prices(self, imports, exports, production, transport, orchids_prices):
+        '''
+        calc_orchids_price for whole-day arrays of the curr_* values in one call, element by
+        element identical to setting them and calling it each tick.
+        '''
+        imports, exports, production, transport, orchids_prices = (
+            np.asarray(values, dtype=np.float64) for values in (imports, exports, production, transport, orchids_prices))
+        model = self.orchids_model()
+        if model is not None:
+            next_ret = model.predict_batch(np.column_stack([imports, exports, production, transport]))
+            return orchids_prices * elementwise(math.exp, next_ret)
+        next_ret = self.ORCHIDS_INT + imports*self.ORCHIDS_COEF[0] + exports*self.ORCHIDS_COEF[1] + production*self.ORCHIDS_COEF[2] + transport*self.ORCHIDS_COEF[3]
+        return orchids_prices * elementwise(math.exp, next_ret)
 
     def calc_starfruit_price(self):
 
-        if len(self.starfruit_cache) < 6:
+        if not self.run_state.starfruit_features.ready('log_return'):
             return None
-        next_ret = self.STARFRUIT_INT
-        for i, ret in enumerate(reversed(self.starfruit_cache)):
-            next_ret += ret * self.STARFRUIT_COEF[i]
-        return self.curr_starfruit_price * np.exp(next_ret)
+        next_ret = self.STARFRUIT_INT + self.run_state.starfruit_features.windows['log_return'].dot(self.STARFRUIT_COEF)
+        return self.run_state.curr_starfruit_price * math.exp(next_ret)
+
+    def calc_starfruit_prices(self, mid_prices):
+        '''
+        calc_starfruit_price for a whole day in one call: element t is what it returns once
+        mid_prices[:t + 1] have been pushed, NaN where it returns None.
+        '''
+        mid_prices = np.asarray(mid_prices, dtype=np.float64)
+        log_returns = batch_features(mid_prices, 0)['log_return']
+        next_ret = self.STARFRUIT_INT + lag_dot(lag_matrix(log_returns, len(self.STARFRUIT_COEF)), self.STARFRUIT_COEF)
+        return mid_prices * elementwise(math.exp, next_ret)
 
     def run(self, state: TradingState):
-        print("traderData: " + state.traderData)
-        print("Observations: " + str(state.observations))
+        # Formatted only when debug logging is on
+        self.logger.debug('traderData: %s', state.traderData)
+        self.logger.debug('Observations: %s', state.observations)
+
+        if state.traderData != self.run_state.trader_data:
+            self.load_state(state.traderData)
+
+        books = snapshot_books(state.order_depths)
+
+        # Once per tick, before any strategy reads the features or the latest observations
+        if 'STARFRUIT' in books and books['STARFRUIT'].mid is not None:
+            mid_price = books['STARFRUIT'].mid
+            self.run_state.starfruit_features.push(mid_price)
+            self.run_state.curr_starfruit_price = mid_price
+
+        # ORCHIDS is not traded here; its observations feed calc_orchids_price and the saved state
+        if 'ORCHIDS' in state.observations.conversionObservations:
+            orchid_bid = state.observations.conversionObservations["ORCHIDS"].bidPrice
+            orchid_ask = state.observations.conversionObservations["ORCHIDS"].askPrice
+            sunlight = state.observations.conversionObservations["ORCHIDS"].sunlight
+            humidity = state.observations.conversionObservations["ORCHIDS"].humidity
+            import_tariff = state.observations.conversionObservations["ORCHIDS"].importTariff
+            export_tariff = state.observations.conversionObservations["ORCHIDS"].exportTariff
+            transport_fees = state.observations.conversionObservations["ORCHIDS"].transportFees
+
+            self.run_state.curr_production = self.total_production_change(humidity/365, sunlight)
+            self.run_state.curr_export = export_tariff
+            self.run_state.curr_import = import_tariff
+            self.run_state.curr_transport = transport_fees
+
+            self.run_state.curr_orchids_price = (orchid_ask + orchid_bid)/2
+
+        # The exchange's positions rather than our own count, so fills that did not happen and
+        # a restarted process both start the tick from the truth
+        for product in self.run_state.positions:
+            self.run_state.positions[product] = state.position.get(product, 0)
 
         result = {}
-        for product in state.order_depths:
-            if product not in self.POSITIONS:
-                self.POSITIONS[product] = 0
-
-            order_depth: OrderDepth = state.order_depths[product]
+        for product in books:
+            book: BookSnapshot = books[product]
             orders: List[Order] = []
-            current_position = self.POSITIONS[product]
+            current_position = self.run_state.positions.get(product, 0)
             position_limit = self.POSITION_LIMITS.get(product, 0)
 
             if product == 'AMETHYSTS':
                 amethysts_lb = 10000
                 amethysts_ub = 10000
 
-                for ask, qty in order_depth.sell_orders.items():
+                for ask, qty in book.asks:
                   if ask < amethysts_lb and current_position < position_limit:
-                        quantity = min(-qty, position_limit - current_position)
+                        quantity = min(qty, position_limit - current_position)
                         orders.append(Order(product, ask, quantity))
                         current_position += quantity
                 
-                for bid, qty in order_depth.buy_orders.items():
+                for bid, qty in book.bids:
                     if bid > amethysts_ub and current_position > -position_limit:
                         quantity = min(qty, current_position + position_limit)
                         orders.append(Order(product, bid, -quantity))
@@ -106,68 +197,23 @@ class Trader:
             elif product == 'STARFRUIT':
                 next_price = self.calc_starfruit_price()
                 if next_price:
-                    for ask, qty in order_depth.sell_orders.items():
+                    for ask, qty in book.asks:
                         if ask < next_price - 2 and current_position < position_limit:
-                            quantity = min(-qty, position_limit - current_position)
+                            quantity = min(qty, position_limit - current_position)
                             orders.append(Order(product, ask, quantity))
                             current_position += quantity
                     
-                    for bid, qty in order_depth.buy_orders.items():
+                    for bid, qty in book.bids:
                         if bid > next_price + 2 and current_position > -position_limit:
                             quantity = min(qty, current_position + position_limit)
                             orders.append(Order(product, bid, -quantity))
                             current_position -= quantity
-            
-            if 'STARFRUIT' in state.order_depths:
-                mid_price = (list(state.order_depths['STARFRUIT'].sell_orders.keys())[0] +
-                             list(state.order_depths['STARFRUIT'].buy_orders.keys())[0]) / 2
-                if self.curr_starfruit_price !=0:
-                    self.starfruit_cache.append(np.log(mid_price/self.curr_starfruit_price))
-                self.curr_starfruit_price = mid_price
-                if len(self.starfruit_cache) > 6:
-                    self.starfruit_cache.pop(0)
-
-            
-            elif product == 'ORCHIDS':
 
-                orchid_bid = state.observations.conversionObservations["ORCHIDS"].bidPrice
-                orchid_ask = state.observations.conversionObservations["ORCHIDS"].askPrice
-                sunlight = state.observations.conversionObservations["ORCHIDS"].sunlight
-                humidity = state.observations.conversionObservations["ORCHIDS"].humidity
-                import_tariff = state.observations.conversionObservations["ORCHIDS"].importTariff
-                export_tariff = state.observations.conversionObservations["ORCHIDS"].exportTariff
-
-                next_price = self.calc_orchids_price()
-
-                if orchid_ask < next_price and current_position < position_limit:
-                    orders.append(Order(product, orchid_ask, 5))
-                    current_position += 5
-                
-                if orchid_bid > next_price and current_position > -position_limit:
-                    orders.append(Order(product, orchid_bid, 5))
-                    current_position -=5
-                
-            
-            if 'ORCHIDS' in state.observations.conversionObservations:
-                orchid_bid = state.observations.conversionObservations["ORCHIDS"].bidPrice
-                orchid_ask = state.observations.conversionObservations["ORCHIDS"].askPrice
-                sunlight = state.observations.conversionObservations["ORCHIDS"].sunlight
-                humidity = state.observations.conversionObservations["ORCHIDS"].humidity
-                import_tariff = state.observations.conversionObservations["ORCHIDS"].importTariff
-                export_tariff = state.observations.conversionObservations["ORCHIDS"].exportTariff
-                transport_fees = state.observations.conversionObservations["ORCHIDS"].transportFees
-
-                self.curr_production = self.total_production_change(humidity/365, sunlight)
-                self.curr_export = export_tariff
-                self.curr_import = import_tariff
-                self.curr_transport = transport_fees
-
-                self.curr_orchids_price = (orchid_ask + orchid_bid)/2
-
-            self.POSITIONS[product] = current_position
+            self.run_state.positions[product] = current_position
             result[product] = orders
     
-        traderData = "Current POSITIONS: " + str(self.POSITIONS)  # Adjust this as needed based on what you want to monitor
+        traderData = self.save_state()
         conversions = 1  # Assuming a sample conversion logic
+        self.logger.flush(state, result, conversions, traderData)
         
         return result, conversions, traderData  # Ensure to return all expected outputs
\ No newline at end of file